@@ -0,0 +1,186 @@
+"""Admission control for the expensive endpoints.
+
+install(app) screens every request before its handler runs. An endpoint in
+ADMISSION_LIMITS gets two independent checks:
+
+    rate, burst   a token bucket per client, refilled at `rate` requests per
+                  second up to `burst`; an empty bucket answers 429
+    concurrency   at most this many requests of the endpoint being handled
+                  at once; the next one answers 503
+
+Both answers carry Retry-After and cost no more than a dict lookup, so a
+burst of plan solves or batch calls is turned away instead of occupying
+every worker thread while cheap lookups wait behind it. Endpoints without a
+limit are not tracked at all.
+
+Limits are per process: with several gunicorn workers a client can be
+admitted up to `workers` times the configured rate. Override them with
+ADMISSION_LIMITS="api.generate_plan=2:10:4,api.batch=off" (rate:burst:
+concurrency, 0 for no limit on that axis); ADMISSION_ENABLED=0 turns the
+whole thing off.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request
+
+from structured_log import get_logger
+
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") != "0"
+TRUSTED_PROXIES = {addr.strip() for addr in os.environ.get("TRUSTED_PROXIES", "127.0.0.1,::1").split(",") if addr.strip()}
+MAX_TRACKED_CLIENTS = int(os.environ.get("ADMISSION_MAX_CLIENTS", "10000"))
+
+# endpoint -> (rate per second, burst, max concurrent); 0 disables that check
+DEFAULT_LIMITS = {
+    "api.generate_plan": (2, 10, 4),
+    "api.construction_calculator_batch": (5, 20, 4),
+    "api.simulate_construction_cost": (2, 5, 2),
+    "api.construction_takeoff": (5, 20, 4),
+    "api.validate_batch": (10, 20, 4),
+    "api.resolve_plot_brackets": (10, 20, 4),
+    "api.buildable_envelope_batch": (5, 20, 4),
+    "api.batch": (20, 40, 8)
+}
+
+log = get_logger("admission")
+
+
+def parse_limits(spec, defaults=DEFAULT_LIMITS):
+    """DEFAULT_LIMITS updated by an ADMISSION_LIMITS string"""
+    limits = dict(defaults)
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        endpoint, _, value = item.partition("=")
+        endpoint = endpoint.strip()
+        if value.strip().lower() == "off":
+            limits.pop(endpoint, None)
+            continue
+        parts = value.split(":")
+        if len(parts) != 3:
+            raise ValueError(f"ADMISSION_LIMITS entry '{item}' must look like endpoint=rate:burst:concurrency")
+        rate, burst, concurrency = float(parts[0]), float(parts[1]), int(parts[2])
+        limits[endpoint] = (rate, max(burst, 1.0) if rate else 0, concurrency)
+    return limits
+
+
+class AdmissionController:
+    def __init__(self, limits, max_clients=MAX_TRACKED_CLIENTS):
+        self.limits = limits
+        self.max_clients = max_clients
+        self.buckets = OrderedDict()  # (endpoint, client) -> (tokens, last refill), least recently used first
+        self.in_flight = {}           # endpoint -> requests being handled
+        self.admitted = {}            # endpoint -> count
+        self.rejected = {}            # (endpoint, reason) -> count
+        self._lock = threading.Lock()
+
+    def admit(self, endpoint, client):
+        """None if the request may proceed (call release() when it ends),
+        else (status, reason, retry_after_seconds)"""
+        rate, burst, concurrency = self.limits[endpoint]
+        now = time.monotonic()
+        with self._lock:
+            key = (endpoint, client)
+            tokens = burst
+            if rate:
+                bucket = self.buckets.get(key)
+                if bucket is not None:
+                    tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                if tokens < 1:
+                    return self._reject(endpoint, 429, "rate", (1 - tokens) / rate)
+            if concurrency and self.in_flight.get(endpoint, 0) >= concurrency:
+                return self._reject(endpoint, 503, "concurrency", 1)
+            if rate:
+                self.buckets[key] = (tokens - 1, now)
+                self.buckets.move_to_end(key)
+                if len(self.buckets) > self.max_clients:
+                    self.buckets.popitem(last=False)
+            self.in_flight[endpoint] = self.in_flight.get(endpoint, 0) + 1
+            self.admitted[endpoint] = self.admitted.get(endpoint, 0) + 1
+        return None
+
+    def _reject(self, endpoint, status, reason, retry_after):
+        key = (endpoint, reason)
+        self.rejected[key] = self.rejected.get(key, 0) + 1
+        return status, reason, retry_after
+
+    def release(self, endpoint):
+        with self._lock:
+            self.in_flight[endpoint] -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "limits": {endpoint: {"rate": rate, "burst": burst, "concurrency": concurrency}
+                           for endpoint, (rate, burst, concurrency) in self.limits.items()},
+                "in_flight": dict(self.in_flight),
+                "admitted": dict(self.admitted),
+                "rejected": {f"{endpoint}:{reason}": count for (endpoint, reason), count in self.rejected.items()},
+                "tracked_clients": len(self.buckets)
+            }
+
+    def render(self):
+        """Prometheus text lines, appended to /metrics"""
+        with self._lock:
+            lines = [
+                "# HELP admission_admitted_total Requests let through admission control, by endpoint.",
+                "# TYPE admission_admitted_total counter"
+            ]
+            lines += [f'admission_admitted_total{{endpoint="{endpoint}"}} {count}'
+                      for endpoint, count in sorted(self.admitted.items())]
+            lines += [
+                "# HELP admission_rejected_total Requests turned away, by endpoint and reason (rate or concurrency).",
+                "# TYPE admission_rejected_total counter"
+            ]
+            lines += [f'admission_rejected_total{{endpoint="{endpoint}",reason="{reason}"}} {count}'
+                      for (endpoint, reason), count in sorted(self.rejected.items())]
+            lines += [
+                "# HELP admission_in_flight Admitted requests still being handled, by endpoint.",
+                "# TYPE admission_in_flight gauge"
+            ]
+            lines += [f'admission_in_flight{{endpoint="{endpoint}"}} {count}'
+                      for endpoint, count in sorted(self.in_flight.items())]
+        return "\n".join(lines) + "\n"
+
+
+def client_address():
+    """The caller's address; X-Forwarded-For is only believed from a trusted proxy"""
+    remote = request.remote_addr
+    if remote in TRUSTED_PROXIES:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return remote
+
+
+controller = AdmissionController(parse_limits(os.environ.get("ADMISSION_LIMITS")))
+
+def install(app, admission=controller):
+    if not ADMISSION_ENABLED:
+        return
+
+    @app.before_request
+    def _admit():
+        endpoint = request.endpoint
+        if endpoint not in admission.limits or request.method == "OPTIONS":
+            return None
+        verdict = admission.admit(endpoint, client_address())
+        if verdict is None:
+            g._admission_endpoint = endpoint
+            return None
+        status, reason, retry_after = verdict
+        retry_after = max(1, math.ceil(retry_after))
+        log.info("request_rejected", sample=0.01, endpoint=endpoint, reason=reason, status=status)
+        message = "Too many requests" if reason == "rate" else "Server busy"
+        response = jsonify({"error": f"{message}, retry in {retry_after}s", "retry_after": retry_after})
+        response.status_code = status
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    @app.teardown_request
+    def _release(exc):
+        # Popped so the second teardown of a streamed response is a no-op
+        endpoint = g.pop("_admission_endpoint", None)
+        if endpoint is not None:
+            admission.release(endpoint)
@@ -1,237 +1,589 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context
 from flask_cors import CORS
 import json
+import math
 import os
+import re
 import time
-import traceback
+from urllib.parse import urlsplit
 
-app = Flask(__name__)
-CORS(app)
+from werkzeug.exceptions import HTTPException
+
+import admission
+import buildable_envelope
+import metrics
+import plan_jobs
+import plan_render
+import regulations
+from bylaw_query import BylawQueryError
+from bylaw_search import DEFAULT_SEARCH_LIMIT, BylawSearchError
+from compliance import MAX_BATCH_CANDIDATES, check as check_compliance, input_errors as compliance_input_errors
+from cost_simulation import SimulationInputError, simulate as simulate_costs
+from content_cache import TieredCache, canonical_hash
+from costing import (
+    COST_RATES, RATES_LAST_UPDATED, BatchInputError,
+    columns_to_lists, compute_breakdowns, expand_scenarios
+)
+from estimate_store import EstimateQueryError, get_store, new_estimate_id, parse_date
+from http_cache import serve_cached_payload
+from json_provider import FastJSONProvider, stream_json_array, stream_ndjson
+from plan_layout import PlanInputError, canonical_configuration, parse_budget_ms, solve_plan
+from plot_brackets import MAX_RESOLVE_PARCELS, PlotAreaError, parcel_area_sqft
+from structured_log import get_logger
+from takeoff import TakeoffInputError, compute_takeoff, portfolio_columns, takeoff_report
+
+api = Blueprint("api", __name__)
+log = get_logger("app")
+
+BYLAW_RELOAD_INTERVAL = float(os.environ.get("BYLAW_RELOAD_INTERVAL", "0"))
+
+def serialize_json(obj, app=None):
+    """Serialize exactly like jsonify so cached bodies match live responses.
+
+    Pass `app` when calling outside a request, e.g. from a job callback.
+    """
+    return (app or current_app).json.response(obj).get_data()
 
 # -------------------------
 # Load city data
 # -------------------------
-def load_city_data():
-    """Load data from three separate city JSON files"""
-    cities_data = {}
-    city_files = {
-        "Lahore": "lahore.json",
-        "Karachi": "karachi.json", 
-        "Islamabad": "islamabad.json"
-    }
-    
-    for city, filename in city_files.items():
-        file_path = os.path.join(os.path.dirname(__file__), filename)
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                cities_data[city] = json.load(f)
-            print(f"✅ Loaded {city} data from {filename}")
-        except FileNotFoundError:
-            print(f"⚠️ Warning: {filename} not found for {city}")
-            cities_data[city] = {"authorities": {}}
-    
-    return cities_data
-
-CITIES_DATA = load_city_data()
-
 def analyze_data():
     """Analyze and display loaded data"""
-    print("\n🏠 City-based Residential Housing Regulations Backend Starting...")
-    print(f"📍 Loaded cities: {', '.join(CITIES_DATA.keys())}")
-    
-    for city, data in CITIES_DATA.items():
+    snapshot = regulations.current_snapshot()
+    for city, data in snapshot.cities_data.items():
         authorities = data.get("authorities", {})
-        num_authorities = len(authorities)
-        total_plot_sizes = sum(len(auth.get("plot_sizes", {})) for auth in authorities.values())
-        print(f"   {city}: {num_authorities} authorities, {total_plot_sizes} plot sizes")
-    
-    print("🎯 Focus: Residential Housing Only\n")
+        log.info("city_data_loaded", city=city, authorities=len(authorities),
+                 plot_sizes=sum(len(auth.get("plot_sizes", {})) for auth in authorities.values()))
+    log.info("form_options_precomputed", bytes=len(snapshot.form_options_payload["variants"]["identity"][0]),
+             etag=snapshot.form_options_payload["digest"])
 
-analyze_data()
+def error_response(event, e, status=500):
+    """Log a handler failure with its traceback, count it by type and return it as JSON"""
+    metrics.record_exception(e)
+    log.exception(event, error=str(e), path=request.path)
+    return jsonify({"error": str(e)}), status
 
 # -------------------------
 # Basic Routes
 # -------------------------
-@app.route("/", methods=["GET"])
+@api.route("/", methods=["GET"])
 def home():
     return jsonify({"message": "🏠 City Housing Regulations API is running!"}), 200
 
-@app.route("/api/form-options", methods=["GET"])
+@api.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.registry.render() + admission.controller.render(), mimetype="text/plain; version=0.0.4")
+
+@api.route("/api/admission", methods=["GET"])
+def get_admission_stats():
+    """Configured limits and admitted/rejected counts, for tuning ADMISSION_LIMITS"""
+    return jsonify({"status": "success", "enabled": admission.ADMISSION_ENABLED, "admission": admission.controller.stats()}), 200
+
+@api.route("/api/form-options", methods=["GET"])
 def get_form_options():
+    """Whole tree by default; city=, authority=, fields=, exclude= and shared=1 narrow it"""
     try:
-        transformed_data = {
-            "cities": {},
-            "global_options": {
-                "orientation": ["North", "South", "East", "West", "North-East", "North-West", "South-East", "South-West"],
-                "facing": ["Main Road", "Side Road", "Corner", "Back Lane"],
-                "shape": ["Regular", "Irregular", "Corner", "L-Shape"]
-            }
-        }
-        
-        for city, city_data in CITIES_DATA.items():
-            transformed_data["cities"][city] = {"authorities": {}}
-            authorities = city_data.get("authorities", {})
-            for authority, authority_data in authorities.items():
-                transformed_data["cities"][city]["authorities"][authority] = {"plot_sizes": {}}
-                plot_sizes = authority_data.get("plot_sizes", {})
-                for plot_key, plot_data in plot_sizes.items():
-                    frontend_key = plot_key.lower().replace(" ", "-").replace("(", "").replace(")", "")
-                    transformed_data["cities"][city]["authorities"][authority]["plot_sizes"][frontend_key] = {
-                        "meta": {
-                            "plot_size_label": plot_key,
-                            "authority": authority,
-                            "city": city,
-                            "frontend_key": frontend_key
-                        },
-                        "available_options": {
-                            "max_floors": plot_data.get("max_floors", 2),
-                            "max_height_ft": plot_data.get("max_height_ft"),
-                            "ground_coverage_percent": plot_data.get("ground_coverage_percent", 60),
-                            "FAR": plot_data.get("FAR", "Not specified"),
-                            "mandatory_open_spaces": {
-                                "front": f"{plot_data.get('setbacks', {}).get('front', 0)} ft",
-                                "rear": f"{plot_data.get('setbacks', {}).get('rear', 0)} ft",
-                                "side": f"{plot_data.get('setbacks', {}).get('side', 0)} ft"
-                            },
-                            "bedrooms_range": plot_data.get("bedrooms_range", {"min": 1, "max": 5}),
-                            "washrooms_range": plot_data.get("washrooms_range", {"min": 2, "max": 5}),
-                            "public_zones": ["Lounge", "Drawing Room", "TV Lounge", "Family Room", "Study Room"],
-                            "service_zones": ["Kitchen", "Store", "Laundry", "Servant Quarter", "Garage"],
-                            "kitchen_types": ["Open Kitchen", "Closed Kitchen", "Island Kitchen"],
-                            "allowed_features": {
-                                "servant_quarter": plot_data.get("max_floors", 2) >= 2,
-                                "swimming_pool": plot_data.get("ground_coverage_percent", 60) <= 60,
-                                "basement": False,
-                                "mumty": True
-                            },
-                            "parking": {
-                                "type": "Single Car Garage" if plot_data.get("max_floors", 2) >= 2 else "Not Required",
-                                "spaces": 1 if plot_data.get("max_floors", 2) >= 2 else 0
-                            },
-                            "special_rules": [
-                                f"Maximum {plot_data.get('max_floors', 2)} floors allowed",
-                                f"Ground coverage: {plot_data.get('ground_coverage_percent', 60)}%",
-                                f"FAR: {plot_data.get('FAR', 'Not specified')}"
-                            ],
-                            "additional_rules": {}
-                        },
-                        "raw_bylaws": plot_data
-                    }
-        print("✅ Successfully transformed form options data")
-        return jsonify(transformed_data), 200
+        snapshot = regulations.current_snapshot()
+        query = regulations.parse_form_options_query(request.args, snapshot.cities_data)
+        if query is None:
+            return serve_cached_payload(snapshot.form_options_payload)
+        return serve_cached_payload(snapshot.form_options_variant(query))
+    except regulations.FormOptionsQueryError as e:
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
-        print(f"❌ Error in get_form_options: {str(e)}")
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return error_response("form_options_failed", e)
 
-@app.route("/api/cities", methods=["GET"])
+@api.route("/api/cities", methods=["GET"])
 def get_cities():
     try:
-        return jsonify({"cities": list(CITIES_DATA.keys())}), 200
+        return jsonify({"cities": list(regulations.current_snapshot().cities_data.keys())}), 200
     except Exception as e:
-        print(f"❌ Error in get_cities: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        return error_response("get_cities_failed", e)
 
-@app.route("/api/cities/<city>/authorities", methods=["GET"])
+@api.route("/api/cities/<city>/authorities", methods=["GET"])
 def get_authorities(city):
     try:
-        if city not in CITIES_DATA:
+        cities_data = regulations.current_snapshot().cities_data
+        if city not in cities_data:
             return jsonify({"error": f"City '{city}' not found"}), 404
-        return jsonify({"authorities": list(CITIES_DATA[city].get("authorities", {}).keys())}), 200
+        return jsonify({"authorities": list(cities_data[city].get("authorities", {}).keys())}), 200
     except Exception as e:
-        print(f"❌ Error in get_authorities: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        return error_response("get_authorities_failed", e)
 
-@app.route("/api/bylaws/<city>/<authority>/<plot_size>", methods=["GET"])
+@api.route("/api/bylaws/<city>/<authority>/<plot_size>", methods=["GET"])
 def get_bylaws(city, authority, plot_size):
     try:
-        if city not in CITIES_DATA:
+        snapshot = regulations.current_snapshot()
+        if city not in snapshot.cities_data:
             return jsonify({"error": f"City '{city}' not found"}), 404
-        city_data = CITIES_DATA[city]
+        city_data = snapshot.cities_data[city]
         authorities = city_data.get("authorities", {})
         if authority not in authorities:
             return jsonify({"error": f"Authority '{authority}' not found"}), 404
-        plot_sizes = authorities[authority].get("plot_sizes", {})
-        plot_data = None
-        for key, value in plot_sizes.items():
-            frontend_key = key.lower().replace(" ", "-").replace("(", "").replace(")", "")
-            if frontend_key == plot_size or key == plot_size:
-                plot_data = value
-                break
-        if not plot_data:
+        entry = snapshot.lookup_plot(city, authority, plot_size)
+        if entry is None:
             return jsonify({"error": f"Plot size '{plot_size}' not found"}), 404
-        return jsonify({"city": city, "authority": authority, "plot_size": plot_size, "bylaws": plot_data}), 200
+        return jsonify({"city": city, "authority": authority, "plot_size": plot_size, "bylaws": entry[1]}), 200
+    except Exception as e:
+        return error_response("get_bylaws_failed", e)
+
+@api.route("/api/bylaws/query", methods=["POST"])
+def query_bylaws():
+    """Filter and sort every plot record across cities, e.g. coverage >= 70 and FAR >= 2.5"""
+    try:
+        total, rows = regulations.current_snapshot().bylaw_columns.query(request.json or {})
+        return jsonify({"status": "success", "total": total, "count": len(rows), "results": rows}), 200
+    except BylawQueryError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"❌ Error in get_bylaws: {str(e)}")
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return error_response("query_bylaws_failed", e)
 
-@app.route("/api/validate-selection", methods=["POST"])
+@api.route("/api/bylaws/search", methods=["GET"])
+def search_bylaws():
+    """Free-text search over every plot record, e.g. ?q=islamabad 4 floors 0 side setback"""
+    try:
+        limit = request.args.get("limit", DEFAULT_SEARCH_LIMIT)
+        try:
+            limit = int(limit)
+        except ValueError:
+            return jsonify({"error": "'limit' must be an integer"}), 400
+        index = regulations.current_snapshot().search_index
+        result = index.search(request.args.get("q", ""), limit=limit, match=request.args.get("match", "all"))
+        return jsonify({"status": "success", **result}), 200
+    except BylawSearchError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return error_response("search_bylaws_failed", e)
+
+@api.route("/api/validate-selection", methods=["POST"])
 def validate_selection():
     try:
         data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
         city = data.get("city")
         plot_size = data.get("plotSize")
         authority = data.get("authority")
-        if not city or not plot_size or not authority:
+        if not all(isinstance(v, str) and v for v in (city, plot_size, authority)):
             return jsonify({"error": "City, authority, and plot size are required"}), 400
-        if city not in CITIES_DATA:
+        snapshot = regulations.current_snapshot()
+        if city not in snapshot.cities_data:
             return jsonify({"error": f"City '{city}' not found"}), 404
-        if authority not in CITIES_DATA[city].get("authorities", {}):
+        if authority not in snapshot.cities_data[city].get("authorities", {}):
             return jsonify({"error": f"Authority '{authority}' not found"}), 404
-        return jsonify({"message": "Validation successful", "valid": True}), 200
+        entry = snapshot.lookup_rules(city, authority, plot_size)
+        if entry is None:
+            return jsonify({"error": f"Plot size '{plot_size}' not found"}), 404
+        plot_label, rules = entry
+        violations = check_compliance(rules, data, candidate_plot_area(data, plot_label))
+        if violations:
+            return jsonify({
+                "error": "; ".join(v["message"] for v in violations),
+                "valid": False,
+                "violations": violations
+            }), 400
+        return jsonify({"message": "Validation successful", "valid": True, "violations": []}), 200
     except Exception as e:
-        print(f"❌ Error in validate_selection: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        return error_response("validate_selection_failed", e)
+
+def candidate_plot_area(data, plot_label):
+    """Plot area in sq ft from the request's length/width or the standard size, else None"""
+    length, width = data.get("length"), data.get("width")
+    if length and width:
+        try:
+            return float(length) * float(width)
+        except (TypeError, ValueError):
+            return None
+    dimensions = regulations.STANDARD_DIMENSIONS.get(regulations.plot_size_slug(plot_label))
+    return dimensions["length"] * dimensions["width"] if dimensions else None
+
+@api.route("/api/validate-batch", methods=["POST"])
+def validate_batch():
+    """Check many candidate configurations and report every violation of each"""
+    try:
+        data = request.json or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        candidates = data.get("candidates")
+        defaults = data.get("defaults") or {}
+        if not isinstance(candidates, list) or not candidates:
+            return jsonify({"error": "'candidates' must be a non-empty list"}), 400
+        if len(candidates) > MAX_BATCH_CANDIDATES:
+            return jsonify({"error": f"At most {MAX_BATCH_CANDIDATES} candidates per call"}), 400
+        if not isinstance(defaults, dict):
+            return jsonify({"error": "'defaults' must be an object"}), 400
+        snapshot = regulations.current_snapshot()
+        valid = [0]
+
+        def evaluate():
+            for index, candidate in enumerate(candidates):
+                if not isinstance(candidate, dict):
+                    yield {"index": index, "valid": False, "violations": compliance_input_errors(candidate)}
+                    continue
+                candidate = {**defaults, **candidate} if defaults else candidate
+                entry = snapshot.lookup_rules(candidate.get("city"), candidate.get("authority"), candidate.get("plotSize"))
+                if entry is None:
+                    violations = [{"rule": "plot", "message": "Unknown city, authority or plot size",
+                                   "limit": None, "actual": [candidate.get("city"), candidate.get("authority"), candidate.get("plotSize")]}]
+                else:
+                    violations = check_compliance(entry[1], candidate, candidate_plot_area(candidate, entry[0]))
+                if not violations:
+                    valid[0] += 1
+                yield {"index": index, "valid": not violations, "violations": violations}
+
+        def summary():
+            return {"status": "success", "count": len(candidates), "valid_count": valid[0],
+                    "invalid_count": len(candidates) - valid[0]}
+
+        stream = data.get("stream")
+        if stream == "array":
+            # Counts are only known once every candidate is checked, so they follow the results
+            tail = lambda: b"]," + current_app.json.dumps(summary()).encode("ascii")[1:]
+            return Response(stream_with_context(stream_json_array(evaluate(), current_app.json.default,
+                                                                  head=b'{"results":[', tail=tail)),
+                            mimetype="application/json")
+        if stream:
+            def lines():
+                yield from evaluate()
+                yield summary()
+            return Response(stream_with_context(stream_ndjson(lines(), current_app.json.default)),
+                            mimetype="application/x-ndjson")
+        results = list(evaluate())
+        return jsonify({**summary(), "results": results}), 200
+    except Exception as e:
+        return error_response("validate_batch_failed", e)
+
+PLAN_CACHE = TieredCache(
+    max_memory_bytes=int(os.environ.get("PLAN_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    directory=os.environ.get("PLAN_CACHE_DIR") or None,
+    max_disk_bytes=int(os.environ.get("PLAN_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024))),
+    suffix=".json"
+)
+
+def plan_configuration(data):
+    """The configuration block of a generate-plan request"""
+    return {
+        "floors": data.get("floors", []),
+        "bedrooms": data.get("bedrooms"),
+        "washrooms": data.get("washrooms"),
+        "public_zones": data.get("publicZones", []),
+        "service_zones": data.get("serviceZones", []),
+        "kitchen_type": data.get("kitchenType"),
+        "special_features": data.get("specialFeatures", []),
+        "orientation": data.get("orientation"),
+        "facing": data.get("facing")
+    }
+
+# configuration key -> generate-plan request field
+PLAN_REQUEST_FIELDS = {
+    "floors": "floors",
+    "bedrooms": "bedrooms",
+    "washrooms": "washrooms",
+    "public_zones": "publicZones",
+    "service_zones": "serviceZones",
+    "kitchen_type": "kitchenType",
+    "special_features": "specialFeatures",
+    "orientation": "orientation",
+    "facing": "facing"
+}
+
+PLAN_ID_PATTERN = re.compile(r"PLAN_[0-9a-f]{32}")
+
+def cached_plan_body(plan_id):
+    """Serialized response of a generated plan, None if unknown or evicted"""
+    # The id becomes a file name in the disk cache, so nothing but a content hash gets through
+    if not isinstance(plan_id, str) or not PLAN_ID_PATTERN.fullmatch(plan_id):
+        return None
+    return PLAN_CACHE.get(plan_id[len("PLAN_"):])
+
+def previous_plan(plan_id):
+    """The cached response of an earlier plan, None if unknown or evicted"""
+    if not isinstance(plan_id, str) or not PLAN_ID_PATTERN.fullmatch(plan_id):
+        raise PlanInputError("'previousPlanId' must be a plan_id returned by /api/generate-plan")
+    body = cached_plan_body(plan_id)
+    return json.loads(body) if body is not None else None
+
+def apply_plan_delta(data, previous):
+    """The full request for an edit: the previous plan's inputs, overridden by
+    the fields sent with it and then by its `delta`"""
+    delta = data.get("delta") or {}
+    if not isinstance(delta, dict):
+        raise PlanInputError("'delta' must be an object of generate-plan fields")
+    merged = {}
+    if previous:
+        merged = {"city": previous["city"], "plotSize": previous["plot_size"], "authority": previous["authority"]}
+        merged.update({PLAN_REQUEST_FIELDS[key]: value for key, value in previous["configuration"].items()
+                       if key in PLAN_REQUEST_FIELDS})
+    merged.update({key: value for key, value in data.items() if key not in ("previousPlanId", "delta")})
+    merged.update(delta)
+    # Same plot: keep the dimensions the previous plan was solved for
+    if previous and all(merged.get(k) == previous[p] for k, p in
+                        (("city", "city"), ("plotSize", "plot_size"), ("authority", "authority"))):
+        merged.setdefault("length", previous["layout"]["plot"]["length"])
+        merged.setdefault("width", previous["layout"]["plot"]["width"])
+    return merged
+
+def plot_dimensions_for(data, plot_label):
+    """Plot (length, width) from the request, else the standard size for the label"""
+    if data.get("length") and data.get("width"):
+        try:
+            length, width = float(data["length"]), float(data["width"])
+        except (TypeError, ValueError):
+            raise PlanInputError("'length' and 'width' must be numbers in feet") from None
+        if not (math.isfinite(length) and math.isfinite(width)) or length <= 0 or width <= 0:
+            raise PlanInputError("Plot length and width must be positive numbers")
+        return length, width
+    dimensions = regulations.STANDARD_DIMENSIONS.get(regulations.plot_size_slug(plot_label))
+    if not dimensions:
+        raise PlanInputError(f"No standard dimensions for '{plot_label}', send length and width")
+    return float(dimensions["length"]), float(dimensions["width"])
+
+def prepare_plan(data):
+    """Validate a generate-plan request; returns (context, solver args) or an error response"""
+    city = data.get("city")
+    plot_size = data.get("plotSize")
+    authority = data.get("authority")
+    if not all([city, plot_size, authority]):
+        return None, (jsonify({"error": "City, authority, and plot size are required"}), 400)
+    entry = regulations.current_snapshot().lookup_plot(city, authority, plot_size)
+    if entry is None:
+        return None, (jsonify({"error": f"Plot size '{plot_size}' not found for {city} / {authority}"}), 404)
+    plot_label, plot_data = entry
+    configuration = plan_configuration(data)
+    canonical = canonical_configuration(configuration)
+    length, width = plot_dimensions_for(data, plot_label)
+    # Everything the solver sees, so a bylaw edit or a different plot never hits an old entry
+    cache_key = canonical_hash({
+        "city": city, "authority": authority, "plot": plot_label, "bylaws": plot_data,
+        "length": length, "width": width, "configuration": canonical
+    })[:32]
+    context = {
+        "city": city,
+        "plot_size": plot_size,
+        "authority": authority,
+        "configuration": configuration,
+        "cache_key": cache_key,
+        "plan_id": f"PLAN_{cache_key}"
+    }
+    return (context, (plot_data, length, width, canonical, parse_budget_ms(data.get("budgetMs")))), None
+
+def plan_response(context, layout):
+    return {
+        "status": "success",
+        "message": "Floorplan generated successfully!",
+        "city": context["city"],
+        "plot_size": context["plot_size"],
+        "authority": context["authority"],
+        "configuration": context["configuration"],
+        "layout": layout,
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "plan_id": context["plan_id"],
+        **({"previous_plan_id": context["previous_plan_id"]} if "previous_plan_id" in context else {})
+    }
+
+def cache_plan(context, layout, app=None):
+    """Build the plan response and store its serialized body under the plan's content hash"""
+    response = plan_response(context, layout)
+    body = serialize_json(response, app)
+    PLAN_CACHE.put(context["cache_key"], body)
+    return response, body
+
+def cached_plan_response(body, cache_status):
+    response = Response(body, mimetype="application/json")
+    response.headers["X-Plan-Cache"] = cache_status
+    return response
+
+def plan_job_links(job_id):
+    return {
+        "status_url": f"/api/plan-jobs/{job_id}",
+        "result_url": f"/api/plan-jobs/{job_id}/result",
+        "stream_url": f"/api/plan-jobs/{job_id}/stream"
+    }
 
-@app.route("/api/generate-plan", methods=["POST"])
+@api.route("/api/generate-plan", methods=["POST"])
 def generate_plan():
+    """Solve inline, or queue the solve and return a job id with ?mode=async.
+
+    With `previousPlanId` (and a `delta` of changed fields) the request edits
+    an earlier plan: unchanged floors are reused and the rest warm-start from
+    the previous layout.
+    """
     try:
         data = request.json
-        city = data.get("city")
-        plot_size = data.get("plotSize")
-        authority = data.get("authority")
-        if not all([city, plot_size, authority]):
-            return jsonify({"error": "City, authority, and plot size are required"}), 400
-        response = {
-            "status": "success",
-            "message": "Floorplan generated successfully!",
-            "city": city,
-            "plot_size": plot_size,
-            "authority": authority,
-            "configuration": {
-                "floors": data.get("floors", []),
-                "bedrooms": data.get("bedrooms"),
-                "washrooms": data.get("washrooms"),
-                "public_zones": data.get("publicZones", []),
-                "service_zones": data.get("serviceZones", []),
-                "kitchen_type": data.get("kitchenType"),
-                "special_features": data.get("specialFeatures", []),
-                "orientation": data.get("orientation"),
-                "facing": data.get("facing")
-            },
-            "generated_at": "2024-12-06",
-            "plan_id": f"PLAN_{city}_{authority}_{plot_size}_{len(data.get('floors', []))}_floors"
-        }
-        print(f"✅ Generated plan for {city} - {authority} - {plot_size}")
-        return jsonify(response), 200
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        previous = None
+        if data.get("previousPlanId") is not None:
+            previous = previous_plan(data["previousPlanId"])
+            if previous is None and not all(data.get(k) for k in ("city", "plotSize", "authority")):
+                return jsonify({"error": f"Plan '{data['previousPlanId']}' is no longer cached, send the full request"}), 404
+            data = apply_plan_delta(data, previous)
+        prepared, error = prepare_plan(data)
+        if error:
+            return error
+        context, solver_args = prepared
+        cached = PLAN_CACHE.get(context["cache_key"])
+        if cached is not None:
+            return cached_plan_response(cached, "hit")
+        if previous is not None:
+            # A short warm-started solve is not what a cold request for this
+            # configuration should get, so it is cached under its own key
+            context["cache_key"] = canonical_hash({"plan": context["cache_key"], "previous": previous["plan_id"]})[:32]
+            context["plan_id"] = f"PLAN_{context['cache_key']}"
+            context["previous_plan_id"] = previous["plan_id"]
+            cached = PLAN_CACHE.get(context["cache_key"])
+            if cached is not None:
+                return cached_plan_response(cached, "hit")
+            solver_args += (previous["layout"],)
+        if request.args.get("mode") == "async" or data.get("async"):
+            app = current_app._get_current_object()
+            job_id = plan_jobs.submit(solver_args, lambda layout: cache_plan(context, layout, app)[0])
+            return jsonify({"status": "queued", "job_id": job_id, "plan_id": context["plan_id"], **plan_job_links(job_id)}), 202
+        layout = solve_plan(*solver_args)
+        log.info("plan_generated", city=context["city"], authority=context["authority"],
+                 plot_size=context["plot_size"], solve_ms=layout["solve_ms"], incremental=previous is not None)
+        return cached_plan_response(cache_plan(context, layout)[1], "miss")
+    except PlanInputError as e:
+        return jsonify({"error": str(e)}), 400
+    except plan_jobs.QueueFullError as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+    except Exception as e:
+        return error_response("generate_plan_failed", e)
+
+@api.route("/api/plan-cache", methods=["GET"])
+def get_plan_cache_stats():
+    return jsonify({"status": "success", "cache": PLAN_CACHE.stats(),
+                    "renders": plan_render.get_render_cache().stats()}), 200
+
+@api.route("/api/plans/<plan_id>/render", methods=["GET"])
+def render_plan(plan_id):
+    """SVG (or ?format=png) drawing of a generated plan, cached on disk by plan and options"""
+    try:
+        options = plan_render.render_options(request.args)
+        body = cached_plan_body(plan_id)
+        if body is None:
+            return jsonify({"error": f"Plan '{plan_id}' not found, generate it again"}), 404
+        key = plan_render.render_key(body, options)
+        if request.if_none_match.contains(key):
+            response = Response(status=304)
+        else:
+            cache = plan_render.get_render_cache()
+            image = cache.get(key)
+            cache_status = "hit"
+            if image is None:
+                image = plan_render.render(json.loads(body), options)
+                cache.put(key, image)
+                cache_status = "miss"
+            response = Response(image, mimetype=plan_render.RENDER_FORMATS[options["format"]])
+            response.headers["X-Render-Cache"] = cache_status
+        response.set_etag(key)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    except plan_render.RenderOptionsError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return error_response("render_plan_failed", e)
+
+@api.route("/api/plan-jobs", methods=["GET"])
+def get_plan_queue():
+    return jsonify({"status": "success", "queue": plan_jobs.stats()}), 200
+
+@api.route("/api/plan-jobs/<job_id>", methods=["GET"])
+def get_plan_job(job_id):
+    job = plan_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    job.pop("result")
+    return jsonify({**job, **plan_job_links(job_id)}), 200
+
+@api.route("/api/plan-jobs/<job_id>", methods=["DELETE"])
+def cancel_plan_job(job_id):
+    status = plan_jobs.cancel(job_id)
+    if status is None:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    return jsonify({"job_id": job_id, "status": status}), 200
+
+@api.route("/api/plan-jobs/<job_id>/result", methods=["GET"])
+def get_plan_job_result(job_id):
+    job = plan_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    if job["status"] == "done":
+        return jsonify(job["result"]), 200
+    if job["status"] in ("failed", "cancelled"):
+        return jsonify({"error": job["error"] or f"Job {job['status']}", "status": job["status"]}), 409
+    response = jsonify({"job_id": job_id, "status": job["status"]})
+    response.headers["Retry-After"] = "1"
+    return response, 202
+
+@api.route("/api/plan-jobs/<job_id>/stream", methods=["GET"])
+def stream_plan_job(job_id):
+    """Server-sent events: a status event on every change, then the result"""
+    if plan_jobs.get(job_id) is None:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+
+    def events():
+        last_status = None
+        while True:
+            job = plan_jobs.get(job_id)
+            if job is None:
+                yield "event: error\ndata: {\"error\": \"Job expired\"}\n\n"
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {current_app.json.dumps({'job_id': job_id, 'status': last_status})}\n\n"
+            if job["status"] == "done":
+                yield f"event: result\ndata: {current_app.json.dumps(job['result'])}\n\n"
+                return
+            if job["status"] in ("failed", "cancelled"):
+                yield f"event: error\ndata: {current_app.json.dumps({'error': job['error'] or 'Job ' + job['status']})}\n\n"
+                return
+            time.sleep(0.1)
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+# -------------------------
+# Admin
+# -------------------------
+def is_admin_request():
+    """X-Admin-Token must match ADMIN_TOKEN; without a token only localhost is trusted"""
+    token = os.environ.get("ADMIN_TOKEN")
+    if token:
+        return request.headers.get("X-Admin-Token") == token
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+@api.route("/api/admin/reload", methods=["POST"])
+def reload_bylaws():
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        force = request.args.get("force", "false").lower() == "true"
+        reloaded, snapshot = regulations.reload_snapshot(force=force)
+        return jsonify({"status": "success", "reloaded": reloaded, "snapshot": snapshot.summary()}), 200
+    except regulations.BylawDataError as e:
+        return jsonify({"error": "Bylaw files failed validation", "details": e.errors, "snapshot": regulations.current_snapshot().summary()}), 422
     except Exception as e:
-        print(f"❌ Error in generate_plan: {str(e)}")
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return error_response("bylaw_reload_failed", e)
 
 # -------------------------
 # COST ESTIMATION & CONSTRUCTION ENDPOINTS
 # -------------------------
-@app.route("/api/cost-estimate", methods=["POST"])
+@api.route("/api/cost-estimate", methods=["POST"])
 def save_cost_estimate():
     try:
         data = request.json
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
         required_fields = ["city", "authority", "plotSize", "length", "width", "floors", "totalCost"]
         missing = [f for f in required_fields if f not in data]
         if missing:
             return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
-        estimate_id = f"EST_{int(time.time())}_{data['city']}_{data['plotSize']}"
+        estimate_id = new_estimate_id()
         estimate = {
             "estimate_id": estimate_id,
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
@@ -257,56 +609,152 @@ def save_cost_estimate():
                 "contingency_percent": data.get("contingencyPercent")
             }
         }
-        print(f"✅ Cost estimate saved: {estimate_id}")
+        get_store().save(estimate)
+        log.info("cost_estimate_saved", estimate_id=estimate_id)
         return jsonify({"status": "success", "message": "Cost estimate saved successfully", "estimate": estimate}), 200
     except Exception as e:
-        print(f"❌ Error saving cost estimate: {str(e)}")
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return error_response("save_cost_estimate_failed", e)
+
+@api.route("/api/cost-estimates", methods=["GET"])
+def list_cost_estimates():
+    """Saved estimates, newest first, filtered by city/authority/plotSize/from/to"""
+    try:
+        args = request.args
+        estimates, next_cursor = get_store().query(
+            city=args.get("city"),
+            authority=args.get("authority"),
+            plot_size=args.get("plotSize"),
+            since=parse_date(args.get("from")),
+            until=parse_date(args.get("to"), end_of_day=True),
+            limit=args.get("limit", 50, type=int),
+            cursor=args.get("cursor")
+        )
+        return jsonify({"status": "success", "count": len(estimates), "estimates": estimates, "next_cursor": next_cursor}), 200
+    except EstimateQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return error_response("list_cost_estimates_failed", e)
+
+@api.route("/api/cost-estimates/<estimate_id>", methods=["GET"])
+def get_cost_estimate(estimate_id):
+    try:
+        estimate = get_store().get(estimate_id)
+        if estimate is None:
+            return jsonify({"error": f"Estimate '{estimate_id}' not found"}), 404
+        return jsonify({"status": "success", "estimate": estimate}), 200
+    except Exception as e:
+        return error_response("get_cost_estimate_failed", e)
 
-@app.route("/api/cost-rates", methods=["GET"])
+@api.route("/api/cost-rates", methods=["GET"])
 def get_cost_rates():
     try:
-        rates = {
-            "Lahore": {"material_rates":{"basic":2200,"standard":2600,"premium":3000,"luxury":3500},"labor_rate":500,"electrical_rate":150,"plumbing_rate":100,"finishing_rate":800,"recommended_contingency":5},
-            "Karachi": {"material_rates":{"basic":2300,"standard":2700,"premium":3100,"luxury":3600},"labor_rate":550,"electrical_rate":160,"plumbing_rate":110,"finishing_rate":850,"recommended_contingency":7},
-            "Islamabad": {"material_rates":{"basic":2400,"standard":2800,"premium":3200,"luxury":3700},"labor_rate":600,"electrical_rate":170,"plumbing_rate":120,"finishing_rate":900,"recommended_contingency":6}
-        }
-        print("✅ Cost rates retrieved")
-        return jsonify({"status":"success","rates":rates,"currency":"PKR","unit":"per_sqft","last_updated":"2024-12-06"}), 200
+        return jsonify({"status":"success","rates":COST_RATES,"currency":"PKR","unit":"per_sqft","last_updated":RATES_LAST_UPDATED}), 200
     except Exception as e:
-        print(f"❌ Error getting cost rates: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        return error_response("get_cost_rates_failed", e)
 
-@app.route("/api/plot-dimensions/<city>/<plot_size>", methods=["GET"])
+@api.route("/api/plot-dimensions/<city>/<plot_size>", methods=["GET"])
 def get_plot_dimensions(city, plot_size):
     try:
-        standard_dimensions = {
-            "3-marla": {"length":22.5,"width":30},
-            "5-marla": {"length":25,"width":50},
-            "7-marla": {"length":32.5,"width":56},
-            "10-marla": {"length":35,"width":65},
-            "1-kanal": {"length":45,"width":90},
-            "2-kanal": {"length":90,"width":90},
-            "500-sq-ft": {"length":20,"width":25},
-            "1000-sq-ft": {"length":25,"width":40},
-            "2000-sq-ft": {"length":40,"width":50},
-            "5000-sq-ft": {"length":50,"width":100},
-            "60-119-sq-yd": {"length":20,"width":27},
-            "120-199-sq-yd": {"length":25,"width":36},
-            "200-399-sq-yd": {"length":35,"width":45},
-            "400-999-sq-yd": {"length":50,"width":60}
-        }
-        dimensions = standard_dimensions.get(plot_size)
+        dimensions = regulations.STANDARD_DIMENSIONS.get(plot_size)
         if not dimensions:
-            return jsonify({"error": f"Dimensions not found for plot size: {plot_size}", "available_sizes": list(standard_dimensions.keys())}), 404
-        print(f"✅ Dimensions retrieved for {city}/{plot_size}")
+            return jsonify({"error": f"Dimensions not found for plot size: {plot_size}", "available_sizes": list(regulations.STANDARD_DIMENSIONS.keys())}), 404
         return jsonify({"status":"success","city":city,"plot_size":plot_size,"dimensions":dimensions,"area_sqft":dimensions["length"]*dimensions["width"]}),200
     except Exception as e:
-        print(f"❌ Error getting plot dimensions: {str(e)}")
-        return jsonify({"error": str(e)}),500
+        return error_response("get_plot_dimensions_failed", e)
+
+@api.route("/api/plot-brackets/resolve", methods=["POST"])
+def resolve_plot_brackets():
+    """Resolve real parcels (length x width in ft, or area + unit) to the governing plot size of each authority"""
+    try:
+        data = request.json or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        parcels = data.get("parcels")
+        if not isinstance(parcels, list) or not parcels:
+            return jsonify({"error": "'parcels' must be a non-empty list"}), 400
+        if len(parcels) > MAX_RESOLVE_PARCELS:
+            return jsonify({"error": f"At most {MAX_RESOLVE_PARCELS} parcels per call"}), 400
+        selected = regulations.current_snapshot().plot_brackets(data.get("city"), data.get("authority"))
+        if not selected:
+            return jsonify({"error": "No plot sizes found for that city / authority"}), 404
+        results = []
+        for index, parcel in enumerate(parcels):
+            try:
+                area = parcel_area_sqft(parcel)
+            except PlotAreaError as e:
+                results.append({"index": index, "error": str(e)})
+                continue
+            plot_sizes, matches = [], []
+            for _, brackets in selected:
+                hit = brackets.resolve(area)
+                plot_sizes.append(hit[0] if hit else None)
+                matches.append(hit[1] if hit else "above_largest")
+            results.append({"index": index, "area_sqft": round(area, 2), "plot_sizes": plot_sizes, "matches": matches})
+        return jsonify({
+            "status": "success",
+            "count": len(results),
+            # plot_sizes and matches in each result line up with this list
+            "authorities": [
+                {"city": city, "authority": authority, "brackets": [
+                    {"plot_size": label, "low_sqft": low, "high_sqft": high}
+                    for low, high, label in zip(brackets.lows, brackets.highs, brackets.labels)
+                ]}
+                for (city, authority), brackets in selected
+            ],
+            "results": results
+        }), 200
+    except Exception as e:
+        return error_response("resolve_plot_brackets_failed", e)
 
-@app.route("/api/construction-calculator", methods=["POST"])
+@api.route("/api/buildable-envelope", methods=["POST"])
+def buildable_envelope_footprint():
+    """Buildable footprint per floor of a plot polygon after setbacks, coverage and FAR"""
+    try:
+        result, hit = buildable_envelope.parcel_envelope(regulations.current_snapshot(), request.json)
+        response = jsonify({"status": "success", **result})
+        response.headers["X-Envelope-Cache"] = "hit" if hit else "miss"
+        return response
+    except buildable_envelope.EnvelopeInputError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return error_response("buildable_envelope_failed", e)
+
+@api.route("/api/buildable-envelope/batch", methods=["POST"])
+def buildable_envelope_batch():
+    """Envelopes for a whole housing scheme: {"defaults": {...}, "parcels": [...]}, errors reported per parcel"""
+    try:
+        data = request.json or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        parcels, defaults = data.get("parcels"), data.get("defaults") or {}
+        if not isinstance(parcels, list) or not parcels:
+            return jsonify({"error": "'parcels' must be a non-empty list"}), 400
+        if len(parcels) > buildable_envelope.MAX_ENVELOPE_PARCELS:
+            return jsonify({"error": f"At most {buildable_envelope.MAX_ENVELOPE_PARCELS} parcels per call"}), 400
+        if not isinstance(defaults, dict):
+            return jsonify({"error": "'defaults' must be an object"}), 400
+        snapshot = regulations.current_snapshot()
+        results, hits, failed = [], 0, 0
+        for index, parcel in enumerate(parcels):
+            try:
+                result, hit = buildable_envelope.parcel_envelope(snapshot, parcel, defaults, index)
+            except buildable_envelope.EnvelopeInputError as e:
+                results.append({"index": index, "error": str(e)})
+                failed += 1
+                continue
+            hits += hit
+            results.append(result)
+        return jsonify({
+            "status": "success",
+            "count": len(results),
+            "failed": failed,
+            "cache": {"hits": hits, "misses": len(results) - failed - hits, "global": buildable_envelope.cache.stats()},
+            "results": results
+        }), 200
+    except Exception as e:
+        return error_response("buildable_envelope_batch_failed", e)
+
+@api.route("/api/construction-calculator", methods=["POST"])
 def construction_calculator():
     try:
         data = request.json
@@ -342,16 +790,194 @@ def construction_calculator():
             },
             "totals":{"subtotal":subtotal,"contingency":contingency_cost,"total_cost":total_cost,"cost_per_sqft":cost_per_sqft,"total_in_millions":total_cost/1000000}
         }
-        print(f"✅ Construction cost calculated: PKR {total_cost:,.0f}")
+        log.debug("construction_cost_calculated", total_cost=total_cost)
         return jsonify({"status":"success","breakdown":breakdown,"currency":"PKR"}),200
     except Exception as e:
-        print(f"❌ Error in construction calculator: {str(e)}")
-        traceback.print_exc()
-        return jsonify({"error": str(e)}),500
+        return error_response("construction_calculator_failed", e)
+
+BATCH_STREAM_CHUNK = 5000
+
+@api.route("/api/construction-calculator/batch", methods=["POST"])
+def construction_calculator_batch():
+    """Evaluate a grid or list of calculator scenarios in one vectorized pass"""
+    try:
+        data = request.json or {}
+        inputs = expand_scenarios(data)
+        results = compute_breakdowns(inputs)
+        count = len(results["total_cost"])
+        stream = data.get("stream")
+        if stream:
+            chunks = ({
+                "offset": start,
+                "inputs": columns_to_lists(inputs, start, start + BATCH_STREAM_CHUNK),
+                "results": columns_to_lists(results, start, start + BATCH_STREAM_CHUNK)
+            } for start in range(0, count, BATCH_STREAM_CHUNK))
+            if stream == "array":
+                head = b'{"count":%d,"currency":"PKR","chunks":[' % count
+                return Response(stream_with_context(stream_json_array(chunks, current_app.json.default, head=head, tail=b"]}")),
+                                mimetype="application/json")
+
+            def lines():
+                yield {"count": count, "currency": "PKR"}
+                yield from chunks
+            return Response(stream_with_context(stream_ndjson(lines(), current_app.json.default)),
+                            mimetype="application/x-ndjson")
+        return jsonify({
+            "status": "success",
+            "count": count,
+            "currency": "PKR",
+            "inputs": columns_to_lists(inputs),
+            "results": columns_to_lists(results)
+        }), 200
+    except BatchInputError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return error_response("construction_calculator_batch_failed", e)
+
+@api.route("/api/construction-calculator/simulate", methods=["POST"])
+def simulate_construction_cost():
+    """Monte Carlo spread of the calculator total from per-line rate distributions"""
+    try:
+        result = simulate_costs(request.json or {})
+        log.info("cost_simulation_finished", draws=result["draws"], elapsed_ms=result["elapsed_ms"])
+        return jsonify({"status": "success", "currency": "PKR", **result}), 200
+    except SimulationInputError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return error_response("simulate_construction_cost_failed", e)
+
+@api.route("/api/construction-calculator/takeoff", methods=["POST"])
+def construction_takeoff():
+    """Material quantities (bricks, cement, steel, sand, aggregate) per floor for a portfolio of plots"""
+    try:
+        data = request.json or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        columns = portfolio_columns(regulations.current_snapshot(), data.get("plots"), data.get("defaults"))
+        report = takeoff_report(columns, compute_takeoff(columns), data.get("detail", "floors"))
+        return jsonify({"status": "success", "currency": "PKR", **report}), 200
+    except TakeoffInputError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return error_response("construction_takeoff_failed", e)
+
+# -------------------------
+# Batch
+# -------------------------
+MAX_BATCH_REQUESTS = 50
+# Streams never finish inside a batch, admin calls need the caller's own
+# credentials, and batches must not nest
+BATCH_EXCLUDED_ENDPOINTS = {"api.batch", "api.stream_plan_job", "api.reload_bylaws"}
+
+def batch_item(app, item_id, status, body):
+    """One serialized batch entry; `body` is JSON bytes, spliced in unparsed"""
+    return b'{"body":%s,"id":%s,"status":%d}' % (body.strip(), app.json.dumps(item_id).encode("utf-8"), status)
+
+def batch_error(app, item_id, status, message):
+    return batch_item(app, item_id, status, app.json.dumps({"error": message}).encode("utf-8"))
+
+def dispatch_batch_item(app, adapter, index, item):
+    """Run one sub-request through the normal request pipeline, without HTTP"""
+    item_id = item.get("id", index) if isinstance(item, dict) else index
+    if not isinstance(item, dict) or not isinstance(item.get("path"), str) or not item["path"].startswith("/"):
+        return batch_error(app, item_id, 400, "Each request needs a 'path' starting with '/'")
+    method = str(item.get("method", "GET")).upper()
+    url = urlsplit(item["path"])
+    try:
+        endpoint, _ = adapter.match(url.path, method)
+    except HTTPException as e:
+        return batch_error(app, item_id, e.code, e.description)
+    if endpoint in BATCH_EXCLUDED_ENDPOINTS:
+        return batch_error(app, item_id, 400, f"{method} {url.path} cannot be batched")
+    # A fresh app context gives the sub-request its own `g`; it keeps the
+    # caller's address so admission control counts it against the same client
+    forwarded = request.headers.get("X-Forwarded-For")
+    with app.app_context(), app.test_request_context(
+        url.path, method=method, query_string=url.query, json=item.get("body"),
+        environ_base={"REMOTE_ADDR": request.remote_addr},
+        headers={"X-Forwarded-For": forwarded} if forwarded else None
+    ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            response = app.make_response(error_response("batch_item_failed", e))
+        body = response.get_data()
+        if not response.is_json:
+            body = app.json.dumps(body.decode("utf-8", "replace")).encode("utf-8")
+        return batch_item(app, item_id, response.status_code, body)
+
+@api.route("/api/batch", methods=["POST"])
+def batch():
+    """Several API calls in one round trip: {"requests": [{"id", "method", "path", "body"}]}
+
+    Each entry of "responses" is {"id", "status", "body"} in request order.
+    """
+    try:
+        data = request.json or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        items = data.get("requests")
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "'requests' must be a non-empty list"}), 400
+        if len(items) > MAX_BATCH_REQUESTS:
+            return jsonify({"error": f"At most {MAX_BATCH_REQUESTS} requests per batch"}), 400
+        app = current_app._get_current_object()
+        adapter = app.url_map.bind("localhost")
+        entries = [dispatch_batch_item(app, adapter, index, item) for index, item in enumerate(items)]
+        body = b'{"count":%d,"responses":[%s],"status":"success"}\n' % (len(entries), b",".join(entries))
+        return Response(body, mimetype="application/json")
+    except Exception as e:
+        return error_response("batch_failed", e)
+
+# -------------------------
+# App factory
+# -------------------------
+def create_app(start_watcher=True):
+    """Build the app and load the bylaw snapshot.
+
+    A preforking server should call this once in the parent (gunicorn's
+    preload_app) with start_watcher=False, so every worker shares the loaded
+    bylaws copy-on-write; gunicorn.conf.py then starts a watcher per worker.
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    CORS(app)
+    metrics.install(app)
+    admission.install(app)
+    app.register_blueprint(api)
+    regulations.init_snapshot(lambda obj: serialize_json(obj, app))
+    analyze_data()
+    if start_watcher:
+        regulations.start_watcher(BYLAW_RELOAD_INTERVAL)
+
+    @app.cli.command("build-snapshot")
+    def build_snapshot():
+        """Compile the city JSON files into the binary bylaw snapshot"""
+        header = regulations.compile_snapshot(lambda obj: serialize_json(obj, app))
+        print(f"✅ Wrote {regulations.SNAPSHOT_PATH} ({header['payload_bytes']} bytes, "
+              f"form options ETag {header['form_options_etag']})")
+
+    return app
+
+_default_app = None
+
+def __getattr__(name):
+    """The module-level `app` of `gunicorn app:app` and `flask --app app run`.
+
+    It is built on first access rather than at import, so importing this
+    module (tests, benchmarks, gunicorn.conf.py's factory) loads the bylaws
+    only once.
+    """
+    global _default_app
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _default_app is None:
+        _default_app = create_app()
+    return _default_app
 
 # -------------------------
-# Run Flask
+# Run Flask (development server; see gunicorn.conf.py for production)
 # -------------------------
 if __name__ == "__main__":
-    print("🚀 Starting Flask Backend on http://127.0.0.1:5000")
-    app.run(debug=True, host="127.0.0.1", port=5000)
+    log.info("server_starting", url="http://127.0.0.1:5000")
+    create_app().run(host="127.0.0.1", port=5000, debug=os.environ.get("FLASK_DEBUG") == "1")
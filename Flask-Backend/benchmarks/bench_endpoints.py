@@ -0,0 +1,325 @@
+"""Endpoint latency benchmarks with a regression gate.
+
+    python benchmarks/bench_endpoints.py [--app flask|city-regulation] [--mode client|http]
+        [--url http://127.0.0.1:5000] [--requests 200] [--concurrency 4] [--routes form,bylaws]
+        [--save-baseline] [--check] [--threshold 0.25]
+
+`client` mode drives the app in-process through Flask's test client, which
+measures the handlers without any network. `http` mode sends real requests
+to a running server (app.py on :5000, city-regulation-backend.py on :3001)
+from `--concurrency` threads, each on its own keep-alive connection.
+
+Every route reports p50/p95/p99 latency, throughput and response size.
+--save-baseline writes the run to benchmarks/baselines.json under
+"<app>/<mode>"; --check compares against it and exits 1 when a route's p95
+is more than --threshold slower (and at least --min-delta-ms in absolute
+terms, so sub-millisecond jitter does not fail the gate).
+"""
+import argparse
+import contextlib
+import http.client
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CITY_REGULATION_SCRIPT = os.path.join(os.path.dirname(BACKEND_DIR), "frontend", "scripts", "city-regulation-backend.py")
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_URLS = {"flask": "http://127.0.0.1:5000", "city-regulation": "http://127.0.0.1:3001"}
+
+SELECTION = {
+    "city": "Lahore",
+    "authority": "LDA",
+    "plotSize": "10-marla",
+    "floors": ["ground", "floor-1"],
+    "bedrooms": "4",
+    "washrooms": "Auto-calculated",
+    "publicZones": ["Drawing Room", "TV Lounge"],
+    "serviceZones": ["Garage", "Store"],
+    "kitchenType": "Open Kitchen"
+}
+
+# (name, method, path, json body, writes data)
+SCENARIOS = {
+    "flask": [
+        ("home", "GET", "/", None, False),
+        ("metrics", "GET", "/metrics", None, False),
+        ("form-options", "GET", "/api/form-options", None, False),
+        ("form-options-lahore-lda", "GET", "/api/form-options?city=Lahore&authority=LDA&exclude=raw_bylaws&shared=1",
+         None, False),
+        ("cities", "GET", "/api/cities", None, False),
+        ("authorities", "GET", "/api/cities/Lahore/authorities", None, False),
+        ("bylaws", "GET", "/api/bylaws/Lahore/LDA/10-marla", None, False),
+        ("validate-selection", "POST", "/api/validate-selection", SELECTION, False),
+        ("validate-batch", "POST", "/api/validate-batch", {
+            "defaults": {"city": "Lahore", "authority": "LDA"},
+            "candidates": [{"plotSize": p, "floors": f, "bedrooms": b}
+                           for p in ("5-marla", "10-marla", "1-kanal") for f in (1, 2, 3) for b in range(2, 7)]
+        }, False),
+        ("generate-plan", "POST", "/api/generate-plan", SELECTION, False),
+        ("plan-cache", "GET", "/api/plan-cache", None, False),
+        ("plan-jobs", "GET", "/api/plan-jobs", None, False),
+        ("cost-estimate", "POST", "/api/cost-estimate", {
+            "city": "Lahore", "authority": "LDA", "plotSize": "10 Marla", "length": 35, "width": 65,
+            "floors": 2, "totalCost": 15925000
+        }, True),
+        ("cost-estimates", "GET", "/api/cost-estimates?city=Lahore&limit=20", None, False),
+        ("cost-rates", "GET", "/api/cost-rates", None, False),
+        ("plot-dimensions", "GET", "/api/plot-dimensions/lahore/10-marla", None, False),
+        ("construction-calculator", "POST", "/api/construction-calculator",
+         {"length": 35, "width": 65, "floors": 2}, False),
+        ("construction-calculator-simulate", "POST", "/api/construction-calculator/simulate", {
+            "length": 35, "width": 65, "floors": 2, "city": "Lahore", "draws": 100000, "seed": 1,
+            "rates": {"material": {"dist": "triangular", "low": 2400, "mode": 2600, "high": 3200},
+                      "labor": {"dist": "normal", "mean": 500, "sd": 50}}
+        }, False),
+        ("construction-takeoff", "POST", "/api/construction-calculator/takeoff", {
+            "defaults": {"city": "Lahore", "authority": "LDA"},
+            "plots": [{"plotSize": size, "floors": floors} for size in ("3 Marla", "5 Marla", "10 Marla", "1 Kanal")
+                      for floors in (1, 2, 3)] * 25,
+            "detail": "plots"
+        }, False),
+        ("bylaws-query", "POST", "/api/bylaws/query", {
+            "where": [{"field": "ground_coverage_percent", "op": ">=", "value": 70},
+                      {"field": "max_floors", "op": ">=", "value": 3}, {"field": "far", "op": ">=", "value": 2.5}],
+            "sort": "-max_height_ft"
+        }, False),
+        ("bylaws-search", "GET", "/api/bylaws/search?q=islamabad+plots+that+allow+3+floors+with+0+side+setback&match=any",
+         None, False),
+        # A scheme of 2000 parcels in 8 repeated shapes (rectangles, corner, L, irregular)
+        ("buildable-envelope-batch", "POST", "/api/buildable-envelope/batch", {
+            "defaults": {"city": "Lahore", "authority": "LDA", "orientation": "South"},
+            "parcels": [{"polygon": [[x + column * 80, y + row * 120] for x, y in shape]}
+                        for row in range(50) for column, shape in enumerate((
+                            [[0, 0], [35, 0], [35, 65], [0, 65]], [[0, 0], [30, 0], [30, 50], [0, 50]],
+                            [[0, 0], [45, 0], [45, 90], [0, 90]], [[0, 0], [38, 3], [36, 70], [-2, 66]],
+                            [[0, 0], [60, 0], [60, 30], [30, 30], [30, 60], [0, 60]],
+                            [[0, 0], [50, 0], [50, 40], [25, 70], [0, 70]],
+                            [[0, 0], [40, 0], [40, 25], [55, 25], [55, 80], [0, 80]],
+                            [[0, 0], [42, 0], [42, 75], [0, 75]]) * 5)]
+        }, False),
+        ("plot-brackets-resolve", "POST", "/api/plot-brackets/resolve", {
+            "parcels": [{"length": length, "width": width} for length in range(20, 70, 2) for width in range(30, 110, 2)]
+        }, False),
+        ("batch-plot-screen", "POST", "/api/batch", {"requests": [
+            {"id": "cities", "path": "/api/cities"},
+            {"id": "authorities", "path": "/api/cities/Lahore/authorities"},
+            {"id": "bylaws", "path": "/api/bylaws/Lahore/LDA/10-marla"},
+            {"id": "dimensions", "path": "/api/plot-dimensions/Lahore/10-marla"},
+            {"id": "costRates", "path": "/api/cost-rates"}
+        ]}, False),
+        ("construction-calculator-batch", "POST", "/api/construction-calculator/batch", {
+            "scenarios": {"length": 35, "width": 65},
+            "grid": {"floors": [1, 2, 3], "materialRate": {"start": 2000, "stop": 3000, "num": 50}}
+        }, False),
+    ],
+    "city-regulation": [
+        ("health", "GET", "/health", None, False),
+        ("form-options", "GET", "/api/form-options", None, False),
+        ("bylaws", "GET", "/api/bylaws/lahore/LDA/10-marla", None, False),
+        ("validate-selection", "POST", "/api/validate-selection", SELECTION, False),
+        ("generate-plan", "POST", "/api/generate-plan", SELECTION, False),
+    ]
+}
+
+
+# -------------------------
+# Clients
+# -------------------------
+def load_app(name):
+    """Import the app in-process with its data loaded"""
+    if name == "flask":
+        # Keep benchmark saves out of the real estimates database, and logging off the hot path
+        os.environ.setdefault("ESTIMATE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-"), "estimates.db"))
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        # Measure the handlers, not the rate limiter turning the load away
+        os.environ.setdefault("ADMISSION_ENABLED", "0")
+        sys.path.insert(0, BACKEND_DIR)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as flask_app
+            return flask_app.create_app(start_watcher=False)
+    spec = importlib.util.spec_from_file_location("city_regulation_backend", CITY_REGULATION_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return module.create_app()
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body):
+        response = self.client.open(path, method=method, json=body)
+        data = response.get_data()
+        return response.status_code, len(data)
+
+class HTTPTransport:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+
+    def request(self, method, path, body):
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        data = response.read()
+        return response.status, len(data)
+
+
+# -------------------------
+# Measurement
+# -------------------------
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_route(make_transport, method, path, body, requests, concurrency, warmup):
+    """Send `requests` requests from `concurrency` threads; returns the route's stats"""
+    latencies, sizes, errors = [], [], []
+    lock = threading.Lock()
+    per_worker = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    def worker(count):
+        transport = make_transport()
+        for _ in range(warmup):
+            transport.request(method, path, body)
+        local_latencies, local_sizes, local_errors = [], [], 0
+        for _ in range(count):
+            start = time.perf_counter()
+            status, size = transport.request(method, path, body)
+            local_latencies.append((time.perf_counter() - start) * 1000)
+            local_sizes.append(size)
+            if status >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            sizes.extend(local_sizes)
+            errors.append(local_errors)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, [count for count in per_worker if count]))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "bytes": round(statistics.fmean(sizes)) if sizes else 0
+    }
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Routes whose p95 regressed past the threshold, as printable lines"""
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        delta = stats["p95_ms"] - before["p95_ms"]
+        if delta > min_delta_ms and stats["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f} ms -> {stats['p95_ms']:.2f} ms "
+                               f"(+{delta / before['p95_ms'] * 100 if before['p95_ms'] else 0:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", choices=sorted(SCENARIOS), default="flask")
+    parser.add_argument("--mode", choices=["client", "http"], default="client")
+    parser.add_argument("--url", help="server for http mode (default: the app's dev server)")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per route")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=3, help="unmeasured requests per thread and route")
+    parser.add_argument("--routes", help="comma-separated route names to run (default: all)")
+    parser.add_argument("--include-writes", action="store_true",
+                        help="in http mode, also run routes that save data on the server")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any route regressed against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p95 slowdown as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    scenarios = SCENARIOS[args.app]
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        scenarios = [s for s in scenarios if s[0] in wanted]
+    if args.mode == "http" and not args.include_writes:
+        scenarios = [s for s in scenarios if not s[4]]
+
+    if args.mode == "client":
+        app = load_app(args.app)
+        make_transport = lambda: TestClientTransport(app)  # noqa: E731
+    else:
+        url = args.url or DEFAULT_URLS[args.app]
+        make_transport = lambda: HTTPTransport(url)  # noqa: E731
+
+    key = f"{args.app}/{args.mode}"
+    print(f"\n{key}: {args.requests} requests per route, concurrency {args.concurrency}")
+    print(f"{'route':32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>9} {'bytes':>9} {'errors':>7}")
+    results = {}
+    for name, method, path, body, _ in scenarios:
+        # The handlers print progress; keep that out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = run_route(make_transport, method, path, body, args.requests, args.concurrency, args.warmup)
+        results[name] = stats
+        print(f"{name:32} {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} {stats['p99_ms']:8.2f} "
+              f"{stats['rps']:9.1f} {stats['bytes']:9d} {stats['errors']:7d}")
+
+    try:
+        with open(args.baselines, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        baselines = {}
+
+    status = 0
+    if args.check:
+        baseline = baselines.get(key, {}).get("routes")
+        if baseline is None:
+            print(f"\nNo baseline for {key} in {args.baselines}; run with --save-baseline first")
+            status = 1
+        else:
+            regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+            if regressions:
+                print(f"\n❌ {len(regressions)} route(s) regressed more than {args.threshold:.0%}:")
+                for line in regressions:
+                    print(f"  {line}")
+                status = 1
+            else:
+                print(f"\n✅ No route regressed more than {args.threshold:.0%} against the baseline")
+
+    if args.save_baseline:
+        baselines[key] = {
+            "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "routes": results
+        }
+        with open(args.baselines, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline for {key} to {args.baselines}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Layout solver timing per plot size.
+
+    python benchmarks/bench_layout.py [--budgets 50,250,1000] [--repeat 3]
+    python benchmarks/bench_layout.py --incremental [--repeat 3]
+
+For every plot with standard dimensions, solves a typical family-home
+program at each budget and prints the wall time, when the best layout was
+found, and its penalty score (lower is better).
+
+--incremental solves the program once, then applies each of EDITS to it
+three ways: a cold solve on the default budget, a cold solve on the
+incremental budget, and a re-solve warm-started from the first plan. It
+prints the median time and mean score of each, plus how many floors the
+re-solve could reuse untouched.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import regulations  # noqa: E402
+from plan_layout import (  # noqa: E402
+    DEFAULT_BUDGET_MS, INCREMENTAL_BUDGET_MS, PlanInputError, canonical_configuration, solve_plan
+)
+
+PROGRAM = {
+    "floors": ["ground", "floor-1", "floor-2"],
+    "bedrooms": 4,
+    "washrooms": "Auto-calculated",
+    "public_zones": ["Drawing Room", "TV Lounge"],
+    "service_zones": ["Garage", "Store"],
+    "kitchen_type": "Open Kitchen"
+}
+# One-field edits a user makes between two generate-plan calls
+EDITS = {
+    "bedrooms 4 -> 5": {"bedrooms": 5},
+    "open -> closed kitchen": {"kitchen_type": "Closed Kitchen"},
+    "+ laundry": {"service_zones": ["Garage", "Store", "Laundry"]},
+    "- TV lounge": {"public_zones": ["Drawing Room"]}
+}
+
+
+def standard_plots(cities_data):
+    for city, city_data in cities_data.items():
+        for authority, authority_data in city_data["authorities"].items():
+            for label, plot_data in authority_data["plot_sizes"].items():
+                dimensions = regulations.STANDARD_DIMENSIONS.get(regulations.plot_size_slug(label))
+                if dimensions:
+                    yield f"{city}/{authority}/{label}", plot_data, dimensions["length"], dimensions["width"]
+
+
+def bench_incremental(cities_data, repeat):
+    print(f"\n{'edit':24} {'plots':>5} {'cold ms':>8} {'score':>7} "
+          f"{'cold@inc ms':>11} {'score':>7} {'incr ms':>8} {'score':>7} {'reused':>7}")
+    rows = {name: [] for name in EDITS}
+    for name, plot_data, length, width in standard_plots(cities_data):
+        try:
+            # Round-tripped through JSON, as the plan cache hands it back
+            previous = json.loads(json.dumps(solve_plan(plot_data, length, width, canonical_configuration(PROGRAM))))
+        except PlanInputError:
+            continue
+        for edit, delta in EDITS.items():
+            config = canonical_configuration({**PROGRAM, **delta})
+            for _ in range(repeat):
+                cold = solve_plan(plot_data, length, width, config, DEFAULT_BUDGET_MS)
+                cold_short = solve_plan(plot_data, length, width, config, INCREMENTAL_BUDGET_MS)
+                incremental = solve_plan(plot_data, length, width, config, previous=previous)
+                rows[edit].append((cold, cold_short, incremental))
+    for edit, runs in rows.items():
+        if not runs:
+            continue
+        cells = []
+        for column in range(3):
+            cells.append(statistics.median(r[column]["solve_ms"] for r in runs))
+            cells.append(statistics.mean(r[column]["score"] for r in runs))
+        reused = sum(len(r[2]["incremental"]["reused_floors"]) for r in runs)
+        floors = sum(len(r[2]["floors"]) for r in runs)
+        print(f"{edit:24} {len(runs) // repeat:5} {cells[0]:8.1f} {cells[1]:7.2f} {cells[2]:11.1f} {cells[3]:7.2f} "
+              f"{cells[4]:8.1f} {cells[5]:7.2f} {reused / floors:7.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budgets", default="50,250,1000", help="comma-separated solver budgets in ms")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--incremental", action="store_true", help="compare cold and warm-started re-solves")
+    args = parser.parse_args()
+    budgets = [float(b) for b in args.budgets.split(",")]
+
+    cities_data = regulations.load_city_data()
+    if args.incremental:
+        bench_incremental(cities_data, args.repeat)
+        return
+    print(f"\n{'plot':40} {'budget':>7} {'solve ms':>9} {'best at':>9} {'score':>8} {'iter/s':>9}")
+    for city, city_data in cities_data.items():
+        for authority, authority_data in city_data["authorities"].items():
+            for label, plot_data in authority_data["plot_sizes"].items():
+                dimensions = regulations.STANDARD_DIMENSIONS.get(regulations.plot_size_slug(label))
+                if not dimensions:
+                    continue
+                for budget in budgets:
+                    runs = []
+                    for _ in range(args.repeat):
+                        try:
+                            runs.append(solve_plan(plot_data, dimensions["length"], dimensions["width"], PROGRAM, budget))
+                        except PlanInputError as e:
+                            print(f"{city}/{authority}/{label}: {e}")
+                            break
+                    if not runs:
+                        break
+                    solve = statistics.median(r["solve_ms"] for r in runs)
+                    best_at = statistics.median(sum(f["best_found_ms"] for f in r["floors"]) for r in runs)
+                    score = statistics.median(r["score"] for r in runs)
+                    iterations = statistics.median(sum(f["iterations"] for f in r["floors"]) for r in runs)
+                    print(f"{city + '/' + authority + '/' + label:40} {budget:7.0f} {solve:9.1f} {best_at:9.1f} "
+                          f"{score:8.2f} {iterations / solve * 1000:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
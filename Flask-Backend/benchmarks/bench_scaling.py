@@ -0,0 +1,94 @@
+"""Throughput scaling with gunicorn worker count.
+
+    python benchmarks/bench_scaling.py [--workers 1,2,4] [--threads 4] [--requests 2000]
+        [--routes bylaws,validate-selection,construction-calculator]
+
+Starts `gunicorn -c gunicorn.conf.py` on a free port for each worker count,
+drives the routes over HTTP from several client processes (so the load
+generator is not itself held back by one GIL) and prints req/s, p95 and the
+speedup over the first worker count. Needs gunicorn (not available on
+Windows).
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_endpoints import BACKEND_DIR, SCENARIOS, HTTPTransport, run_route  # noqa: E402
+
+DEFAULT_ROUTES = "bylaws,validate-selection,construction-calculator,form-options"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workers, threads, port):
+    env = dict(os.environ, LOG_LEVEL="WARNING", ADMISSION_ENABLED="0", GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(threads),
+               GUNICORN_BIND=f"127.0.0.1:{port}")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup; is it installed?")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("gunicorn did not come up within 60s")
+
+def client_process(args):
+    url, method, path, body, requests, concurrency = args
+    return run_route(lambda: HTTPTransport(url), method, path, body, requests, concurrency, warmup=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    cpus = os.cpu_count() or 1
+    parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4, 8) if n <= max(cpus, 1)))
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per route and worker count")
+    parser.add_argument("--clients", type=int, default=max(2, cpus), help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=4, help="connections per client process")
+    parser.add_argument("--routes", default=DEFAULT_ROUTES)
+    args = parser.parse_args()
+
+    wanted = args.routes.split(",")
+    scenarios = [s for s in SCENARIOS["flask"] if s[0] in wanted and not s[4]]
+    worker_counts = [int(n) for n in args.workers.split(",")]
+    print(f"\n{cpus} CPUs, {args.clients} client processes x {args.concurrency} connections, "
+          f"{args.threads} threads per worker")
+    print(f"{'route':28} {'workers':>7} {'req/s':>9} {'p95 ms':>8} {'speedup':>8} {'errors':>7}")
+
+    first = {}
+    with multiprocessing.Pool(args.clients) as clients:
+        for workers in worker_counts:
+            port = free_port()
+            server = start_server(workers, args.threads, port)
+            try:
+                for name, method, path, body, _ in scenarios:
+                    share = max(1, args.requests // args.clients)
+                    runs = clients.map(client_process, [(f"http://127.0.0.1:{port}", method, path, body, share,
+                                                         args.concurrency)] * args.clients)
+                    rps = sum(run["rps"] for run in runs)
+                    p95 = max(run["p95_ms"] for run in runs)
+                    errors = sum(run["errors"] for run in runs)
+                    first.setdefault(name, rps)
+                    print(f"{name:28} {workers:7d} {rps:9.1f} {p95:8.2f} {rps / first[name]:7.2f}x {errors:7d}")
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
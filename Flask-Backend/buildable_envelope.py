@@ -0,0 +1,540 @@
+"""Buildable footprint of an arbitrary plot polygon.
+
+floor_envelopes() in plan_layout assumes a length x width rectangle. This
+module takes the plot as a polygon in feet (x east, y north) and works per
+edge:
+
+    front edge    the edge whose outward normal points closest to the
+                  plot's `orientation` (or `frontEdge` by index)
+    rear edges    edges facing away from the front (within 45 degrees)
+    road edges    extra road frontage on corner plots (`roadEdges`); they
+                  get the front setback
+    side edges    everything else
+
+Every edge is moved inward by its setback. Convex plots are clipped by one
+half-plane per edge. Non-convex plots (L-shapes, irregular parcels) lose one
+convex strip per edge instead: the band within the setback, closed by the
+neighbouring edge at convex corners and by the mitre line at reflex ones,
+so a setback that swallows a whole arm simply removes it. If the strips
+split the plot, the largest part is used and the response says so.
+Coverage beyond the limit is then cut from the rear, parallel to the front
+edge, by bisecting the cut line. Upper floors are trimmed the same way when
+the FAR is exceeded, as floor_envelopes() does for rectangles.
+
+Results are cached by a hash of the plot's shape, with its position
+removed, and the rules applied to it. Identical parcels anywhere in a
+housing scheme share one computation.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+from bylaw_terms import FLOOR_ORDER, parse_far
+from content_cache import canonical_hash
+
+MAX_POLYGON_VERTICES = 64
+MAX_ENVELOPE_PARCELS = 5000
+MAX_ENVELOPE_FLOORS = 10
+ENVELOPE_CACHE_ENTRIES = 20000
+AREA_TOLERANCE_SQFT = 0.01
+REAR_COS = math.cos(math.radians(45))
+
+ORIENTATIONS = {
+    "north": (0.0, 1.0), "south": (0.0, -1.0), "east": (1.0, 0.0), "west": (-1.0, 0.0),
+    "north-east": (math.sqrt(0.5), math.sqrt(0.5)), "north-west": (-math.sqrt(0.5), math.sqrt(0.5)),
+    "south-east": (math.sqrt(0.5), -math.sqrt(0.5)), "south-west": (-math.sqrt(0.5), -math.sqrt(0.5))
+}
+FLOOR_NAMES = FLOOR_ORDER[1:]  # level 0 is the ground floor
+
+
+class EnvelopeInputError(ValueError):
+    """Raised for plots or rules that do not describe a buildable envelope"""
+
+
+# -------------------------
+# Polygon helpers
+# -------------------------
+def polygon_area(points):
+    """Signed area, positive for counter-clockwise vertex order"""
+    total = 0.0
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        total += x1 * y2 - x2 * y1
+    return total / 2
+
+def _cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+def _segments_cross(p1, p2, q1, q2):
+    d1, d2 = _cross(q1, q2, p1), _cross(q1, q2, p2)
+    d3, d4 = _cross(p1, p2, q1), _cross(p1, p2, q2)
+    return d1 * d2 < 0 and d3 * d4 < 0
+
+def is_simple(points):
+    """True if no two non-adjacent edges cross"""
+    n = len(points)
+    for i in range(n):
+        for j in range(i + 2, n):
+            if i == 0 and j == n - 1:
+                continue
+            if _segments_cross(points[i], points[(i + 1) % n], points[j], points[(j + 1) % n]):
+                return False
+    return True
+
+def is_convex(points):
+    """For a counter-clockwise polygon: no reflex corners"""
+    n = len(points)
+    return all(_cross(points[i - 1], points[i], points[(i + 1) % n]) >= -1e-9 for i in range(n))
+
+def edge_normals(points):
+    """Unit outward normal and length of each edge of a counter-clockwise polygon"""
+    normals = []
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        length = math.hypot(x2 - x1, y2 - y1)
+        normals.append(((y2 - y1) / length, -(x2 - x1) / length, length))
+    return normals
+
+def clip_half_plane(points, nx, ny, limit):
+    """Part of the polygon where nx*x + ny*y <= limit (Sutherland-Hodgman)"""
+    result = []
+    n = len(points)
+    for i in range(n):
+        a, b = points[i], points[(i + 1) % n]
+        da, db = nx * a[0] + ny * a[1] - limit, nx * b[0] + ny * b[1] - limit
+        if da <= 0:
+            result.append(a)
+        if (da < 0 < db) or (db < 0 < da):
+            t = da / (da - db)
+            result.append((a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1])))
+    return result
+
+
+def _inside(point, points):
+    """Even-odd point-in-polygon test"""
+    x, y = point
+    inside = False
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def normalize_polygon(polygon, index=None):
+    """Validated counter-clockwise list of (x, y) and the original order flag"""
+    where = f"Parcel {index}: " if index is not None else ""
+    if not isinstance(polygon, list) or not 3 <= len(polygon) <= MAX_POLYGON_VERTICES:
+        raise EnvelopeInputError(f"{where}'polygon' must be a list of 3 to {MAX_POLYGON_VERTICES} [x, y] points in feet")
+    points = []
+    for point in polygon:
+        try:
+            x, y = float(point[0]), float(point[1])
+        except (TypeError, ValueError, IndexError, KeyError):
+            raise EnvelopeInputError(f"{where}polygon points must be [x, y] pairs of numbers") from None
+        if not (math.isfinite(x) and math.isfinite(y)):
+            raise EnvelopeInputError(f"{where}polygon points must be finite")
+        if not points or (x, y) != points[-1]:
+            points.append((x, y))
+    if len(points) > 3 and points[0] == points[-1]:
+        points.pop()
+    area = polygon_area(points)
+    if not math.isfinite(area):
+        raise EnvelopeInputError(f"{where}polygon is too large; coordinates are in feet")
+    if len(points) < 3 or abs(area) < 1e-6:
+        raise EnvelopeInputError(f"{where}polygon has no area")
+    if not is_simple(points):
+        raise EnvelopeInputError(f"{where}polygon edges cross each other")
+    reversed_order = area < 0
+    if reversed_order:
+        points.reverse()
+    return points, reversed_order
+
+
+# -------------------------
+# Setbacks
+# -------------------------
+def _corner_cap(points, normals, setbacks, i, j, vertex, other):
+    """Half-plane (nx, ny, limit) closing edge i's strip at the corner it shares with edge j.
+
+    Convex corner: the neighbour's edge line, so the strip reaches the plot
+    boundary. Reflex corner: the line from the corner to the mitre point of
+    the two offset lines, which the neighbour's strip shares. Collinear
+    edges: the perpendicular through the shared vertex.
+    """
+    (ni_x, ni_y, _), (nj_x, nj_y, _) = normals[i], normals[j]
+    turn = ni_x * nj_y - ni_y * nj_x
+    if j == (i - 1) % len(points):
+        turn = -turn
+    if abs(turn) < 1e-9:
+        ux, uy = vertex[0] - other[0], vertex[1] - other[1]
+        return ux, uy, ux * vertex[0] + uy * vertex[1]
+    a = points[j]
+    cj = nj_x * a[0] + nj_y * a[1]
+    if turn > 0:
+        return nj_x, nj_y, cj
+    ci = ni_x * other[0] + ni_y * other[1] - setbacks[i]
+    cj -= setbacks[j]
+    det = ni_x * nj_y - ni_y * nj_x
+    mitre = ((ci * nj_y - cj * ni_y) / det, (ni_x * cj - nj_x * ci) / det)
+    wx, wy = mitre[1] - vertex[1], vertex[0] - mitre[0]
+    if wx * (other[0] - vertex[0]) + wy * (other[1] - vertex[1]) > 0:
+        wx, wy = -wx, -wy
+    return wx, wy, wx * vertex[0] + wy * vertex[1]
+
+def setback_strips(points, setbacks):
+    """Convex region each edge's setback takes out of the plot, one per edge with a setback"""
+    n = len(points)
+    normals = edge_normals(points)
+    xs, ys = [x for x, _ in points], [y for _, y in points]
+    margin = max(setbacks) + 1
+    box = [(min(xs) - margin, min(ys) - margin), (max(xs) + margin, min(ys) - margin),
+           (max(xs) + margin, max(ys) + margin), (min(xs) - margin, max(ys) + margin)]
+    strips = []
+    for i, setback in enumerate(setbacks):
+        if setback <= 0:
+            continue
+        nx, ny, _ = normals[i]
+        a, b = points[i], points[(i + 1) % n]
+        line = nx * a[0] + ny * a[1]
+        strip = clip_half_plane(box, nx, ny, line)
+        strip = clip_half_plane(strip, -nx, -ny, setback - line)
+        strip = clip_half_plane(strip, *_corner_cap(points, normals, setbacks, i, (i - 1) % n, a, b))
+        strip = clip_half_plane(strip, *_corner_cap(points, normals, setbacks, i, (i + 1) % n, b, a))
+        if len(strip) >= 3:
+            strips.append(strip)
+    return strips
+
+
+def _in_convex(point, polygon):
+    return all(_cross(polygon[k - 1], polygon[k], point) > 0 for k in range(len(polygon)))
+
+def _split_segments(segments, tolerance):
+    """Cut every segment at each point where another one crosses or overlaps it"""
+    cuts = [[0.0, 1.0] for _ in segments]
+    boxes = [(min(p[0], q[0]), min(p[1], q[1]), max(p[0], q[0]), max(p[1], q[1])) for p, q in segments]
+    for s, (p, r) in enumerate(segments):
+        d1 = (r[0] - p[0], r[1] - p[1])
+        length1 = math.hypot(*d1)
+        for t in range(s + 1, len(segments)):
+            if boxes[s][0] > boxes[t][2] + tolerance or boxes[t][0] > boxes[s][2] + tolerance \
+                    or boxes[s][1] > boxes[t][3] + tolerance or boxes[t][1] > boxes[s][3] + tolerance:
+                continue
+            q, u = segments[t]
+            d2 = (u[0] - q[0], u[1] - q[1])
+            length2 = math.hypot(*d2)
+            qp = (q[0] - p[0], q[1] - p[1])
+            denom = d1[0] * d2[1] - d1[1] * d2[0]
+            if abs(denom) <= 1e-9 * length1 * length2:
+                # Parallel: only overlapping collinear segments cut each other, at their ends
+                if abs(d1[0] * qp[1] - d1[1] * qp[0]) <= tolerance * length1:
+                    for end in (q, u):
+                        cuts[s].append(((end[0] - p[0]) * d1[0] + (end[1] - p[1]) * d1[1]) / length1 ** 2)
+                    for end in (p, r):
+                        cuts[t].append(((end[0] - q[0]) * d2[0] + (end[1] - q[1]) * d2[1]) / length2 ** 2)
+                continue
+            along1 = (qp[0] * d2[1] - qp[1] * d2[0]) / denom
+            along2 = (qp[0] * d1[1] - qp[1] * d1[0]) / denom
+            if -tolerance / length1 <= along1 <= 1 + tolerance / length1 \
+                    and -tolerance / length2 <= along2 <= 1 + tolerance / length2:
+                cuts[s].append(along1)
+                cuts[t].append(along2)
+    pieces = []
+    for (p, r), params in zip(segments, cuts):
+        length = math.dist(p, r)
+        params = sorted(min(1.0, max(0.0, t)) for t in params)
+        for t0, t1 in zip(params, params[1:]):
+            if (t1 - t0) * length > tolerance:
+                pieces.append(((p[0] + t0 * (r[0] - p[0]), p[1] + t0 * (r[1] - p[1])),
+                               (p[0] + t1 * (r[0] - p[0]), p[1] + t1 * (r[1] - p[1]))))
+    return pieces
+
+def _simplify(ring, tolerance):
+    """Drop repeated and collinear vertices"""
+    changed = True
+    while changed and len(ring) >= 3:
+        changed = False
+        for k in range(len(ring)):
+            a, b, c = ring[k - 1], ring[k], ring[(k + 1) % len(ring)]
+            if math.dist(a, b) <= tolerance or abs(_cross(a, b, c)) <= tolerance * math.dist(a, c):
+                ring.pop(k)
+                changed = True
+                break
+    return ring
+
+def subtract_strips(points, strips):
+    """Parts of the plot outside every strip, as counter-clockwise polygons, largest first.
+
+    The boundary of the difference lies on the plot's edges and the strips'
+    edges. All of them are cut where they meet; a piece is kept when the
+    buildable region is on exactly one side of it, oriented with that side
+    on the left, and the kept pieces are chained into rings.
+    """
+    xs, ys = [x for x, _ in points], [y for _, y in points]
+    scale = max(max(xs) - min(xs), max(ys) - min(ys), 1.0)
+    tolerance = 1e-7 * scale
+    epsilon = 1e-5 * scale
+
+    def buildable(point):
+        return _inside(point, points) and not any(_in_convex(point, strip) for strip in strips)
+
+    segments = [(polygon[k], polygon[(k + 1) % len(polygon)]) for polygon in [points] + strips
+                for k in range(len(polygon))]
+    boundary = {}
+    for p, r in _split_segments(segments, tolerance):
+        length = math.dist(p, r)
+        mid = ((p[0] + r[0]) / 2, (p[1] + r[1]) / 2)
+        lx, ly = -(r[1] - p[1]) / length * epsilon, (r[0] - p[0]) / length * epsilon
+        left, right = buildable((mid[0] + lx, mid[1] + ly)), buildable((mid[0] - lx, mid[1] - ly))
+        if left != right:
+            piece = (p, r) if left else (r, p)
+            boundary[tuple(round(v / tolerance) for v in piece[0] + piece[1])] = piece
+
+    rings = []
+    pieces = list(boundary.values())
+    while pieces:
+        start, end = pieces.pop()
+        ring = [start]
+        while math.dist(end, ring[0]) > tolerance:
+            following = min(range(len(pieces)), key=lambda k: math.dist(pieces[k][0], end), default=None)
+            if following is None or math.dist(pieces[following][0], end) > tolerance:
+                ring = []
+                break
+            ring.append(end)
+            end = pieces.pop(following)[1]
+        ring = _simplify(ring, tolerance)
+        if len(ring) >= 3 and polygon_area(ring) > AREA_TOLERANCE_SQFT:
+            rings.append(ring)
+    return sorted(rings, key=polygon_area, reverse=True)
+
+def inset_polygon(points, setbacks, convex):
+    """Buildable parts inside the setbacks, largest first; [] when they leave nothing"""
+    if convex:
+        inset = points
+        for (nx, ny, _), setback, a in zip(edge_normals(points), setbacks, points):
+            inset = clip_half_plane(inset, nx, ny, nx * a[0] + ny * a[1] - setback)
+            if len(inset) < 3:
+                return []
+        return [inset] if polygon_area(inset) > AREA_TOLERANCE_SQFT else []
+    return subtract_strips(points, setback_strips(points, setbacks))
+
+def cut_from_rear(points, front_normal, front_point, target_area):
+    """Keep the part of the polygon within some depth of the front edge so its area is `target_area`"""
+    if polygon_area(points) <= target_area + AREA_TOLERANCE_SQFT:
+        return points
+    nx, ny = front_normal
+    front = nx * front_point[0] + ny * front_point[1]
+    # Depth of a point behind the front line; keep depth <= d, i.e. -n.p <= d - front
+    depths = [front - (nx * x + ny * y) for x, y in points]
+    low, high = min(depths), max(depths)
+    kept = points
+    for _ in range(60):
+        depth = (low + high) / 2
+        kept = clip_half_plane(points, -nx, -ny, depth - front)
+        area = polygon_area(kept) if len(kept) >= 3 else 0.0
+        if abs(area - target_area) <= AREA_TOLERANCE_SQFT:
+            break
+        if area > target_area:
+            high = depth
+        else:
+            low = depth
+    return kept
+
+
+# -------------------------
+# Rules and edges
+# -------------------------
+def ccw_edge(i, n, reversed_order):
+    """Counter-clockwise index of edge i (vertex i to i + 1) of the polygon as sent"""
+    if not reversed_order:
+        return i
+    return n - 2 - i if i < n - 1 else n - 1
+
+def front_edge_index(points, normals, orientation=None, front_edge=None, reversed_order=False):
+    """Index (in counter-clockwise order) of the road-facing edge"""
+    n = len(points)
+    if front_edge is not None:
+        if not isinstance(front_edge, int) or isinstance(front_edge, bool) or not 0 <= front_edge < n:
+            raise EnvelopeInputError(f"'frontEdge' must be an edge index from 0 to {n - 1}")
+        return ccw_edge(front_edge, n, reversed_order)
+    if orientation is None:
+        raise EnvelopeInputError("Give 'orientation' (the compass direction the plot faces) or 'frontEdge'")
+    vector = ORIENTATIONS.get(str(orientation).lower().replace(" ", "-"))
+    if vector is None:
+        raise EnvelopeInputError(f"Unknown orientation '{orientation}'; expected one of {', '.join(o.title() for o in ORIENTATIONS)}")
+    # Best aligned outward normal; ties go to the longer edge
+    return max(range(n), key=lambda i: (round(normals[i][0] * vector[0] + normals[i][1] * vector[1], 6), normals[i][2]))
+
+def edge_roles(normals, front, road_edges=()):
+    front_normal = normals[front]
+    roles = []
+    for i, (nx, ny, _) in enumerate(normals):
+        if i == front:
+            roles.append("front")
+        elif i in road_edges:
+            roles.append("road")
+        elif nx * front_normal[0] + ny * front_normal[1] < -REAR_COS:
+            roles.append("rear")
+        else:
+            roles.append("side")
+    return roles
+
+
+def _floor_name(level):
+    return FLOOR_NAMES[level] if level < len(FLOOR_NAMES) else f"floor-{level}"
+
+def compute_envelope(points, setbacks, front, ground_cover, upper_cover, far, floors):
+    """Per-floor footprints of a counter-clockwise polygon; see the module docstring"""
+    plot_area = polygon_area(points)
+    normals = edge_normals(points)
+    parts = inset_polygon(points, setbacks, is_convex(points))
+    if not parts:
+        raise EnvelopeInputError("Setbacks leave no buildable area on this plot")
+    inset = parts[0]
+    front_normal = normals[front][:2]
+    front_point = points[front]
+
+    footprints = []
+    for level in range(floors):
+        cover = ground_cover if level == 0 else upper_cover
+        footprints.append(cut_from_rear(inset, front_normal, front_point, plot_area * cover / 100))
+    areas = [polygon_area(f) for f in footprints]
+    if far and floors > 1 and sum(areas) > far * plot_area:
+        # Trim upper floors evenly so the total meets the FAR
+        upper = sum(areas[1:])
+        ratio = max(0.0, (far * plot_area - areas[0]) / upper) if upper else 0.0
+        for level in range(1, floors):
+            footprints[level] = cut_from_rear(footprints[level], front_normal, front_point, areas[level] * ratio) \
+                if ratio > 0 else []
+            areas[level] = polygon_area(footprints[level]) if len(footprints[level]) >= 3 else 0.0
+    return {
+        "plot_area_sqft": plot_area,
+        "convex": is_convex(points),
+        "setback_polygon": inset,
+        "setback_area_sqft": polygon_area(inset),
+        "other_parts_area_sqft": [polygon_area(part) for part in parts[1:]],
+        "floors": [{"floor": _floor_name(level), "footprint": footprints[level], "area_sqft": areas[level],
+                    "coverage_percent": areas[level] / plot_area * 100} for level in range(floors)]
+    }
+
+
+class EnvelopeCache:
+    """LRU of computed envelopes keyed by shape + rules hash"""
+
+    def __init__(self, max_entries=ENVELOPE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value, True
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value, False
+
+    def stats(self):
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+cache = EnvelopeCache()
+
+
+def _number(parcel, key, index, default):
+    value = parcel.get(key)
+    if value is None:
+        return default
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value) or value < 0:
+        raise EnvelopeInputError(f"Parcel {index}: '{key}' must be a non-negative number")
+    return float(value)
+
+def parcel_rules(snapshot, parcel, area_sqft, index):
+    """(plot size label, bylaw record) for a parcel: its plotSize, else the bracket its area falls in"""
+    city, authority, plot_size = parcel.get("city"), parcel.get("authority"), parcel.get("plotSize")
+    if city is None and authority is None and plot_size is None:
+        return None, {}
+    if plot_size is None:
+        brackets = snapshot.bracket_index.get((city, authority))
+        if brackets is None:
+            raise EnvelopeInputError(f"Parcel {index}: unknown city / authority {city} / {authority}")
+        resolved = brackets.resolve(area_sqft)
+        if resolved is None:
+            raise EnvelopeInputError(f"Parcel {index}: {area_sqft:.0f} sq ft is larger than every plot size of {city} / {authority}")
+        plot_size = resolved[0]
+    entry = snapshot.lookup_plot(city, authority, plot_size)
+    if entry is None:
+        raise EnvelopeInputError(f"Parcel {index}: unknown city, authority or plot size {city} / {authority} / {plot_size}")
+    return entry
+
+def _rounded(points, dx, dy):
+    return [[round(x + dx, 2), round(y + dy, 2)] for x, y in points]
+
+def parcel_envelope(snapshot, parcel, defaults=None, index=0):
+    """Buildable envelope report for one parcel, plus whether it came from the cache"""
+    if not isinstance(parcel, dict):
+        raise EnvelopeInputError(f"Parcel {index}: must be an object")
+    parcel = {**defaults, **parcel} if defaults else parcel
+    points, reversed_order = normalize_polygon(parcel.get("polygon"), index)
+    plot_area = polygon_area(points)
+    plot_size, bylaws = parcel_rules(snapshot, parcel, plot_area, index)
+
+    given = parcel.get("setbacks") or {}
+    if not isinstance(given, dict):
+        raise EnvelopeInputError(f"Parcel {index}: 'setbacks' must be an object with front, rear and side")
+    setback_rules = {**(bylaws.get("setbacks") or {}), **given}
+    setback = {role: _number(setback_rules, role, index, 0.0) for role in ("front", "rear", "side")}
+    ground_cover = _number(parcel, "groundCoverage", index, bylaws.get("ground_coverage_percent", 100))
+    upper_cover = _number(parcel, "upperCoverage", index, bylaws.get("upper_coverage_percent", ground_cover))
+    far = parcel.get("far") if parcel.get("far") is not None else parse_far(bylaws.get("FAR"))
+    if far is not None and (not isinstance(far, (int, float)) or isinstance(far, bool) or far <= 0):
+        raise EnvelopeInputError(f"Parcel {index}: 'far' must be a positive number")
+    floors = parcel.get("floors", bylaws.get("max_floors", 1))
+    if not isinstance(floors, int) or isinstance(floors, bool) or not 1 <= floors <= MAX_ENVELOPE_FLOORS:
+        raise EnvelopeInputError(f"Parcel {index}: 'floors' must be an integer from 1 to {MAX_ENVELOPE_FLOORS}")
+
+    n = len(points)
+    normals = edge_normals(points)
+    front = front_edge_index(points, normals, parcel.get("orientation"), parcel.get("frontEdge"), reversed_order)
+    road_edges = parcel.get("roadEdges") or []
+    if not isinstance(road_edges, list) or not all(isinstance(i, int) and 0 <= i < n for i in road_edges):
+        raise EnvelopeInputError(f"Parcel {index}: 'roadEdges' must be a list of edge indexes")
+    roles = edge_roles(normals, front, {ccw_edge(i, n, reversed_order) for i in road_edges})
+    warnings = []
+    if parcel.get("facing") == "Corner" and "road" not in roles:
+        warnings.append("Corner plot without 'roadEdges': the side road gets the side setback")
+    setbacks = [setback["front" if role == "road" else role] for role in roles]
+
+    # Position-free key: identical parcels anywhere in a scheme share one entry
+    dx, dy = min(x for x, _ in points), min(y for _, y in points)
+    shape = [(round(x - dx, 6), round(y - dy, 6)) for x, y in points]
+    key = canonical_hash({"shape": shape, "setbacks": setbacks, "front": front, "ground": ground_cover,
+                          "upper": upper_cover, "far": far, "floors": floors})
+    result, hit = cache.get_or_compute(
+        key, lambda: compute_envelope(shape, setbacks, front, ground_cover, upper_cover, far, floors)
+    )
+    if result["other_parts_area_sqft"]:
+        areas = ", ".join(f"{area:.0f}" for area in result["other_parts_area_sqft"])
+        warnings.append(f"Setbacks split the plot; only the largest part is used (other parts: {areas} sq ft)")
+    return {
+        "index": index,
+        "plot_size": plot_size,
+        "plot_area_sqft": round(result["plot_area_sqft"], 1),
+        "convex": result["convex"],
+        # Edges in the order the polygon was sent
+        "edges": [{"index": i, "role": roles[ccw_edge(i, n, reversed_order)],
+                   "length_ft": round(normals[ccw_edge(i, n, reversed_order)][2], 2),
+                   "setback_ft": setbacks[ccw_edge(i, n, reversed_order)]} for i in range(n)],
+        "setback_polygon": _rounded(result["setback_polygon"], dx, dy),
+        "setback_area_sqft": round(result["setback_area_sqft"], 1),
+        "floors": [{"floor": f["floor"], "footprint": _rounded(f["footprint"], dx, dy),
+                    "area_sqft": round(f["area_sqft"], 1), "coverage_percent": round(f["coverage_percent"], 2)}
+                   for f in result["floors"]],
+        "warnings": warnings
+    }, hit
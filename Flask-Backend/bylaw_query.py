@@ -0,0 +1,181 @@
+"""Column-oriented index over every plot record for cross-city bylaw queries.
+
+    POST /api/bylaws/query
+    {"where": [{"field": "ground_coverage_percent", "op": ">=", "value": 70},
+               {"field": "max_floors", "op": ">=", "value": 3},
+               {"field": "far", "op": ">=", "value": 2.5}],
+     "sort": "-max_height_ft", "limit": 20}
+
+BylawColumns is built once per snapshot: one float64 array per numeric
+field (missing values are NaN, FAR strings are parsed to ratios) and integer
+codes for city and authority. A query is a handful of vectorized
+comparisons ANDed into one mask plus an argsort, so its cost grows with the
+number of plots, not with the nesting of the city files.
+"""
+import numpy as np
+
+from bylaw_terms import FLOOR_ORDER, parse_far
+from plot_brackets import parse_plot_size
+
+MAX_QUERY_LIMIT = 1000
+DEFAULT_QUERY_LIMIT = 100
+
+OPERATORS = {
+    "==": np.equal, "!=": np.not_equal,
+    "<": np.less, "<=": np.less_equal,
+    ">": np.greater, ">=": np.greater_equal
+}
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+def _floor_total(plot_data, key):
+    """Sum of a per-floor limit over the floors that state it"""
+    total, found = 0.0, False
+    for name in FLOOR_ORDER:
+        floor = (plot_data.get("floors") or {}).get(name)
+        if isinstance(floor, dict) and isinstance(floor.get(key), (int, float)):
+            total += floor[key]
+            found = True
+    return total if found else np.nan
+
+def _far(plot_data):
+    far = parse_far(plot_data.get("FAR"))
+    return np.nan if far is None else far
+
+def _area_bounds(plot_key):
+    return parse_plot_size(plot_key) or (np.nan, np.nan)
+
+# Queryable field -> value for one plot record (plot_key, plot_data)
+QUERY_FIELDS = {
+    "max_floors": lambda key, plot: _number(plot.get("max_floors")),
+    "max_height_ft": lambda key, plot: _number(plot.get("max_height_ft")),
+    "far": lambda key, plot: _far(plot),
+    "ground_coverage_percent": lambda key, plot: _number(plot.get("ground_coverage_percent")),
+    "upper_coverage_percent": lambda key, plot: _number(plot.get("upper_coverage_percent")),
+    "setback_front_ft": lambda key, plot: _number((plot.get("setbacks") or {}).get("front")),
+    "setback_rear_ft": lambda key, plot: _number((plot.get("setbacks") or {}).get("rear")),
+    "setback_side_ft": lambda key, plot: _number((plot.get("setbacks") or {}).get("side")),
+    "bedrooms_max": lambda key, plot: _floor_total(plot, "bedrooms_max"),
+    "bathrooms_max": lambda key, plot: _floor_total(plot, "bathrooms_max"),
+    "area_min_sqft": lambda key, plot: _area_bounds(key)[0],
+    "area_max_sqft": lambda key, plot: _area_bounds(key)[1]
+}
+FIELD_ALIASES = {"FAR": "far"}
+
+
+class BylawQueryError(ValueError):
+    """Malformed /api/bylaws/query body"""
+
+
+def _field(name):
+    field = FIELD_ALIASES.get(name, name)
+    if field not in QUERY_FIELDS:
+        raise BylawQueryError(f"Unknown field '{name}'; expected one of {', '.join(QUERY_FIELDS)}")
+    return field
+
+def _names(value, label):
+    if value is None:
+        return None
+    names = [value] if isinstance(value, str) else value
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise BylawQueryError(f"'{label}' must be a string or a list of strings")
+    return {name.lower() for name in names}
+
+def _names_list(value):
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise BylawQueryError("'fields' must be a list of field names")
+    return value
+
+
+class BylawColumns:
+    """Numeric columns plus city/authority codes for every (city, authority, plot) record"""
+
+    __slots__ = ("cities", "authorities", "city_codes", "authority_codes", "plot_sizes", "columns")
+
+    def __init__(self, cities_data):
+        self.cities, self.authorities, self.plot_sizes = [], [], []
+        city_codes, authority_codes = [], []
+        values = {field: [] for field in QUERY_FIELDS}
+        for city, city_data in cities_data.items():
+            self.cities.append(city)
+            for authority, authority_data in city_data.get("authorities", {}).items():
+                if authority not in self.authorities:
+                    self.authorities.append(authority)
+                for plot_key, plot_data in authority_data.get("plot_sizes", {}).items():
+                    city_codes.append(len(self.cities) - 1)
+                    authority_codes.append(self.authorities.index(authority))
+                    self.plot_sizes.append(plot_key)
+                    for field, extract in QUERY_FIELDS.items():
+                        values[field].append(extract(plot_key, plot_data))
+        self.city_codes = np.array(city_codes, dtype=np.int32)
+        self.authority_codes = np.array(authority_codes, dtype=np.int32)
+        self.columns = {field: np.array(column, dtype=np.float64) for field, column in values.items()}
+
+    def __len__(self):
+        return len(self.plot_sizes)
+
+    def _code_mask(self, names, known, codes):
+        wanted = [code for code, name in enumerate(known) if name.lower() in names]
+        return np.isin(codes, wanted)
+
+    def query(self, body):
+        """(total matches, matching rows) for a query body; see the module docstring"""
+        if not isinstance(body, dict):
+            raise BylawQueryError("Query must be a JSON object")
+        mask = np.ones(len(self), dtype=bool)
+        cities, authorities = _names(body.get("city"), "city"), _names(body.get("authority"), "authority")
+        if cities is not None:
+            mask &= self._code_mask(cities, self.cities, self.city_codes)
+        if authorities is not None:
+            mask &= self._code_mask(authorities, self.authorities, self.authority_codes)
+
+        where = body.get("where") or []
+        if not isinstance(where, list):
+            raise BylawQueryError("'where' must be a list of {field, op, value} conditions")
+        for condition in where:
+            if not isinstance(condition, dict):
+                raise BylawQueryError("Each condition must be an object with field, op and value")
+            column = self.columns[_field(condition.get("field"))]
+            compare = OPERATORS.get(condition.get("op", "=="))
+            if compare is None:
+                raise BylawQueryError(f"Unknown operator '{condition.get('op')}'; expected one of {', '.join(OPERATORS)}")
+            value = condition.get("value")
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise BylawQueryError(f"Condition on '{condition.get('field')}' needs a numeric value")
+            # Missing values (NaN) never match, not even "!="
+            mask &= compare(column, value) & ~np.isnan(column)
+
+        matches = np.flatnonzero(mask)
+        sort = body.get("sort")
+        if sort:
+            if not isinstance(sort, str):
+                raise BylawQueryError("'sort' must be a field name, prefixed with '-' for descending")
+            descending = sort.startswith("-")
+            keys = self.columns[_field(sort.lstrip("-"))][matches]
+            # Stable, so ties keep file order; NaN sorts last either way
+            matches = matches[np.argsort(-keys if descending else keys, kind="stable")]
+
+        limit = body.get("limit", DEFAULT_QUERY_LIMIT)
+        if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_QUERY_LIMIT:
+            raise BylawQueryError(f"'limit' must be an integer from 1 to {MAX_QUERY_LIMIT}")
+        fields = body.get("fields")
+        fields = list(QUERY_FIELDS) if fields is None else [_field(name) for name in _names_list(fields)]
+        return len(matches), self.rows(matches[:limit], fields)
+
+    def rows(self, positions, fields):
+        selected = {field: self.columns[field][positions].tolist() for field in fields}
+        rows = []
+        for offset, position in enumerate(positions.tolist()):
+            row = {
+                "city": self.cities[self.city_codes[position]],
+                "authority": self.authorities[self.authority_codes[position]],
+                "plot_size": self.plot_sizes[position]
+            }
+            for field in fields:
+                value = selected[field][offset]
+                # NaN -> null; whole numbers go back to ints as the city files write them
+                row[field] = None if value != value else int(value) if value.is_integer() else value
+            rows.append(row)
+        return rows
@@ -0,0 +1,316 @@
+"""Inverted index over every plot record for free-text bylaw search.
+
+    GET /api/bylaws/search?q=islamabad plots that allow 4 floors with 0 side setback
+
+Each (city, authority, plot size) record is one document. It is indexed two
+ways when the bylaws load:
+
+    term postings      word -> sorted document ids, for the city and
+                       authority names, the floors a record has, every
+                       per-floor flag that is true ("garage", and
+                       "ground:garage" for the floor it is on) and the words
+                       of any other text value
+    numeric postings   field -> (values, document ids) sorted by value, for
+                       every field of /api/bylaws/query, so a range is two
+                       bisects
+
+A query is split into clauses. "4 floors", "0 side setback", "FAR over 2.5"
+and "coverage >= 70" become range clauses on the field the words name;
+limits such as floors or height default to "at least", setbacks to
+"exactly". "10 marla" becomes an area clause matched against the plot-size
+brackets. Known words become term clauses, and "no"/"without" negates the
+next one. Every matching document scores the idf of each clause it
+satisfies, so rare conditions weigh most. By default only documents that
+meet every clause are returned (match=all); match=any ranks partial
+matches as well.
+"""
+import math
+import re
+import time
+from bisect import bisect_left, bisect_right
+
+from bylaw_query import QUERY_FIELDS
+from bylaw_terms import FLOOR_ORDER
+from plot_brackets import AREA_UNITS, PlotAreaError, unit_factor
+
+MAX_SEARCH_LIMIT = 200
+DEFAULT_SEARCH_LIMIT = 20
+MAX_QUERY_LENGTH = 500
+
+_TOKEN = re.compile(r"\d+(?:\.\d+)?|[a-z]+|>=|<=|[<>=%]")
+
+# Word (or "qualifier word") -> (numeric field, default comparison)
+FIELD_WORDS = {
+    "floors": ("max_floors", ">="), "floor": ("max_floors", ">="), "storeys": ("max_floors", ">="),
+    "storey": ("max_floors", ">="), "stories": ("max_floors", ">="), "story": ("max_floors", ">="),
+    "height": ("max_height_ft", ">="), "high": ("max_height_ft", ">="), "tall": ("max_height_ft", ">="),
+    "far": ("far", ">="),
+    "coverage": ("ground_coverage_percent", ">="), "ground coverage": ("ground_coverage_percent", ">="),
+    "upper coverage": ("upper_coverage_percent", ">="),
+    "front setback": ("setback_front_ft", "=="), "rear setback": ("setback_rear_ft", "=="),
+    "back setback": ("setback_rear_ft", "=="), "side setback": ("setback_side_ft", "=="),
+    "bedrooms": ("bedrooms_max", ">="), "bedroom": ("bedrooms_max", ">="), "beds": ("bedrooms_max", ">="),
+    "bathrooms": ("bathrooms_max", ">="), "bathroom": ("bathrooms_max", ">="),
+    "washrooms": ("bathrooms_max", ">="), "washroom": ("bathrooms_max", ">="), "baths": ("bathrooms_max", ">=")
+}
+QUALIFIERS = {"front", "rear", "back", "side", "ground", "upper"}
+# Words between a number and its field that change nothing: "5 ft side setback", "70 % coverage"
+FILLERS = {"ft", "feet", "foot", "%", "percent", "max", "maximum", "of", "a"}
+COMPARISONS = {
+    ">=": ">=", "<=": "<=", ">": ">", "<": "<", "=": "==",
+    "least": ">=", "min": ">=", "minimum": ">=",
+    "most": "<=", "under": "<", "below": "<", "less": "<", "fewer": "<", "up": "<=",
+    "over": ">", "above": ">", "more": ">", "exactly": "==", "only": "=="
+}
+NEGATIONS = {"no", "without", "not"}
+STOPWORDS = {
+    "which", "what", "where", "show", "list", "find", "me", "all", "any", "plots", "plot", "houses", "house",
+    "allow", "allows", "allowed", "permit", "permits", "permitted", "with", "and", "in", "the", "an", "that",
+    "for", "on", "are", "is", "have", "has", "can", "to", "at", "than", "more", "less", "up", "i", "there",
+    "setback", "setbacks", "of", "a", "floor", "floors"
+}
+
+
+class BylawSearchError(ValueError):
+    """Malformed /api/bylaws/search request"""
+
+
+def _words(text):
+    return _TOKEN.findall(str(text).lower())
+
+
+class BylawSearchIndex:
+    """Term and numeric postings over every (city, authority, plot) record"""
+
+    __slots__ = ("documents", "terms", "numeric")
+
+    def __init__(self, cities_data):
+        self.documents = []   # (city, authority, plot_key, summary)
+        postings = {}
+        values = {field: [] for field in QUERY_FIELDS}
+        for city, city_data in cities_data.items():
+            for authority, authority_data in city_data.get("authorities", {}).items():
+                for plot_key, plot_data in authority_data.get("plot_sizes", {}).items():
+                    doc = len(self.documents)
+                    self.documents.append((city, authority, plot_key, self._summary(plot_data)))
+                    for term in self._terms(city, authority, plot_data):
+                        postings.setdefault(term, set()).add(doc)
+                    for field, extract in QUERY_FIELDS.items():
+                        value = extract(plot_key, plot_data)
+                        if value == value:   # NaN: field not stated, not indexed
+                            values[field].append((float(value), doc))
+        self.terms = {term: tuple(sorted(docs)) for term, docs in postings.items()}
+        self.numeric = {}
+        for field, pairs in values.items():
+            pairs.sort()
+            self.numeric[field] = ([value for value, _ in pairs], [doc for _, doc in pairs])
+
+    @staticmethod
+    def _summary(plot_data):
+        return {key: plot_data[key] for key in
+                ("max_floors", "max_height_ft", "FAR", "ground_coverage_percent", "upper_coverage_percent", "setbacks")
+                if key in plot_data}
+
+    @staticmethod
+    def _terms(city, authority, plot_data):
+        terms = set(_words(city)) | set(_words(authority))
+        floors = plot_data.get("floors") if isinstance(plot_data.get("floors"), dict) else {}
+        for floor, rules in floors.items():
+            terms.add(floor)
+            for key, value in (rules.items() if isinstance(rules, dict) else ()):
+                if value is True:
+                    terms.update((key, f"{floor}:{key}"))
+        for key, value in plot_data.items():
+            if isinstance(value, str) and key not in ("FAR", "plot_size"):
+                terms.update(word for word in _words(value) if word.isalpha())
+        return terms
+
+    def __len__(self):
+        return len(self.documents)
+
+    # -------------------------
+    # Clause evaluation
+    # -------------------------
+    def range_docs(self, field, op, value):
+        values, docs = self.numeric[field]
+        if op == "==":
+            lo, hi = bisect_left(values, value), bisect_right(values, value)
+        elif op == ">=":
+            lo, hi = bisect_left(values, value), len(values)
+        elif op == ">":
+            lo, hi = bisect_right(values, value), len(values)
+        elif op == "<=":
+            lo, hi = 0, bisect_right(values, value)
+        else:
+            lo, hi = 0, bisect_left(values, value)
+        return set(docs[lo:hi])
+
+    def area_docs(self, area_sqft):
+        """Records whose plot-size bracket contains the area"""
+        return self.range_docs("area_min_sqft", "<=", area_sqft) & self.range_docs("area_max_sqft", ">=", area_sqft)
+
+    def parse(self, text):
+        """(clauses, ignored words); a clause is a description plus its matching documents"""
+        tokens = _words(text)
+        clauses, ignored = [], []
+        used = set()
+
+        def field_at(i):
+            """(field, default op, tokens spanned) for a field phrase starting at token i"""
+            if i + 1 < len(tokens) and tokens[i] in QUALIFIERS:
+                phrase = f"{tokens[i]} {tokens[i + 1]}"
+                if phrase in FIELD_WORDS:
+                    return (*FIELD_WORDS[phrase], 2)
+                if tokens[i + 1] in ("setback", "setbacks"):
+                    return (*FIELD_WORDS[f"{tokens[i]} setback"], 2)
+            if i < len(tokens) and tokens[i] in FIELD_WORDS:
+                return (*FIELD_WORDS[tokens[i]], 1)
+            return None
+
+        def comparison_before(i):
+            for j in (i - 1, i - 2):
+                if j >= 0 and j not in used and tokens[j] in COMPARISONS:
+                    return COMPARISONS[tokens[j]], j
+                if j >= 0 and tokens[j] not in FILLERS and tokens[j] not in ("than", "at", "to"):
+                    break
+            return None, None
+
+        def owns_number(k):
+            """True if a number follows token k that has no field word after it"""
+            while k < len(tokens) and (tokens[k] in FILLERS or tokens[k] in COMPARISONS or tokens[k] in ("than", "at", "to")):
+                k += 1
+            if k >= len(tokens) or not tokens[k][0].isdigit():
+                return False
+            k += 1
+            while k < len(tokens) and tokens[k] in FILLERS:
+                k += 1
+            return field_at(k) is None
+
+        for i, token in enumerate(tokens):
+            if i in used or not token[0].isdigit():
+                continue
+            number = float(token)
+            op, op_at = comparison_before(i)
+            # Unit right after the number: a plot area
+            unit = tokens[i + 1] if i + 1 < len(tokens) else None
+            if unit == "sq" and i + 2 < len(tokens):
+                unit = "sq" + tokens[i + 2]
+            try:
+                factor = unit_factor(unit) if unit and unit not in ("ft", "feet", "foot") else None
+            except PlotAreaError:
+                factor = None
+            if factor is not None:
+                span = 3 if tokens[i + 1] == "sq" else 2
+                used.update(range(i, i + span))
+                area = number * factor
+                clauses.append({"kind": "area", "area_sqft": area, "text": f"{token} {unit}",
+                                "docs": self.area_docs(area)})
+                continue
+            # Field after the number ("4 floors", "0 ft side setback") or before it ("far 2.5")
+            found = before = None
+            for start in range(i - 1, max(-1, i - 4), -1):
+                if start in used:
+                    break
+                match = field_at(start)
+                if match and start + match[2] <= i:
+                    before = (match, range(start, i + 1))
+                    break
+            j = i + 1
+            while j < len(tokens) and tokens[j] in FILLERS:
+                j += 1
+            match = field_at(j)
+            # "far over 2.5 coverage >= 70": the next field word has a number of its own
+            if match and not (before and owns_number(j + match[2])):
+                found = (match, range(i, j + match[2]))
+            else:
+                found = before
+            if found is None:
+                continue
+            (field, default_op, _), span = found
+            op = op or default_op
+            used.update(span)
+            if op_at is not None:
+                used.add(op_at)
+            clauses.append({"kind": "range", "field": field, "op": op, "value": number,
+                            "docs": self.range_docs(field, op, number)})
+
+        negate = False
+        everything = set(range(len(self)))
+        for i, token in enumerate(tokens):
+            if i in used:
+                # A range or area clause in between ends the negation: "no 5 ft front setback garage"
+                negate = False
+                continue
+            if token in NEGATIONS:
+                negate = True
+                continue
+            term = None
+            if i + 1 < len(tokens) and f"{token}:{tokens[i + 1]}" in self.terms:
+                term = f"{token}:{tokens[i + 1]}"
+                used.add(i + 1)
+            elif token in self.terms or token in FLOOR_ORDER:
+                term = token
+            elif token.endswith("s") and token[:-1] in self.terms:
+                term = token[:-1]
+            if term is not None:
+                # Floor names are always known words, even when no record has that floor
+                docs = set(self.terms.get(term, ()))
+                clauses.append({"kind": "term", "term": term, "negated": negate,
+                                "docs": everything - docs if negate else docs})
+            elif token in STOPWORDS or token in COMPARISONS or token in FILLERS \
+                    or token in AREA_UNITS or token == "sq":
+                # "without a basement": the negation carries over filler words
+                continue
+            else:
+                ignored.append(token)
+            negate = False
+        return clauses, ignored
+
+    def search(self, text, limit=DEFAULT_SEARCH_LIMIT, match="all"):
+        """Ranked results for a free-text query; see the module docstring"""
+        if not isinstance(text, str) or not text.strip():
+            raise BylawSearchError("'q' is required")
+        if len(text) > MAX_QUERY_LENGTH:
+            raise BylawSearchError(f"'q' must be at most {MAX_QUERY_LENGTH} characters")
+        if match not in ("all", "any"):
+            raise BylawSearchError("'match' must be all or any")
+        if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise BylawSearchError(f"'limit' must be an integer from 1 to {MAX_SEARCH_LIMIT}")
+
+        started = time.perf_counter()
+        clauses, ignored = self.parse(text)
+        total = len(self)
+        scores, matched = {}, {}
+        for index, clause in enumerate(clauses):
+            clause["weight"] = math.log(1 + total / max(1, len(clause["docs"])))
+            for doc in clause["docs"]:
+                scores[doc] = scores.get(doc, 0.0) + clause["weight"]
+                matched.setdefault(doc, []).append(index)
+        if match == "all":
+            docs = [doc for doc, hits in matched.items() if len(hits) == len(clauses)]
+        else:
+            docs = list(matched)
+        docs.sort(key=lambda doc: (-scores[doc], doc))
+
+        results = []
+        for doc in docs[:limit]:
+            city, authority, plot_key, summary = self.documents[doc]
+            results.append({
+                "city": city, "authority": authority, "plot_size": plot_key,
+                "score": round(scores[doc], 3),
+                "matched": len(matched[doc]),
+                "missing": [self.describe(clauses[i]) for i in range(len(clauses)) if i not in matched[doc]],
+                **summary
+            })
+        return {
+            "query": text,
+            "clauses": [dict(self.describe(clause), matches=len(clause["docs"])) for clause in clauses],
+            "ignored": ignored,
+            "total": len(docs),
+            "results": results,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    @staticmethod
+    def describe(clause):
+        return {key: value for key, value in clause.items() if key not in ("docs", "weight")}
@@ -0,0 +1,44 @@
+"""Shared vocabulary for bylaw records: floor names, plot size keys and value parsing
+
+frontend/scripts/city-regulation-backend.py imports this module too, so it
+must stay free of third-party imports.
+"""
+
+FLOOR_ORDER = ("basement", "ground", "first", "second", "third", "fourth")
+FLOOR_ALIASES = {
+    "basement": "basement",
+    "ground": "ground",
+    "first": "first", "floor-1": "first",
+    "second": "second", "floor-2": "second",
+    "third": "third", "floor-3": "third",
+    "fourth": "fourth", "floor-4": "fourth"
+}
+
+UPPER_FLOORS = ("first", "second", "third", "fourth")
+
+
+def parse_far(far):
+    """Numeric floor-area ratio from "1:2.4" style strings, None if unspecified"""
+    if isinstance(far, (int, float)):
+        return float(far)
+    if not isinstance(far, str) or ":" not in far:
+        return None
+    base, _, ratio = far.partition(":")
+    try:
+        return float(ratio) / float(base)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def plot_size_slug(plot_size):
+    """Frontend key for a plot size label ("60-119 Sq Yd" -> "60-119-sq-yd")"""
+    return plot_size.lower().replace(" ", "-").replace("_", "-").replace("(", "").replace(")", "")
+
+def plot_size_aliases(plot_size):
+    """Every spelling of a plot size label that lookups accept"""
+    slug = plot_size_slug(plot_size)
+    snake = slug.replace("-", "_")
+    return (
+        plot_size, plot_size.lower(), plot_size.upper(), plot_size.title(),
+        slug, slug.upper(), snake, snake.upper(),
+    )
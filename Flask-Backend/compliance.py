@@ -0,0 +1,184 @@
+"""Bylaw compliance checks compiled once per plot.
+
+compile_rules() flattens a plot's bylaw record into plain numbers so that
+checking a candidate configuration is a handful of comparisons. The tables
+are plain dicts and tuples, which keeps them cheap to copy into forked
+workers and to pickle.
+"""
+from bylaw_terms import FLOOR_ALIASES, UPPER_FLOORS, parse_far
+
+MAX_BATCH_CANDIDATES = 10000
+
+
+def compile_rules(plot_data):
+    """Flatten one plot's bylaws into a rule table"""
+    setbacks = plot_data.get("setbacks", {})
+    ground_coverage = plot_data.get("ground_coverage_percent", 60)
+    floors = plot_data.get("floors") if isinstance(plot_data.get("floors"), dict) else {}
+    per_floor = {
+        name: (rules.get("bedrooms_max"), rules.get("bathrooms_max"), rules.get("garage", True))
+        for name, rules in floors.items()
+    }
+    bedrooms_range = plot_data.get("bedrooms_range", {"min": 1, "max": 5})
+    return {
+        "max_floors": plot_data.get("max_floors", 2),
+        "max_height_ft": plot_data.get("max_height_ft"),
+        "far": parse_far(plot_data.get("FAR")),
+        "ground_coverage": ground_coverage,
+        "upper_coverage": plot_data.get("upper_coverage_percent", ground_coverage),
+        "setbacks": (setbacks.get("front", 0), setbacks.get("rear", 0), setbacks.get("side", 0)),
+        "bedrooms_range": (bedrooms_range.get("min", 1), bedrooms_range.get("max", 5)),
+        "per_floor": per_floor,
+        "basement": "basement" in floors
+    }
+
+def compile_validators(cities_data):
+    """(city, authority, plot size label) -> compiled rules for every plot"""
+    return {
+        (city, authority, plot_key): compile_rules(plot_data)
+        for city, city_data in cities_data.items()
+        for authority, authority_data in city_data.get("authorities", {}).items()
+        for plot_key, plot_data in authority_data.get("plot_sizes", {}).items()
+    }
+
+
+def _number(value):
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _violation(rule, message, limit=None, actual=None, floor=None):
+    violation = {"rule": rule, "message": message, "limit": limit, "actual": actual}
+    if floor is not None:
+        violation["floor"] = floor
+    return violation
+
+def _floor_names(floors):
+    """Canonical floor names from a list of names or a count"""
+    if isinstance(floors, (int, float)) and not isinstance(floors, bool):
+        return ["ground"] + list(UPPER_FLOORS[:max(0, int(floors) - 1)])
+    names = []
+    for floor in floors or []:
+        name = FLOOR_ALIASES.get(str(floor).lower(), str(floor))
+        if name not in names:
+            names.append(name)
+    return names
+
+# Candidate fields that must be objects or lists when present
+OBJECT_FIELDS = ("coveragePercent", "floorAreas", "setbacks", "perFloor")
+LIST_FIELDS = ("serviceZones",)
+
+def input_errors(candidate):
+    """Violations for candidate fields of the wrong shape; check() refuses to go further past any"""
+    if not isinstance(candidate, dict):
+        return [_violation("input", "Candidate must be an object", actual=type(candidate).__name__)]
+    errors = []
+    floors = candidate.get("floors")
+    if floors is not None and not (isinstance(floors, (int, float, list)) and not isinstance(floors, bool)):
+        errors.append(_violation("input", "'floors' must be a list of floor names or a count", actual=floors))
+    for key in OBJECT_FIELDS:
+        if candidate.get(key) is not None and not isinstance(candidate[key], dict):
+            errors.append(_violation("input", f"'{key}' must be an object", actual=candidate[key]))
+    for key in LIST_FIELDS:
+        if candidate.get(key) is not None and not isinstance(candidate[key], list):
+            errors.append(_violation("input", f"'{key}' must be a list", actual=candidate[key]))
+    per_floor = candidate.get("perFloor")
+    if isinstance(per_floor, dict):
+        for floor, requested in per_floor.items():
+            if requested is not None and not isinstance(requested, dict):
+                errors.append(_violation("input", f"'perFloor.{floor}' must be an object", actual=requested, floor=floor))
+    return errors
+
+def check(rules, candidate, plot_area=None):
+    """Every violation of `rules` by one candidate configuration.
+
+    Recognised candidate keys (all optional): floors (names or a count),
+    bedrooms, washrooms, heightFt, far, coveragePercent {ground, upper},
+    floorAreas {floor: sqft}, setbacks {front, rear, side}, serviceZones,
+    and perFloor {floor: {bedrooms, bathrooms, garage}}. `plot_area` lets
+    FAR and coverage be derived from floorAreas. Fields of the wrong shape
+    are reported as "input" violations instead of being checked.
+    """
+    violations = input_errors(candidate)
+    if violations:
+        return violations
+    floors = _floor_names(candidate.get("floors"))
+    above = [f for f in floors if f != "basement"]
+
+    if len(above) > rules["max_floors"]:
+        violations.append(_violation("max_floors", f"Maximum {rules['max_floors']} floors allowed for this plot size",
+                                     rules["max_floors"], len(above)))
+    if "basement" in floors and not rules["basement"]:
+        violations.append(_violation("basement", "A basement is not allowed for this plot size", False, True))
+
+    height = _number(candidate.get("heightFt"))
+    if height is not None and rules["max_height_ft"] is not None and height > rules["max_height_ft"]:
+        violations.append(_violation("max_height_ft", f"Building height must not exceed {rules['max_height_ft']} ft",
+                                     rules["max_height_ft"], height))
+
+    coverage = dict(candidate.get("coveragePercent") or {})
+    far = _number(candidate.get("far"))
+    floor_areas = {FLOOR_ALIASES.get(str(k).lower(), str(k)): _number(v) for k, v in (candidate.get("floorAreas") or {}).items()}
+    if plot_area and floor_areas:
+        if "ground" in floor_areas and floor_areas["ground"] is not None:
+            coverage.setdefault("ground", floor_areas["ground"] / plot_area * 100)
+        uppers = [floor_areas[f] for f in UPPER_FLOORS if floor_areas.get(f) is not None]
+        if uppers:
+            coverage.setdefault("upper", max(uppers) / plot_area * 100)
+        if far is None:
+            far = sum(v for f, v in floor_areas.items() if v is not None and f != "basement") / plot_area
+    for key, limit in (("ground", rules["ground_coverage"]), ("upper", rules["upper_coverage"])):
+        actual = _number(coverage.get(key))
+        if actual is not None and limit is not None and actual > limit + 1e-9:
+            violations.append(_violation(f"{key}_coverage_percent", f"{key.title()} coverage must not exceed {limit}%",
+                                         limit, round(actual, 2)))
+    if far is not None and rules["far"] is not None and far > rules["far"] + 1e-9:
+        violations.append(_violation("FAR", f"Floor area ratio must not exceed 1:{rules['far']:g}", rules["far"], round(far, 3)))
+
+    setbacks = candidate.get("setbacks") or {}
+    for side, required in zip(("front", "rear", "side"), rules["setbacks"]):
+        actual = _number(setbacks.get(side))
+        if actual is not None and actual < required:
+            violations.append(_violation(f"setback_{side}", f"{side.title()} setback must be at least {required} ft",
+                                         required, actual))
+
+    bedrooms = _number(candidate.get("bedrooms"))
+    washrooms = _number(candidate.get("washrooms"))
+    low, high = rules["bedrooms_range"]
+    if bedrooms is not None and not low <= bedrooms <= high:
+        violations.append(_violation("bedrooms_range", f"Bedrooms must be between {low} and {high}", [low, high], bedrooms))
+
+    per_floor = candidate.get("perFloor") or {}
+    bedroom_cap = bathroom_cap = 0
+    capped = True
+    for floor in above:
+        floor_rule = rules["per_floor"].get(floor)
+        if floor_rule is None:
+            capped = False
+            continue
+        bedrooms_max, bathrooms_max, garage_allowed = floor_rule
+        if bedrooms_max is None or bathrooms_max is None:
+            capped = False
+        else:
+            bedroom_cap += bedrooms_max
+            bathroom_cap += bathrooms_max
+        requested = per_floor.get(floor) or {}
+        for key, rule, limit in (("bedrooms", "bedrooms_max", bedrooms_max), ("bathrooms", "bathrooms_max", bathrooms_max)):
+            actual = _number(requested.get(key))
+            if actual is not None and limit is not None and actual > limit:
+                violations.append(_violation(rule, f"At most {limit} {key} allowed on the {floor} floor", limit, actual, floor))
+        if requested.get("garage") and not garage_allowed:
+            violations.append(_violation("garage", f"A garage is not allowed on the {floor} floor", False, True, floor))
+    if "Garage" in (candidate.get("serviceZones") or []) and "ground" in rules["per_floor"] and not rules["per_floor"]["ground"][2]:
+        violations.append(_violation("garage", "A garage is not allowed on the ground floor", False, True, "ground"))
+    if capped and above:
+        if bedrooms is not None and bedrooms > bedroom_cap:
+            violations.append(_violation("bedrooms_max", f"The selected floors allow at most {bedroom_cap} bedrooms",
+                                         bedroom_cap, bedrooms))
+        if washrooms is not None and washrooms > bathroom_cap:
+            violations.append(_violation("bathrooms_max", f"The selected floors allow at most {bathroom_cap} washrooms",
+                                         bathroom_cap, washrooms))
+    return violations
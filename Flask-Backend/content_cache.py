@@ -0,0 +1,181 @@
+"""Byte caches keyed by content hashes.
+
+MemoryLRU and DiskLRU both store opaque bytes and evict least-recently-used
+entries once a byte budget is exceeded. TieredCache puts the memory tier in
+front of an optional disk tier. Each tier counts its own hits, misses and
+evictions under the lock that guards its entries.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def canonical_hash(obj):
+    """sha256 hex digest of the canonical JSON form of `obj`"""
+    canonical = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryLRU:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[key] = value
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "evictions": self.evictions, "hits": self.hits, "misses": self.misses}
+
+
+class DiskLRU:
+    """Files under `directory`, recency tracked by mtime so it survives restarts"""
+
+    def __init__(self, directory, max_bytes, suffix=".bin"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.bytes = sum(size for _, _, size in self._scan())
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def _scan(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(self.suffix):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_mtime, stat.st_size
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(value)
+        with self._lock:
+            try:
+                self.bytes -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp, path)
+            self.bytes += len(value)
+            if self.bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Drop the oldest files until we are back to 90% of the budget
+        entries = sorted(self._scan(), key=lambda entry: entry[1])
+        self.bytes = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        for path, _, size in entries:
+            if self.bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.bytes -= size
+            self.evictions += 1
+
+    def __len__(self):
+        return sum(1 for _ in self._scan())
+
+    def stats(self):
+        with self._lock:
+            return {"directory": self.directory, "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "evictions": self.evictions, "hits": self.hits, "misses": self.misses}
+
+
+class TieredCache:
+    def __init__(self, max_memory_bytes, directory=None, max_disk_bytes=0, suffix=".bin"):
+        self.memory = MemoryLRU(max_memory_bytes)
+        self.disk = DiskLRU(directory, max_disk_bytes, suffix) if directory else None
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.put(key, value)
+                return value
+        return None
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def stats(self):
+        memory = self.memory.stats()
+        disk = self.disk.stats() if self.disk is not None else None
+        hits = {"memory": memory.pop("hits"), "disk": 0}
+        misses = memory.pop("misses")
+        if disk is not None:
+            # Every memory miss goes on to the disk tier, so its misses are the final ones
+            hits["disk"], misses = disk.pop("hits"), disk.pop("misses")
+        return {"hits": hits, "misses": misses, "memory": memory, "disk": disk}
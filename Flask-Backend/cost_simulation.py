@@ -0,0 +1,317 @@
+"""Monte Carlo cost-risk simulation for the construction calculator.
+
+Each cost line's rate (material, labor, electrical, plumbing, finishing)
+and the contingency percent is either a number or a distribution:
+
+    {"dist": "uniform", "low": 140, "high": 180}
+    {"dist": "triangular", "low": 2400, "mode": 2600, "high": 3200}
+    {"dist": "normal", "mean": 500, "sd": 50}          (truncated at 0)
+    {"dist": "lognormal", "median": 800, "sigma": 0.15}
+
+Draws are generated SIMULATION_CHUNK at a time and folded into fixed-bin
+histograms (one per line plus the total) and running sums, then dropped.
+Memory is therefore set by the chunk size and HISTOGRAM_BINS, whatever the
+draw count. Histogram ranges come from the distributions themselves (the
+normal and lognormal tails are cut at TAIL_SIGMAS), so percentiles are exact
+to within one bin: 1/HISTOGRAM_BINS of the range. Normal draws outside that
+range (below 0 in particular) are never produced: they are sampled by
+inverse CDF over the kept interval, so no mass piles up at the cut and a
+draw costs one uniform however little of the distribution is kept.
+"""
+import math
+import os
+import time
+
+import numpy as np
+
+from costing import CALCULATOR_INPUTS, COST_RATES, CITY_RATE_KEYS
+
+MAX_SIMULATION_DRAWS = int(os.environ.get("MAX_SIMULATION_DRAWS", "10000000"))
+DEFAULT_SIMULATION_DRAWS = 100000
+SIMULATION_CHUNK = 65536
+HISTOGRAM_BINS = 16384
+TAIL_SIGMAS = 8.0
+# Least share of a normal's mass that must lie in its non-negative range
+MIN_NORMAL_MASS = 0.001
+DEFAULT_PERCENTILES = (10, 50, 90)
+
+# Cost line -> calculator input that holds its point rate
+RATE_LINES = {
+    "material": "materialRate",
+    "labor": "laborRate",
+    "electrical": "electricalRate",
+    "plumbing": "plumbingRate",
+    "finishing": "finishingRate"
+}
+LINES = tuple(RATE_LINES) + ("contingency",)
+
+
+class SimulationInputError(ValueError):
+    """Raised for simulation requests that cannot be run"""
+
+
+def _parameter(name, kind, spec, key):
+    try:
+        value = float(spec[key])
+    except (KeyError, TypeError, ValueError):
+        raise SimulationInputError(f"'{name}' {kind} distribution needs a numeric '{key}'") from None
+    if not np.isfinite(value):
+        raise SimulationInputError(f"'{name}' {kind} distribution needs a finite '{key}'")
+    return value
+
+
+# Acklam's rational approximation of the standard normal quantile, relative error below 1.2e-9
+_QUANTILE_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+               1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_QUANTILE_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+               6.680131188771972e+01, -1.328068155288572e+01, 1.0)
+_QUANTILE_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+               -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_QUANTILE_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+               3.754408661907416e+00, 1.0)
+_QUANTILE_TAIL = 0.02425
+
+def _normal_cdf(z):
+    return 0.5 * math.erfc(-z / math.sqrt(2))
+
+def _normal_quantile(p):
+    """Standard normal inverse CDF of an array of probabilities in (0, 1)"""
+    tail = np.minimum(p, 1 - p)
+    q = np.sqrt(-2 * np.log(np.maximum(tail, 1e-300)))
+    x = np.polyval(_QUANTILE_C, q) / np.polyval(_QUANTILE_D, q)
+    x = np.where(p > 0.5, -x, x)
+    central = np.abs(p - 0.5) <= 0.5 - _QUANTILE_TAIL
+    r = (p - 0.5) ** 2
+    return np.where(central, (p - 0.5) * np.polyval(_QUANTILE_A, r) / np.polyval(_QUANTILE_B, r), x)
+
+
+class Distribution:
+    """One sampled input: draw(rng, n), its support (low, high) and point value"""
+
+    __slots__ = ("kind", "params", "low", "high", "point")
+
+    def __init__(self, name, spec):
+        if isinstance(spec, (int, float)) and not isinstance(spec, bool):
+            spec = {"dist": "fixed", "value": spec}
+        if not isinstance(spec, dict):
+            raise SimulationInputError(f"'{name}' must be a number or a distribution object")
+        self.kind = spec.get("dist", "fixed")
+        number = lambda key: _parameter(name, self.kind, spec, key)
+        if self.kind == "fixed":
+            value = number("value")
+            self.params, self.low, self.high, self.point = (value,), value, value, value
+        elif self.kind == "uniform":
+            low, high = number("low"), number("high")
+            self.params, self.low, self.high, self.point = (low, high), low, high, (low + high) / 2
+        elif self.kind == "triangular":
+            low, mode, high = number("low"), number("mode"), number("high")
+            if not low <= mode <= high:
+                raise SimulationInputError(f"'{name}' needs low <= mode <= high")
+            self.params, self.low, self.high, self.point = (low, mode, high), low, high, mode
+        elif self.kind == "normal":
+            mean, sd = number("mean"), number("sd")
+            if sd < 0:
+                raise SimulationInputError(f"'{name}' sd must not be negative")
+            self.low, self.high = max(0.0, mean - TAIL_SIGMAS * sd), max(0.0, mean + TAIL_SIGMAS * sd)
+            # Standardized [low, high], mirrored into the lower half so tail probabilities stay precise
+            sign, lo, hi = 1.0, 0.0, 0.0
+            if sd > 0:
+                lo, hi = (self.low - mean) / sd, (self.high - mean) / sd
+                if lo > 0:
+                    sign, lo, hi = -1.0, -hi, -lo
+            mass = _normal_cdf(hi) - _normal_cdf(lo) if sd > 0 else float(mean >= 0)
+            if mass < MIN_NORMAL_MASS:
+                raise SimulationInputError(f"'{name}' normal distribution lies almost entirely below 0")
+            self.params, self.point = (mean, sd, sign, _normal_cdf(lo), mass), mean
+        elif self.kind == "lognormal":
+            median, sigma = number("median"), number("sigma")
+            if median <= 0 or sigma < 0:
+                raise SimulationInputError(f"'{name}' needs a positive median and non-negative sigma")
+            self.params, self.point = (float(np.log(median)), sigma), median
+            self.low, self.high = median * float(np.exp(-TAIL_SIGMAS * sigma)), median * float(np.exp(TAIL_SIGMAS * sigma))
+        else:
+            raise SimulationInputError(
+                f"Unknown distribution '{self.kind}' for '{name}'; use fixed, uniform, triangular, normal or lognormal"
+            )
+        if self.low < 0 or self.low > self.high:
+            raise SimulationInputError(f"'{name}' must describe non-negative values with low <= high")
+
+    def draw(self, rng, n):
+        if self.kind == "fixed":
+            return np.full(n, self.params[0])
+        if self.kind == "uniform":
+            return rng.uniform(*self.params, n)
+        if self.kind == "triangular":
+            low, mode, high = self.params
+            return rng.triangular(low, mode, high, n) if low < high else np.full(n, low)
+        if self.kind == "normal":
+            mean, sd, sign, start, mass = self.params
+            if sd == 0:
+                return np.full(n, mean)
+            if mass > 1 - 1e-9:
+                # Nothing measurable is cut off (only the TAIL_SIGMAS tails): plain draws are faster
+                return np.clip(rng.normal(mean, sd, n), self.low, self.high)
+            z = _normal_quantile(start + mass * rng.random(n))
+            # The clip only absorbs rounding at the ends of the interval
+            return np.clip(mean + sign * sd * z, self.low, self.high)
+        return np.clip(rng.lognormal(*self.params, n), self.low, self.high)
+
+
+class StreamingHistogram:
+    """Fixed-range, fixed-bin histogram; percentile() interpolates inside a bin"""
+
+    __slots__ = ("low", "high", "counts", "scale")
+
+    def __init__(self, low, high, bins=HISTOGRAM_BINS):
+        self.low, self.high = float(low), float(high)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.scale = bins / (self.high - self.low) if self.high > self.low else 0.0
+
+    def add(self, values):
+        bins = len(self.counts)
+        index = ((values - self.low) * self.scale).astype(np.int64)
+        np.clip(index, 0, bins - 1, out=index)
+        self.counts += np.bincount(index, minlength=bins)
+
+    def percentile(self, q):
+        if self.scale == 0.0:
+            return self.low
+        cumulative = np.cumsum(self.counts)
+        target = q / 100 * int(cumulative[-1])
+        position = int(np.searchsorted(cumulative, target, side="left"))
+        position = min(position, len(self.counts) - 1)
+        before = cumulative[position - 1] if position else 0
+        in_bin = self.counts[position]
+        fraction = (target - before) / in_bin if in_bin else 0.0
+        return self.low + (position + fraction) / self.scale
+
+
+def _rate_inputs(data):
+    """Distribution per rate line plus the contingency percent, defaulting to point rates"""
+    city = data.get("city")
+    if city is not None and city not in COST_RATES:
+        raise SimulationInputError(f"No cost rates for city '{city}'")
+    rates = data.get("rates") or {}
+    if not isinstance(rates, dict):
+        raise SimulationInputError("'rates' must be an object of cost line -> number or distribution")
+    unknown = set(rates) - set(LINES)
+    if unknown:
+        raise SimulationInputError(f"Unknown cost lines: {', '.join(sorted(unknown))}; expected {', '.join(LINES)}")
+    inputs = {}
+    for line, key in RATE_LINES.items():
+        default = CALCULATOR_INPUTS[key]
+        if city is not None:
+            if key == "materialRate":
+                tier = data.get("materialTier", "standard")
+                if tier not in COST_RATES[city]["material_rates"]:
+                    raise SimulationInputError(f"Unknown material tier '{tier}'")
+                default = COST_RATES[city]["material_rates"][tier]
+            else:
+                default = COST_RATES[city][CITY_RATE_KEYS[key]]
+        inputs[line] = Distribution(line, rates.get(line, default))
+    contingency = CALCULATOR_INPUTS["contingencyPercent"] if city is None else COST_RATES[city]["recommended_contingency"]
+    inputs["contingency"] = Distribution("contingency", rates.get("contingency", data.get("contingencyPercent", contingency)))
+    return inputs
+
+
+def _area(data):
+    try:
+        length, width, floors = float(data.get("length", 0)), float(data.get("width", 0)), int(data.get("floors", 0))
+    except (TypeError, ValueError):
+        raise SimulationInputError("Length, width, and floors must be positive numbers")
+    if length <= 0 or width <= 0 or floors <= 0:
+        raise SimulationInputError("Length, width, and floors must be positive numbers")
+    area = length * width * floors
+    if not math.isfinite(area):
+        raise SimulationInputError("Length, width, and floors must be finite")
+    return area
+
+
+def simulate(data):
+    """Run the simulation described by a request body and summarize it"""
+    if not isinstance(data, dict):
+        raise SimulationInputError("Request body must be a JSON object")
+    area = _area(data)
+    inputs = _rate_inputs(data)
+    draws = data.get("draws", DEFAULT_SIMULATION_DRAWS)
+    if not isinstance(draws, int) or isinstance(draws, bool) or not 1 <= draws <= MAX_SIMULATION_DRAWS:
+        raise SimulationInputError(f"'draws' must be an integer from 1 to {MAX_SIMULATION_DRAWS}")
+    percentiles = data.get("percentiles", DEFAULT_PERCENTILES)
+    if not isinstance(percentiles, (list, tuple)) or not percentiles or not all(
+            isinstance(q, (int, float)) and not isinstance(q, bool) and 0 <= q <= 100 for q in percentiles):
+        raise SimulationInputError("'percentiles' must be a list of numbers from 0 to 100")
+    seed = data.get("seed")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2**63)
+    elif not isinstance(seed, int) or isinstance(seed, bool) or seed < 0:
+        raise SimulationInputError("'seed' must be a non-negative integer")
+    rng = np.random.default_rng(seed)
+
+    # Support of every line, and of the total, bounds its histogram
+    bounds = {line: (area * inputs[line].low, area * inputs[line].high) for line in RATE_LINES}
+    subtotal_low = sum(low for low, _ in bounds.values())
+    subtotal_high = sum(high for _, high in bounds.values())
+    bounds["contingency"] = (subtotal_low * inputs["contingency"].low / 100, subtotal_high * inputs["contingency"].high / 100)
+    bounds["total"] = (subtotal_low + bounds["contingency"][0], subtotal_high + bounds["contingency"][1])
+    # Variances square the amounts, so the square must stay finite too
+    if not math.isfinite(bounds["total"][1] * bounds["total"][1]):
+        raise SimulationInputError("Costs overflow; check the plot dimensions and rates")
+    histograms = {name: StreamingHistogram(low, high) for name, (low, high) in bounds.items()}
+
+    # Sums are taken around the point estimate to keep the variances accurate
+    point = {line: area * inputs[line].point for line in RATE_LINES}
+    point["contingency"] = sum(point.values()) * inputs["contingency"].point / 100
+    point["total"] = sum(point.values())
+    sums = {name: 0.0 for name in histograms}
+    squares = {name: 0.0 for name in histograms}
+    cross = {name: 0.0 for name in histograms}  # sum of (line - point) * (total - point)
+
+    started = time.perf_counter()
+    for start in range(0, draws, SIMULATION_CHUNK):
+        n = min(SIMULATION_CHUNK, draws - start)
+        amounts = {line: area * inputs[line].draw(rng, n) for line in RATE_LINES}
+        subtotal = sum(amounts.values())
+        amounts["contingency"] = subtotal * (inputs["contingency"].draw(rng, n) / 100)
+        amounts["total"] = subtotal + amounts["contingency"]
+        total_delta = amounts["total"] - point["total"]
+        for name, values in amounts.items():
+            histograms[name].add(values)
+            delta = values - point[name]
+            sums[name] += float(delta.sum())
+            squares[name] += float(np.dot(delta, delta))
+            cross[name] += float(np.dot(delta, total_delta))
+
+    def moments(name):
+        mean_delta = sums[name] / draws
+        variance = max(squares[name] / draws - mean_delta ** 2, 0.0)
+        return point[name] + mean_delta, variance
+
+    def summary(name):
+        mean, variance = moments(name)
+        histogram = histograms[name]
+        result = {"mean": mean, "sd": variance ** 0.5}
+        result.update({f"p{q:g}": histogram.percentile(q) for q in percentiles})
+        return result
+
+    total_mean, total_variance = moments("total")
+    total_delta_mean = sums["total"] / draws
+    lines = {}
+    for line in LINES:
+        entry = summary(line)
+        entry["share_of_mean"] = entry["mean"] / total_mean if total_mean else 0.0
+        # cov(line, total) / var(total): how much of the spread this line drives
+        covariance = cross[line] / draws - (sums[line] / draws) * total_delta_mean
+        entry["share_of_variance"] = covariance / total_variance if total_variance else 0.0
+        entry["input"] = {"dist": inputs[line].kind, "point": inputs[line].point}
+        lines[line] = entry
+
+    return {
+        "draws": draws,
+        "seed": seed,
+        "construction_area_sqft": area,
+        "point_estimate": point["total"],
+        "total": summary("total"),
+        "lines": lines,
+        "resolution": (bounds["total"][1] - bounds["total"][0]) / HISTOGRAM_BINS,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
@@ -0,0 +1,194 @@
+import math
+import os
+
+import numpy as np
+
+COST_RATES = {
+    "Lahore": {"material_rates":{"basic":2200,"standard":2600,"premium":3000,"luxury":3500},"labor_rate":500,"electrical_rate":150,"plumbing_rate":100,"finishing_rate":800,"recommended_contingency":5},
+    "Karachi": {"material_rates":{"basic":2300,"standard":2700,"premium":3100,"luxury":3600},"labor_rate":550,"electrical_rate":160,"plumbing_rate":110,"finishing_rate":850,"recommended_contingency":7},
+    "Islamabad": {"material_rates":{"basic":2400,"standard":2800,"premium":3200,"luxury":3700},"labor_rate":600,"electrical_rate":170,"plumbing_rate":120,"finishing_rate":900,"recommended_contingency":6}
+}
+RATES_LAST_UPDATED = "2024-12-06"
+
+# Request key -> default, same defaults as /api/construction-calculator
+CALCULATOR_INPUTS = {
+    "length": 0.0,
+    "width": 0.0,
+    "floors": 0,
+    "materialRate": 2600.0,
+    "laborRate": 500.0,
+    "electricalRate": 150.0,
+    "plumbingRate": 100.0,
+    "finishingRate": 800.0,
+    "contingencyPercent": 5.0
+}
+
+# Defaults taken from COST_RATES when the batch names a city
+CITY_RATE_KEYS = {
+    "laborRate": "labor_rate",
+    "electricalRate": "electrical_rate",
+    "plumbingRate": "plumbing_rate",
+    "finishingRate": "finishing_rate",
+    "contingencyPercent": "recommended_contingency"
+}
+
+MAX_BATCH_SCENARIOS = int(os.environ.get("MAX_BATCH_SCENARIOS", "1000000"))
+
+
+class BatchInputError(ValueError):
+    """Raised for batch requests that cannot be expanded into scenarios"""
+
+
+def _values(key, spec):
+    """Turn a scalar, a list or a {start, stop, step|num} range into a 1-D array"""
+    if isinstance(spec, dict):
+        try:
+            start, stop = float(spec["start"]), float(spec["stop"])
+            num = spec.get("num")
+            step = float(spec.get("step", 1))
+        except (KeyError, TypeError, ValueError):
+            raise BatchInputError(f"'{key}' range needs numeric start, stop and step or num")
+        if not all(math.isfinite(v) for v in (start, stop, step)):
+            raise BatchInputError(f"'{key}' range bounds must be finite")
+        # Sized before anything is allocated
+        if num is not None:
+            if not isinstance(num, int) or isinstance(num, bool) or not 1 <= num <= MAX_BATCH_SCENARIOS:
+                raise BatchInputError(f"'{key}' range num must be an integer from 1 to {MAX_BATCH_SCENARIOS}")
+            return np.linspace(start, stop, num)
+        if step <= 0:
+            raise BatchInputError(f"'{key}' range step must be positive")
+        if (stop - start) / step + 1 > MAX_BATCH_SCENARIOS:
+            raise BatchInputError(f"'{key}' range is larger than {MAX_BATCH_SCENARIOS} values")
+        # stop is inclusive, half a step of slack absorbs float error
+        return np.arange(start, stop + step / 2, step)
+    values = list(spec) if isinstance(spec, (list, tuple)) else [spec]
+    if len(values) > MAX_BATCH_SCENARIOS:
+        raise BatchInputError(f"'{key}' has more than {MAX_BATCH_SCENARIOS} values")
+    if key == "materialTier":
+        if not all(isinstance(v, str) for v in values):
+            raise BatchInputError("'materialTier' values must be tier names")
+        return np.asarray(values, dtype=object)
+    try:
+        if any(isinstance(v, (bool, list, dict)) for v in values):
+            raise TypeError
+        array = np.array([float(v) for v in values])
+    except (TypeError, ValueError):
+        raise BatchInputError(f"'{key}' must be a number, a flat list of numbers or a range") from None
+    if not np.isfinite(array).all():
+        raise BatchInputError(f"'{key}' values must be finite")
+    return array
+
+
+def expand_scenarios(data):
+    """Expand a batch request into equal-length input columns.
+
+    "grid" takes the cartesian product of its value lists/ranges; "scenarios"
+    zips columns of equal length (scalars broadcast). Both can be combined, in
+    which case every zipped row is crossed with the grid.
+    """
+    if not isinstance(data, dict):
+        raise BatchInputError("Request body must be a JSON object")
+    city = data.get("city")
+    if city is not None and city not in COST_RATES:
+        raise BatchInputError(f"No cost rates for city '{city}'")
+    grid = data.get("grid") or {}
+    zipped = data.get("scenarios") or {}
+    if not isinstance(grid, dict) or not isinstance(zipped, dict):
+        raise BatchInputError("'grid' and 'scenarios' must be objects of column -> values")
+    allowed = set(CALCULATOR_INPUTS) | {"materialTier"}
+    unknown = (set(grid) | set(zipped)) - allowed
+    if unknown:
+        raise BatchInputError(f"Unknown inputs: {', '.join(sorted(unknown))}")
+    overlap = set(grid) & set(zipped)
+    if overlap:
+        raise BatchInputError(f"Inputs given in both grid and scenarios: {', '.join(sorted(overlap))}")
+
+    zipped_cols = {key: _values(key, spec) for key, spec in zipped.items()}
+    lengths = {len(v) for v in zipped_cols.values() if len(v) != 1}
+    if len(lengths) > 1:
+        raise BatchInputError("All 'scenarios' columns must have the same length")
+    zipped_len = lengths.pop() if lengths else 1
+
+    grid_cols = {key: _values(key, spec) for key, spec in grid.items()}
+    total = zipped_len * math.prod(len(v) for v in grid_cols.values())
+    if total == 0:
+        raise BatchInputError("Batch expands to zero scenarios")
+    if total > MAX_BATCH_SCENARIOS:
+        raise BatchInputError(f"Batch expands to {total} scenarios, the limit is {MAX_BATCH_SCENARIOS}")
+
+    # Row-major cartesian product: zipped rows outermost, then grid keys in order
+    axes = [np.arange(zipped_len)] + [np.arange(len(v)) for v in grid_cols.values()]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    row_index = mesh[0].ravel()
+    columns = {}
+    for key, values in zipped_cols.items():
+        columns[key] = values[row_index] if len(values) > 1 else np.repeat(values, total)
+    for (key, values), index in zip(grid_cols.items(), mesh[1:]):
+        columns[key] = values[index.ravel()]
+
+    if "materialTier" in columns:
+        if "materialRate" in columns:
+            raise BatchInputError("Give either materialTier or materialRate, not both")
+        if city is None:
+            raise BatchInputError("'city' is required when using materialTier")
+        tiers = COST_RATES[city]["material_rates"]
+        bad = sorted({str(t) for t in columns["materialTier"] if t not in tiers})
+        if bad:
+            raise BatchInputError(f"Unknown material tiers: {', '.join(bad)}")
+        columns["materialRate"] = np.array([tiers[t] for t in columns["materialTier"]], dtype=float)
+
+    for key, default in CALCULATOR_INPUTS.items():
+        if key in columns:
+            continue
+        if city is not None and key in CITY_RATE_KEYS:
+            default = COST_RATES[city][CITY_RATE_KEYS[key]]
+        elif city is not None and key == "materialRate":
+            default = COST_RATES[city]["material_rates"]["standard"]
+        columns[key] = np.full(total, default, dtype=float)
+
+    columns["floors"] = np.floor(columns["floors"]).astype(np.int64)
+    invalid = np.flatnonzero((columns["length"] <= 0) | (columns["width"] <= 0) | (columns["floors"] <= 0))
+    if invalid.size:
+        raise BatchInputError(
+            f"Length, width, and floors must be positive numbers ({invalid.size} invalid scenarios, first at index {int(invalid[0])})"
+        )
+    return columns
+
+
+def compute_breakdowns(columns):
+    """Vectorized version of the /api/construction-calculator arithmetic"""
+    with np.errstate(over="ignore", invalid="ignore"):
+        plot_area = columns["length"] * columns["width"]
+        total_area = plot_area * columns["floors"]
+        structural_rate = columns["materialRate"] + columns["laborRate"]
+        structural_cost = total_area * structural_rate
+        electrical_cost = total_area * columns["electricalRate"]
+        plumbing_cost = total_area * columns["plumbingRate"]
+        finishing_cost = total_area * columns["finishingRate"]
+        subtotal = structural_cost + electrical_cost + plumbing_cost + finishing_cost
+        contingency_cost = subtotal * (columns["contingencyPercent"] / 100)
+        total_cost = subtotal + contingency_cost
+    overflow = np.flatnonzero(~np.isfinite(total_cost))
+    if overflow.size:
+        raise BatchInputError(
+            f"Costs overflow in {overflow.size} scenarios, first at index {int(overflow[0])}; check dimensions and rates"
+        )
+    return {
+        "plot_area_sqft": plot_area,
+        "construction_area_sqft": total_area,
+        "structural_rate": structural_rate,
+        "structural": structural_cost,
+        "electrical": electrical_cost,
+        "plumbing": plumbing_cost,
+        "finishing": finishing_cost,
+        "subtotal": subtotal,
+        "contingency": contingency_cost,
+        "total_cost": total_cost,
+        "cost_per_sqft": total_cost / total_area,
+        "total_in_millions": total_cost / 1000000
+    }
+
+
+def columns_to_lists(columns, start=0, stop=None):
+    """JSON-ready slice of a dict of equal-length arrays"""
+    return {key: values[start:stop].tolist() for key, values in columns.items()}
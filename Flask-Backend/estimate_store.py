@@ -0,0 +1,230 @@
+"""Embedded SQLite store for saved cost estimates.
+
+Saves are queued and written by one background thread in batched
+transactions, so a request never waits on an fsync. The database runs in
+WAL mode, which lets readers query while the writer commits. Anything still
+queued when the process dies is lost; call flush() (done at exit and before
+every query) to force it out.
+"""
+import atexit
+import base64
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+from structured_log import get_logger
+
+DB_PATH = os.environ.get("ESTIMATE_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "estimates.db"))
+BATCH_SIZE = int(os.environ.get("ESTIMATE_BATCH_SIZE", "256"))
+FLUSH_INTERVAL = float(os.environ.get("ESTIMATE_FLUSH_INTERVAL", "0.05"))
+MAX_PAGE_SIZE = 200
+
+log = get_logger("estimate_store")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS estimates (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    city TEXT NOT NULL,
+    authority TEXT NOT NULL,
+    plot_size TEXT NOT NULL,
+    total_cost REAL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS estimates_created ON estimates (created_at, id);
+CREATE INDEX IF NOT EXISTS estimates_city ON estimates (city, created_at, id);
+CREATE INDEX IF NOT EXISTS estimates_plot ON estimates (city, authority, plot_size, created_at, id);
+"""
+
+
+class EstimateQueryError(ValueError):
+    """Raised for malformed filters or cursors"""
+
+
+def new_estimate_id():
+    """Random, so two saves in the same second can never collide"""
+    return f"EST_{uuid.uuid4().hex}"
+
+
+class EstimateStore:
+    def __init__(self, path=DB_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # -------------------------
+    # Writes
+    # -------------------------
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            with self._writer_lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._write_loop, name="estimate-writer", daemon=True)
+                    self._writer.start()
+
+    def save(self, estimate, created_at=None):
+        """Queue an estimate dict (as built by /api/cost-estimate) for writing"""
+        details = estimate["project_details"]
+        row = (
+            estimate["estimate_id"],
+            created_at if created_at is not None else time.time(),
+            str(details["city"]),
+            str(details["authority"]),
+            str(details["plot_size"]),
+            _to_float(estimate.get("total_cost")),
+            json.dumps(estimate, separators=(",", ":"))
+        )
+        self._ensure_writer()
+        self._queue.put(row)
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is committed"""
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or waiters:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany("INSERT OR REPLACE INTO estimates VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                    self.written += len(batch)
+                    self.batches += 1
+                except sqlite3.Error as e:
+                    log.error("estimate_write_failed", rows=len(batch), error=str(e))
+            for waiter in waiters:
+                waiter.set()
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def get(self, estimate_id):
+        self.flush()
+        row = self._reader().execute("SELECT payload FROM estimates WHERE id = ?", (estimate_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, city=None, authority=None, plot_size=None, since=None, until=None, limit=50, cursor=None):
+        """Newest-first page of estimates; returns (estimates, next cursor or None).
+
+        Pagination is keyset on (created_at, id), so deep pages cost the same
+        as the first one.
+        """
+        self.flush()
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses, params = [], []
+        for column, value in (("city", city), ("authority", authority), ("plot_size", plot_size)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if cursor:
+            created_at, estimate_id = decode_cursor(cursor)
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend([created_at, estimate_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._reader().execute(
+            f"SELECT created_at, id, payload FROM estimates {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        next_cursor = encode_cursor(rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit else None
+        return [json.loads(payload) for _, _, payload in rows[:limit]], next_cursor
+
+    def stats(self):
+        return {"path": self.path, "queued": self._queue.qsize(), "written": self.written, "batches": self.batches}
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def encode_cursor(created_at, estimate_id):
+    return base64.urlsafe_b64encode(json.dumps([created_at, estimate_id]).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor):
+    try:
+        created_at, estimate_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(created_at), str(estimate_id)
+    except (ValueError, TypeError):
+        raise EstimateQueryError("Invalid cursor")
+
+def parse_date(value, end_of_day=False):
+    """Epoch seconds from "YYYY-MM-DD", "YYYY-MM-DD HH:MM:SS" or a number"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            parsed = time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            continue
+        return parsed + 86400 if end_of_day and fmt == "%Y-%m-%d" else parsed
+    raise EstimateQueryError(f"Invalid date '{value}', use YYYY-MM-DD")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Process-wide store, opened on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EstimateStore()
+                atexit.register(_store.flush)
+    return _store
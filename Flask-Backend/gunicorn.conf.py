@@ -0,0 +1,46 @@
+"""Production serving for app.py.
+
+    gunicorn -c gunicorn.conf.py
+
+preload_app builds the app in the master, so the bylaws are loaded, indexed
+and compiled once before any worker exists. gc.freeze() then moves every
+object allocated so far out of the collector's reach: forked workers keep
+sharing those pages copy-on-write instead of dirtying them on their first
+collection.
+
+Graceful restarts:
+    kill -HUP <master>    replace the workers (same preloaded code and data)
+    kill -USR2 <master>   start a new master with new code and data next to
+                          the old one, then kill -TERM the old master
+Workers are also recycled after max_requests (+ jitter) to bound memory.
+"""
+import gc
+import multiprocessing
+import os
+
+# Every web worker gets its own solver pool; keep the total process count sane
+os.environ.setdefault("PLAN_WORKERS", "1")
+
+wsgi_app = "app:create_app(start_watcher=False)"
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", str(multiprocessing.cpu_count())))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+
+def when_ready(server):
+    gc.collect()
+    gc.freeze()
+    server.log.info("Froze %d objects shared with workers", gc.get_freeze_count())
+
+def post_fork(server, worker):
+    # The master does not run the bylaw watcher; each worker polls for itself
+    import regulations
+    from app import BYLAW_RELOAD_INTERVAL
+    regulations.start_watcher(BYLAW_RELOAD_INTERVAL)
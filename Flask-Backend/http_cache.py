@@ -0,0 +1,66 @@
+import gzip
+import hashlib
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Preferred order when the client accepts several encodings
+ENCODING_PREFERENCE = ("br", "gzip")
+
+
+def build_cached_payload(body, mimetype="application/json"):
+    """Hash and pre-compress a serialized response body once.
+
+    The returned dict is immutable by convention and can be served for every
+    request without touching the original Python objects again.
+    """
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    variants = {"identity": (body, digest)}
+
+    gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+    if len(gzipped) < len(body):
+        variants["gzip"] = (gzipped, f"{digest}-gzip")
+
+    if brotli is not None:
+        brotlied = brotli.compress(body, quality=11)
+        if len(brotlied) < len(body):
+            variants["br"] = (brotlied, f"{digest}-br")
+
+    return {
+        "digest": digest,
+        "mimetype": mimetype,
+        "variants": variants,
+        "etags": frozenset(etag for _, etag in variants.values()),
+    }
+
+
+def negotiate_encoding(payload):
+    """Pick the best stored encoding the client accepts"""
+    accepted = request.accept_encodings
+    for encoding in ENCODING_PREFERENCE:
+        if encoding in payload["variants"] and accepted.quality(encoding) > 0:
+            return encoding
+    return "identity"
+
+
+def serve_cached_payload(payload, cache_control="no-cache"):
+    """Serve a pre-built payload, answering conditional GETs with a 304"""
+    encoding = negotiate_encoding(payload)
+    body, etag = payload["variants"][encoding]
+
+    if_none_match = request.if_none_match
+    if if_none_match and (if_none_match.star_tag or any(tag in payload["etags"] for tag in if_none_match)):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=payload["mimetype"])
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,141 @@
+"""JSON encoding for responses: orjson when installed, the stdlib otherwise.
+
+    app.json = FastJSONProvider(app)
+
+Both encoders produce the bytes Flask's default provider does outside debug
+mode (compact separators, sorted keys, ASCII-only), except that non-finite
+floats are written as null rather than as invalid NaN/Infinity. orjson disagrees
+with the stdlib on a few inputs (exponent floats, non-ASCII text, DEL,
+integers wider than 64 bits); those bodies are re-encoded by the stdlib, so
+which encoder ran never shows in a response or an ETag. JSON_ENCODER=stdlib
+turns orjson off.
+
+stream_ndjson() and stream_json_array() yield large list-shaped results in
+~64 KiB chunks instead of building the whole body first.
+"""
+import json
+import math
+import os
+import re
+
+from flask.json.provider import DefaultJSONProvider
+
+JSON_ENCODER = os.environ.get("JSON_ENCODER", "auto").lower()
+STREAM_CHUNK_BYTES = 64 * 1024
+
+try:
+    if JSON_ENCODER == "stdlib":
+        raise ImportError("JSON_ENCODER=stdlib")
+    import orjson
+    ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+except ImportError:
+    orjson = None
+
+# orjson writes exponents as 1e16 / 1.5e-7 where the stdlib writes 1e+16 /
+# 1.5e-07, and plain 0.00001 where the stdlib switches to 1e-05. The scan
+# starts from the literal "e" (a fast search in the re engine); hits inside
+# strings, such as hex digests, are ruled out by _number_start().
+_EXPONENT = re.compile(rb"e[-0-9]")
+_SMALL_FLOAT = b"0.0000"
+_NUMBER_BYTES = frozenset(b"0123456789.-")
+_VALUE_START = frozenset(b":,[")
+
+def _finite(obj):
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+def _stdlib_dumps(obj, default):
+    try:
+        return json.dumps(obj, default=default, sort_keys=True, separators=(",", ":"), allow_nan=False)
+    except ValueError as e:
+        if "Out of range float" not in str(e):
+            raise
+        # NaN/Infinity are not JSON; write null like orjson does
+        return json.dumps(_finite(obj), default=default, sort_keys=True, separators=(",", ":"))
+
+def _number_start(body, end):
+    """Start of the run of number characters ending at body[end], or -1 if
+    that run is not a whole JSON value (i.e. it is inside a string)"""
+    start = end
+    while start and body[start - 1] in _NUMBER_BYTES:
+        start -= 1
+    return start if start == 0 or body[start - 1] in _VALUE_START else -1
+
+def _needs_stdlib(body):
+    """True if the stdlib would encode this orjson output differently"""
+    if not body.isascii() or b"\x7f" in body:
+        return True
+    for match in _EXPONENT.finditer(body):
+        position = match.start()
+        if position and body[position - 1] in _NUMBER_BYTES and _number_start(body, position) >= 0:
+            return True
+    position = body.find(_SMALL_FLOAT)
+    while position >= 0:
+        start = _number_start(body, position)
+        if start >= 0 and body[start:position] in (b"", b"-"):
+            return True
+        position = body.find(_SMALL_FLOAT, position + 1)
+    return False
+
+def dumps_bytes(obj, default=None):
+    """Canonical JSON bytes for obj (no trailing newline)"""
+    if orjson is not None:
+        try:
+            body = orjson.dumps(obj, default=default, option=ORJSON_OPTIONS)
+        except TypeError:  # orjson.JSONEncodeError: wide ints, non-str keys, ...
+            body = None
+        if body is not None and not _needs_stdlib(body):
+            return body
+    return _stdlib_dumps(obj, default).encode("ascii")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with compact output from dumps_bytes().
+
+    dumps() calls with extra arguments (indent, ...) and pretty-printed
+    debug responses still go through the stdlib path of the base class.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, self.default).decode("ascii")
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj, self.default) + b"\n", mimetype=self.mimetype)
+
+
+def _chunked(parts):
+    buffered, size = [], 0
+    for part in parts:
+        buffered.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_BYTES:
+            yield b"".join(buffered)
+            buffered, size = [], 0
+    if buffered:
+        yield b"".join(buffered)
+
+def stream_ndjson(records, default=None):
+    """One JSON document per line"""
+    return _chunked(dumps_bytes(record, default) + b"\n" for record in records)
+
+def stream_json_array(records, default=None, head=b"[", tail=b"]"):
+    """records as one JSON array; head/tail can wrap it in an object,
+    e.g. head=b'{"count":3,"results":[' and tail=b']}'. A callable tail is
+    called after the last record, for totals gathered while streaming.
+    """
+    def parts():
+        yield head
+        for index, record in enumerate(records):
+            yield b"," + dumps_bytes(record, default) if index else dumps_bytes(record, default)
+        yield tail() if callable(tail) else tail
+    return _chunked(parts())
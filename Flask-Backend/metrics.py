@@ -0,0 +1,173 @@
+"""Per-route request metrics in the Prometheus text format.
+
+install(app) adds request hooks that time every request and count it by
+route template, method and status. Histograms use fixed buckets, so
+recording a request is a bisect and a few integer increments under one lock.
+Counters are per process; with several workers, scrape each one.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.requests = {}       # (route, method, status) -> count
+        self.latency = {}        # (route, method) -> Histogram of seconds
+        self.request_size = {}   # (route, method) -> Histogram of bytes
+        self.response_size = {}  # (route, method) -> Histogram of bytes
+        self.exceptions = {}     # (route, exception type) -> count
+        self.in_flight = {}      # route -> requests being handled
+        self._lock = threading.Lock()
+
+    def start(self, route):
+        with self._lock:
+            self.in_flight[route] = self.in_flight.get(route, 0) + 1
+
+    def finish(self, route):
+        with self._lock:
+            self.in_flight[route] -= 1
+
+    def observe(self, route, method, status, seconds, request_bytes, response_bytes):
+        key = (route, method)
+        with self._lock:
+            counter = (route, method, status)
+            self.requests[counter] = self.requests.get(counter, 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.request_size[key] = Histogram(SIZE_BUCKETS)
+                self.response_size[key] = Histogram(SIZE_BUCKETS)
+            self.latency[key].observe(seconds)
+            if request_bytes is not None:
+                self.request_size[key].observe(request_bytes)
+            if response_bytes is not None:
+                self.response_size[key].observe(response_bytes)
+
+    def count_exception(self, route, exception_type):
+        with self._lock:
+            key = (route, exception_type)
+            self.exceptions[key] = self.exceptions.get(key, 0) + 1
+
+    def render(self):
+        """Prometheus text exposition (format 0.0.4)"""
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total Requests handled, by route template, method and status.",
+                "# TYPE http_requests_total counter"
+            ]
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(route=route, method=method, status=status)} {count}")
+            lines += [
+                "# HELP http_requests_in_flight Requests currently being handled.",
+                "# TYPE http_requests_in_flight gauge"
+            ]
+            for route, count in sorted(self.in_flight.items()):
+                lines.append(f"http_requests_in_flight{_labels(route=route)} {count}")
+            for name, help_text, histograms in (
+                ("http_request_duration_seconds", "Time until the response is handed to the server.", self.latency),
+                ("http_request_size_bytes", "Request body size.", self.request_size),
+                ("http_response_size_bytes", "Response body size (streamed responses are not counted).", self.response_size)
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (route, method), histogram in sorted(histograms.items()):
+                    for bound, count in histogram.cumulative():
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_labels(route=route, method=method, le=le)} {count}")
+                    labels = _labels(route=route, method=method)
+                    lines.append(f"{name}_sum{labels} {histogram.sum:.6g}")
+                    lines.append(f"{name}_count{labels} {histogram.count}")
+            lines += [
+                "# HELP http_request_exceptions_total Exceptions raised while handling requests, by type.",
+                "# TYPE http_request_exceptions_total counter"
+            ]
+            for (route, exception_type), count in sorted(self.exceptions.items()):
+                lines.append(f"http_request_exceptions_total{_labels(route=route, exception=exception_type)} {count}")
+            lines += [
+                "# HELP process_start_time_seconds Start time of the process since the epoch.",
+                "# TYPE process_start_time_seconds gauge",
+                f"process_start_time_seconds {self.started_at:.3f}"
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+
+
+registry = RequestMetrics()
+
+def record_exception(exc):
+    """Count an exception a handler caught and turned into an error response"""
+    if not METRICS_ENABLED:
+        return
+    registry.count_exception(_route(), type(exc).__name__)
+    g._metrics_exception_counted = True
+
+def install(app, metrics=registry):
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_route = _route()
+        g._metrics_start = time.perf_counter()
+        metrics.start(g._metrics_route)
+
+    @app.after_request
+    def _observe(response):
+        start = g.get("_metrics_start")
+        if start is not None:
+            metrics.observe(
+                g._metrics_route, request.method, response.status_code, time.perf_counter() - start,
+                request.content_length,
+                None if response.is_streamed else response.calculate_content_length()
+            )
+        return response
+
+    @app.teardown_request
+    def _finish(exc):
+        # stream_with_context tears the request down a second time once the
+        # body is exhausted; popping the route keeps the gauge balanced
+        route = g.pop("_metrics_route", None)
+        if route is None:
+            return
+        if exc is not None and not g.get("_metrics_exception_counted"):
+            metrics.count_exception(route, type(exc).__name__)
+        metrics.finish(route)
@@ -0,0 +1,136 @@
+"""Bounded local job queue for plan generation.
+
+Jobs run on a ProcessPoolExecutor so solving never holds a Flask request
+thread or the GIL of the serving process. Everything lives in this process:
+no broker, no shared state between Flask workers.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from plan_layout import solve_plan
+
+PLAN_WORKERS = int(os.environ.get("PLAN_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+PLAN_QUEUE_DEPTH = int(os.environ.get("PLAN_QUEUE_DEPTH", "32"))
+PLAN_JOB_TTL = float(os.environ.get("PLAN_JOB_TTL", "600"))
+PLAN_WORKER_START_METHOD = os.environ.get("PLAN_WORKER_START_METHOD")
+
+TERMINAL_STATES = ("done", "failed", "cancelled")
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the number of pending jobs is at PLAN_QUEUE_DEPTH"""
+
+
+_executor = None
+_jobs = {}
+_lock = threading.RLock()  # re-entrant: cancelling runs the done callback inline
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        context = multiprocessing.get_context(PLAN_WORKER_START_METHOD) if PLAN_WORKER_START_METHOD else None
+        _executor = ProcessPoolExecutor(max_workers=PLAN_WORKERS, mp_context=context)
+    return _executor
+
+def _prune(now):
+    expired = [job_id for job_id, job in _jobs.items()
+               if job["status"] in TERMINAL_STATES and now - job["finished_at"] > PLAN_JOB_TTL
+               and job["future"].done()]
+    for job_id in expired:
+        del _jobs[job_id]
+
+def pending_count():
+    """Jobs holding or waiting for a worker; a job cancelled mid-solve counts until its solve returns"""
+    return sum(1 for job in _jobs.values() if job["status"] not in TERMINAL_STATES or not job["future"].done())
+
+def submit(solver_args, on_done):
+    """Queue a solve_plan call; `on_done(layout)` builds the stored result.
+
+    Raises QueueFullError when PLAN_QUEUE_DEPTH jobs are already pending.
+    """
+    now = time.time()
+    with _lock:
+        _prune(now)
+        if pending_count() >= PLAN_QUEUE_DEPTH:
+            raise QueueFullError(f"Plan queue is full ({PLAN_QUEUE_DEPTH} jobs pending)")
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "submitted_at": now,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "future": None
+        }
+        _jobs[job_id] = job
+        job["future"] = _get_executor().submit(solve_plan, *solver_args)
+
+    def finish(future):
+        with _lock:
+            if job["status"] == "cancelled":
+                return
+            try:
+                job["result"] = on_done(future.result())
+                job["status"] = "done"
+            except CancelledError:
+                job["status"] = "cancelled"
+            except Exception as e:
+                job["error"] = f"{type(e).__name__}: {e}"
+                job["status"] = "failed"
+            job["finished_at"] = time.time()
+
+    job["future"].add_done_callback(finish)
+    return job_id
+
+def get(job_id):
+    """Public view of a job, None if unknown or expired"""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        status = job["status"]
+        if status == "queued" and job["future"].running():
+            status = "running"
+        return {
+            "job_id": job_id,
+            "status": status,
+            "submitted_at": job["submitted_at"],
+            "finished_at": job["finished_at"],
+            "error": job["error"],
+            "result": job["result"]
+        }
+
+def cancel(job_id):
+    """Cancel a job; returns its status afterwards or None if unknown.
+
+    Jobs that have not started are removed from the pool. A job that is
+    already solving cannot be interrupted, but it is marked cancelled and
+    its result is discarded; it still counts as pending until it returns.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        if job["status"] not in TERMINAL_STATES:
+            job["status"] = "cancelled"
+            job["finished_at"] = time.time()
+            job["future"].cancel()
+        return job["status"]
+
+def stats():
+    with _lock:
+        counts = {}
+        for job in _jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {
+            "workers": PLAN_WORKERS,
+            "queue_depth_limit": PLAN_QUEUE_DEPTH,
+            "pending": pending_count(),
+            "jobs": counts
+        }
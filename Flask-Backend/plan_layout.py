@@ -0,0 +1,614 @@
+"""Constraint-based floor-plan layout solver.
+
+Each floor is laid out inside its buildable envelope as a stack of strips
+running parallel to the road. Rooms keep their relative target areas and the
+solver searches room order and strip assignment (simulated annealing) to
+minimise a penalty for bad proportions, rooms in the wrong zone of the plot
+and missing adjacencies. The search stops at a wall-clock budget and returns
+the best layout seen so far.
+
+Re-solving a plan after a small edit (one more bedroom, a different kitchen)
+can start from the previous layout: floors whose rooms, envelope and
+stairwell are unchanged are copied over, and the others start annealing from
+the previous strip assignment with the new rooms slotted in, on the much
+smaller INCREMENTAL_BUDGET_MS.
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import time
+
+from bylaw_terms import FLOOR_ALIASES, FLOOR_ORDER, parse_far
+
+DEFAULT_BUDGET_MS = float(os.environ.get("PLAN_SOLVER_BUDGET_MS", "250"))
+MAX_BUDGET_MS = float(os.environ.get("PLAN_SOLVER_MAX_BUDGET_MS", "5000"))
+INCREMENTAL_BUDGET_MS = float(os.environ.get("PLAN_INCREMENTAL_BUDGET_MS", "40"))
+
+# type -> (target area sq ft, minimum side ft, maximum aspect ratio, zone)
+ROOM_TYPES = {
+    "Bedroom": (160, 10, 1.7, "private"),
+    "Washroom": (45, 5, 2.2, "private"),
+    "Drawing Room": (200, 11, 1.8, "public"),
+    "Lounge": (220, 12, 1.8, "public"),
+    "TV Lounge": (200, 11, 1.8, "public"),
+    "Family Room": (200, 11, 1.8, "public"),
+    "Dining Room": (150, 10, 1.8, "public"),
+    "Study Room": (110, 8, 1.8, "private"),
+    "Kitchen": (100, 8, 2.0, "service"),
+    "Store": (40, 5, 2.5, "service"),
+    "Laundry": (45, 5, 2.5, "service"),
+    "Servant Quarter": (90, 7, 2.0, "service"),
+    "Garage": (190, 10, 2.2, "parking"),
+    "Stairs": (80, 6, 3.0, "circulation"),
+    "Circulation": (0, 3, 12.0, "circulation")
+}
+KITCHEN_AREAS = {"Open Kitchen": 120, "Closed Kitchen": 100, "Island Kitchen": 160}
+
+# Preferred depth into the plot, 0 = road side, 1 = rear
+ZONE_DEPTH = {"parking": 0.0, "public": 0.3, "circulation": 0.45, "service": 0.6, "private": 0.85}
+
+# Pairs of room types that should share a wall, with the penalty when they don't
+ADJACENCY = {
+    ("Kitchen", "Dining Room"): 6,
+    ("Kitchen", "Store"): 4,
+    ("Kitchen", "Laundry"): 3,
+    ("Garage", "Drawing Room"): 3
+}
+LIVING_ROOMS = ("Lounge", "TV Lounge", "Family Room", "Dining Room")
+
+# Rooms grow at most this much past their target before the rest becomes circulation
+MAX_ROOM_SCALE = 1.35
+
+
+class PlanInputError(ValueError):
+    """Raised when a plan request cannot be turned into a layout problem"""
+
+
+# -------------------------
+# Envelope
+# -------------------------
+def floor_envelopes(length, width, plot_data, floors):
+    """Buildable rectangle per floor from setbacks, coverage and FAR.
+
+    `length` is the road frontage and `width` the plot depth, matching
+    /api/plot-dimensions. Coordinates are in feet with x along the road and
+    y measured from the front boundary. Coverage beyond the limit is cut from
+    the rear so that every upper floor sits on the ground floor.
+    """
+    setbacks = plot_data.get("setbacks", {})
+    side, front, rear = setbacks.get("side", 0), setbacks.get("front", 0), setbacks.get("rear", 0)
+    plot_area = length * width
+    x0, x1 = side, length - side
+    y0, y1 = front, width - rear
+    if x1 - x0 <= 0 or y1 - y0 <= 0:
+        raise PlanInputError("Setbacks leave no buildable area on this plot")
+
+    ground_cover = plot_data.get("ground_coverage_percent", 60)
+    upper_cover = plot_data.get("upper_coverage_percent", ground_cover)
+    envelopes = {}
+    for floor in floors:
+        cover = ground_cover if floor in ("ground", "basement") else upper_cover
+        depth = min(y1 - y0, plot_area * cover / 100 / (x1 - x0))
+        envelopes[floor] = {"x": x0, "y": y0, "width": x1 - x0, "depth": depth}
+
+    far = parse_far(plot_data.get("FAR"))
+    above = [f for f in floors if f != "basement"]
+    total = sum(envelopes[f]["width"] * envelopes[f]["depth"] for f in above)
+    if far and total > far * plot_area and len(above) > 1:
+        # Trim upper floors evenly so the above-ground total meets the FAR
+        ground = envelopes["ground"]["width"] * envelopes["ground"]["depth"] if "ground" in envelopes else 0
+        upper = total - ground
+        ratio = max(0.0, (far * plot_area - ground) / upper) if upper else 0.0
+        for floor in above:
+            if floor != "ground":
+                envelopes[floor]["depth"] *= ratio
+
+    for env in envelopes.values():
+        env["area"] = env["width"] * env["depth"]
+    return envelopes
+
+
+# -------------------------
+# Room program
+# -------------------------
+def normalize_floors(requested, plot_data):
+    """Canonical floor names in bottom-up order, trimmed to what the bylaws allow"""
+    warnings = []
+    floors = []
+    for name in requested or ["ground"]:
+        floor = FLOOR_ALIASES.get(str(name).lower())
+        if floor is None:
+            raise PlanInputError(f"Unknown floor '{name}'")
+        if floor not in floors:
+            floors.append(floor)
+    if "ground" not in floors:
+        floors.append("ground")
+    floors.sort(key=FLOOR_ORDER.index)
+
+    rules = plot_data.get("floors") if isinstance(plot_data.get("floors"), dict) else {}
+    if "basement" in floors and "basement" not in rules:
+        floors.remove("basement")
+        warnings.append("Basement is not permitted for this plot and was dropped")
+    max_floors = plot_data.get("max_floors", 2)
+    above = [f for f in floors if f != "basement"]
+    if len(above) > max_floors:
+        for floor in above[max_floors:]:
+            floors.remove(floor)
+        warnings.append(f"Only {max_floors} floors are allowed, extra floors were dropped")
+    return floors, warnings
+
+# Configuration keys (and their generate-plan request fields) holding lists of names, or a single name
+LIST_FIELDS = {"floors": "floors", "public_zones": "publicZones", "service_zones": "serviceZones",
+               "special_features": "specialFeatures"}
+NAME_FIELDS = {"kitchen_type": "kitchenType", "orientation": "orientation", "facing": "facing"}
+# Room counts are placed one at a time, so they are bounded up front; no
+# bylaw allows more than a handful per floor
+COUNT_FIELDS = {"bedrooms": "bedrooms", "washrooms": "washrooms"}
+MAX_ROOM_COUNT = 20
+
+def check_configuration(config):
+    """Reject configuration values of the wrong shape (a string where a list belongs, ...)"""
+    for key, field in LIST_FIELDS.items():
+        values = config.get(key)
+        if values is not None and (not isinstance(values, list)
+                                   or not all(isinstance(v, (str, int, float)) for v in values)):
+            raise PlanInputError(f"'{field}' must be a list of names")
+    for key, field in NAME_FIELDS.items():
+        if config.get(key) is not None and not isinstance(config[key], str):
+            raise PlanInputError(f"'{field}' must be a string")
+    for key, field in COUNT_FIELDS.items():
+        if _count(config.get(key), 0) > MAX_ROOM_COUNT:
+            raise PlanInputError(f"'{field}' must be at most {MAX_ROOM_COUNT}")
+
+def parse_budget_ms(value):
+    """Solver budget from a request, None for the default"""
+    if value is None:
+        return None
+    try:
+        budget_ms = float(value)
+    except (TypeError, ValueError):
+        budget_ms = math.nan
+    if isinstance(value, bool) or not math.isfinite(budget_ms) or budget_ms <= 0:
+        raise PlanInputError("'budgetMs' must be a positive number of milliseconds")
+    return min(budget_ms, MAX_BUDGET_MS)
+
+def canonical_configuration(config):
+    """Normalize a configuration so equivalent requests compare (and hash) equal"""
+    check_configuration(config)
+    floors = []
+    for name in config.get("floors") or ["ground"]:
+        floor = FLOOR_ALIASES.get(str(name).lower(), str(name))
+        if floor not in floors:
+            floors.append(floor)
+    floors.sort(key=lambda f: (FLOOR_ORDER.index(f) if f in FLOOR_ORDER else len(FLOOR_ORDER), f))
+
+    def count(value):
+        return _count(value, None)
+
+    def names(values):
+        return sorted({str(v) for v in values or []})
+
+    return {
+        "floors": floors,
+        "bedrooms": count(config.get("bedrooms")),
+        "washrooms": count(config.get("washrooms")),
+        "public_zones": names(config.get("public_zones")),
+        "service_zones": names(config.get("service_zones")),
+        "kitchen_type": config.get("kitchen_type") or None,
+        "special_features": names(config.get("special_features")),
+        "orientation": config.get("orientation") or None,
+        "facing": config.get("facing") or None
+    }
+
+def floor_rules(plot_data, floor):
+    """Per-floor limits; floors beyond the ones listed inherit the top listed floor"""
+    rules = plot_data.get("floors") if isinstance(plot_data.get("floors"), dict) else {}
+    if floor in rules:
+        return rules[floor]
+    listed = [f for f in FLOOR_ORDER if f in rules and f != "basement"]
+    return rules[listed[-1]] if listed else {}
+
+def _room(floor, room_type, label, area=None):
+    target, min_side, max_aspect, zone = ROOM_TYPES[room_type]
+    return {
+        "id": f"{floor}:{label.lower().replace(' ', '-')}",
+        "type": room_type,
+        "label": label,
+        "zone": zone,
+        "target": float(area if area is not None else target),
+        "min_side": min_side,
+        "max_aspect": max_aspect
+    }
+
+def _count(value, default):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError, OverflowError):
+        return default
+
+def build_program(config, floors, plot_data):
+    """Decide which rooms go on which floor.
+
+    Bedrooms and washrooms are spread bottom-up within each floor's
+    bedrooms_max/bathrooms_max. Public rooms, the kitchen and service rooms
+    sit on the ground floor; every upper floor gets a lounge when its rules
+    allow one.
+    """
+    warnings = []
+    above = [f for f in floors if f != "basement"]
+    program = {floor: [] for floor in floors}
+
+    bedrooms = _count(config.get("bedrooms"), 3)
+    washrooms = _count(config.get("washrooms"), bedrooms + 1)
+
+    if len(floors) > 1:
+        for floor in floors:
+            program[floor].append(_room(floor, "Stairs", "Stairs"))
+
+    ground = program["ground"]
+    ground_rules = floor_rules(plot_data, "ground")
+    for zone in config.get("public_zones") or ["Drawing Room"]:
+        if zone in ROOM_TYPES and ROOM_TYPES[zone][3] == "public":
+            ground.append(_room("ground", zone, zone))
+        else:
+            warnings.append(f"Unknown public zone '{zone}' ignored")
+
+    kitchen_type = config.get("kitchen_type") or "Closed Kitchen"
+    if kitchen_type not in KITCHEN_AREAS:
+        warnings.append(f"Unknown kitchen type '{kitchen_type}', using Closed Kitchen")
+        kitchen_type = "Closed Kitchen"
+    kitchen = _room("ground", "Kitchen", "Kitchen", KITCHEN_AREAS[kitchen_type])
+    kitchen["kitchen_type"] = kitchen_type
+    ground.append(kitchen)
+    if kitchen_type != "Closed Kitchen" and not any(r["type"] in LIVING_ROOMS for r in ground):
+        ground.append(_room("ground", "Lounge", "Lounge"))
+
+    for zone in config.get("service_zones") or []:
+        if zone == "Kitchen":
+            continue
+        if zone == "Garage":
+            if ground_rules.get("garage", True):
+                ground.append(_room("ground", "Garage", "Garage"))
+            else:
+                warnings.append("A garage is not permitted on this plot's ground floor")
+        elif zone in ROOM_TYPES and ROOM_TYPES[zone][3] == "service":
+            target = "basement" if zone in ("Store", "Laundry") and "basement" in program else "ground"
+            program[target].append(_room(target, zone, zone))
+        else:
+            warnings.append(f"Unknown service zone '{zone}' ignored")
+
+    for floor in above[1:]:
+        if floor_rules(plot_data, floor).get("lounge", True):
+            program[floor].append(_room(floor, "TV Lounge", "Lounge"))
+
+    def spread(count, room_type, cap_key):
+        placed = 0
+        for floor in above:
+            cap = floor_rules(plot_data, floor).get(cap_key)
+            existing = sum(1 for r in program[floor] if r["type"] == room_type)
+            room_cap = count if cap is None else cap
+            while placed < count and existing < room_cap:
+                placed += 1
+                existing += 1
+                program[floor].append(_room(floor, room_type, f"{room_type} {placed}"))
+        return count - placed
+
+    unplaced = spread(bedrooms, "Bedroom", "bedrooms_max")
+    if unplaced:
+        warnings.append(f"{unplaced} bedroom(s) exceed the per-floor limits and were not placed")
+    unplaced = spread(washrooms, "Washroom", "bathrooms_max")
+    if unplaced:
+        warnings.append(f"{unplaced} washroom(s) exceed the per-floor limits and were not placed")
+
+    return program, warnings
+
+
+# -------------------------
+# Per-floor solver
+# -------------------------
+def _geometry(rows, rooms, env, scale):
+    """Place rooms for a strip assignment; returns {room index: (x, y, w, d)}"""
+    boxes = {}
+    y = env["y"]
+    width = env["width"]
+    for row in rows:
+        row_area = sum(rooms[i]["area"] for i in row) * scale
+        depth = row_area / width
+        x = env["x"]
+        for i in row:
+            w = rooms[i]["area"] * scale / depth
+            boxes[i] = (x, y, w, depth)
+            x += w
+        y += depth
+    return boxes
+
+def _touch(a, b, min_shared=3.0):
+    ax, ay, aw, ad = a
+    bx, by, bw, bd = b
+    if abs(ay + ad - by) < 1e-6 or abs(by + bd - ay) < 1e-6:
+        return min(ax + aw, bx + bw) - max(ax, bx) >= min_shared
+    if abs(ax + aw - bx) < 1e-6 or abs(bx + bw - ax) < 1e-6:
+        return min(ay + ad, by + bd) - max(ay, by) >= min_shared
+    return False
+
+def _score(rows, rooms, env, scale, stairs_at=None):
+    boxes = _geometry(rows, rooms, env, scale)
+    penalty = 0.0
+    for i, (x, y, w, d) in boxes.items():
+        room = rooms[i]
+        short, long_ = min(w, d), max(w, d)
+        if short < room["min_side"]:
+            penalty += 4 * (room["min_side"] - short) ** 2
+        aspect = long_ / short if short > 0 else 99.0
+        if aspect > room["max_aspect"]:
+            penalty += 10 * (aspect - room["max_aspect"]) ** 2
+        rel_depth = (y + d / 2 - env["y"]) / env["depth"]
+        penalty += 12 * (rel_depth - ZONE_DEPTH[room["zone"]]) ** 2
+        if room["type"] == "Garage" and y > env["y"] + 1e-6:
+            penalty += 50
+
+    by_type = {}
+    for i, room in enumerate(rooms):
+        by_type.setdefault(room["type"], []).append(i)
+
+    def adjacent(types_a, types_b):
+        return any(
+            _touch(boxes[i], boxes[j])
+            for ta in types_a for i in by_type.get(ta, ())
+            for tb in types_b for j in by_type.get(tb, ())
+        )
+
+    for (ta, tb), weight in ADJACENCY.items():
+        if ta in by_type and tb in by_type and not adjacent((ta,), (tb,)):
+            penalty += weight
+    if "Kitchen" in by_type:
+        living = [t for t in LIVING_ROOMS if t in by_type]
+        if living and not adjacent(("Kitchen",), living):
+            open_plan = any(rooms[i].get("kitchen_type") in ("Open Kitchen", "Island Kitchen") for i in by_type["Kitchen"])
+            penalty += 12 if open_plan else 5
+    washrooms = by_type.get("Washroom", ())
+    if washrooms:
+        for i in by_type.get("Bedroom", ()):
+            if not any(_touch(boxes[i], boxes[j]) for j in washrooms):
+                penalty += 8
+    if "Stairs" in by_type:
+        x, y, w, d = boxes[by_type["Stairs"][0]]
+        if stairs_at is not None:
+            # Upper floors must put their stairs over the ones below
+            penalty += 2 * (abs(x - stairs_at[0]) + abs(y - stairs_at[1]))
+        else:
+            penalty += 0.2 * (x - env["x"]) + 0.1 * (y - env["y"])
+    return penalty
+
+def _initial_rows(rooms, env, scale):
+    order = sorted(range(len(rooms)), key=lambda i: (ZONE_DEPTH[rooms[i]["zone"]], -rooms[i]["area"]))
+    total = sum(r["area"] for r in rooms) * scale
+    row_count = max(1, min(len(rooms), round(total / env["width"] / 14)))
+    per_row = total / row_count
+    rows, current, acc = [], [], 0.0
+    for i in order:
+        current.append(i)
+        acc += rooms[i]["area"] * scale
+        if acc >= per_row * (len(rows) + 1) - 1e-6 and len(rows) < row_count - 1:
+            rows.append(current)
+            current = []
+    if current:
+        rows.append(current)
+    return rows
+
+def _neighbour(rows, rng):
+    rows = [list(r) for r in rows]
+    move = rng.random()
+    if move < 0.4:
+        # swap two rooms anywhere
+        a, b = rng.randrange(len(rows)), rng.randrange(len(rows))
+        i, j = rng.randrange(len(rows[a])), rng.randrange(len(rows[b]))
+        rows[a][i], rows[b][j] = rows[b][j], rows[a][i]
+    elif move < 0.8:
+        # move one room to another (possibly new) strip
+        a = rng.randrange(len(rows))
+        room = rows[a].pop(rng.randrange(len(rows[a])))
+        b = rng.randrange(len(rows) + 1)
+        if b == len(rows):
+            rows.append([room])
+        else:
+            rows[b].insert(rng.randrange(len(rows[b]) + 1), room)
+    else:
+        # swap two strips
+        a, b = rng.randrange(len(rows)), rng.randrange(len(rows))
+        rows[a], rows[b] = rows[b], rows[a]
+    return [r for r in rows if r]
+
+def _warm_rows(previous_rows, rooms):
+    """Map a previous layout's strips of room ids onto `rooms`.
+
+    Rooms that are gone are dropped; new rooms join the strip holding most
+    rooms of their zone (the last strip if none does).
+    """
+    index = {room["id"]: i for i, room in enumerate(rooms)}
+    rows = [[index[room_id] for room_id in row if room_id in index] for row in previous_rows]
+    rows = [row for row in rows if row]
+    if not rows:
+        return None
+    placed = {i for row in rows for i in row}
+    for i, room in enumerate(rooms):
+        if i in placed:
+            continue
+        same_zone = [sum(1 for j in row if rooms[j]["zone"] == room["zone"]) for row in rows]
+        best = max(range(len(rows)), key=lambda r: same_zone[r]) if max(same_zone) else len(rows) - 1
+        rows[best].append(i)
+    return rows
+
+def solve_floor(floor, rooms, env, budget_s, rng, warm_rows=None, stairs_at=None):
+    """Lay out one floor within `budget_s` seconds, returning the best layout found
+
+    `stairs_at` is the (x, y) of the stairwell on the floor below, if any.
+    `warm_rows` is the "rows" of an earlier layout of this floor to start from.
+    """
+    started = time.perf_counter()
+    warnings = []
+    rooms = [dict(r) for r in rooms]
+    for room in rooms:
+        room["area"] = room["target"]
+    if not rooms:
+        return {"floor": floor, "envelope": env, "rooms": [], "score": 0.0, "iterations": 0,
+                "solve_ms": 0.0, "best_found_ms": 0.0, "warnings": warnings, "rows": []}
+
+    total_target = sum(r["area"] for r in rooms)
+    scale = env["area"] / total_target if total_target else 1.0
+    if scale > MAX_ROOM_SCALE:
+        rooms.append(dict(_room(floor, "Circulation", "Circulation"), area=env["area"] - total_target * MAX_ROOM_SCALE))
+        for room in rooms[:-1]:
+            room["area"] *= MAX_ROOM_SCALE
+        scale = 1.0
+    elif scale < 0.85:
+        warnings.append(f"Rooms on the {floor} floor were shrunk to {scale:.0%} of their target size to fit the envelope")
+
+    current = (_warm_rows(warm_rows, rooms) if warm_rows else None) or _initial_rows(rooms, env, scale)
+    current_score = _score(current, rooms, env, scale, stairs_at)
+    best, best_score = current, current_score
+    best_at = started
+    iterations = 0
+    deadline = started + budget_s
+    temperature = max(1.0, current_score * 0.1)
+    while True:
+        iterations += 1
+        if iterations % 32 == 0:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            # Cool linearly over the budget
+            temperature = max(0.01, max(1.0, best_score * 0.1) * (deadline - now) / budget_s)
+        candidate = _neighbour(current, rng)
+        score = _score(candidate, rooms, env, scale, stairs_at)
+        if score <= current_score or rng.random() < math.exp((current_score - score) / temperature):
+            current, current_score = candidate, score
+            if score < best_score:
+                best, best_score = candidate, score
+                best_at = time.perf_counter()
+                if best_score == 0:
+                    break
+
+    boxes = _geometry(best, rooms, env, scale)
+    placed = []
+    for i, room in enumerate(rooms):
+        x, y, w, d = boxes[i]
+        entry = {"id": room["id"], "type": room["type"], "label": room["label"], "zone": room["zone"],
+                 "x": round(x, 2), "y": round(y, 2), "width": round(w, 2), "depth": round(d, 2),
+                 "area_sqft": round(w * d, 1)}
+        if "kitchen_type" in room:
+            entry["kitchen_type"] = room["kitchen_type"]
+        placed.append(entry)
+    return {
+        "floor": floor,
+        "envelope": {k: round(v, 2) for k, v in env.items()},
+        "rooms": placed,
+        "score": round(best_score, 3),
+        "iterations": iterations,
+        "solve_ms": round((time.perf_counter() - started) * 1000, 2),
+        "best_found_ms": round((best_at - started) * 1000, 2),
+        "warnings": warnings,
+        "rows": [[rooms[i]["id"] for i in row] for row in best]
+    }
+
+
+def stairs_position(layout):
+    """(x, y) of a solved floor's stairwell, None on single-storey plans"""
+    for room in layout["rooms"]:
+        if room["type"] == "Stairs":
+            return room["x"], room["y"]
+    return None
+
+
+# -------------------------
+# Entry point
+# -------------------------
+def solver_seed(*parts):
+    """Stable RNG seed so the same request always yields the same layout"""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def _program_hash(rooms):
+    """Digest of a floor's room program, stored on each solved floor"""
+    program = [(r["id"], r["type"], r["target"], r.get("kitchen_type")) for r in rooms]
+    return hashlib.sha256(json.dumps(program).encode("utf-8")).hexdigest()[:16]
+
+def _previous_floors(previous):
+    """floor -> (layout, stairs position it was solved against) for an earlier plan"""
+    floors = {}
+    stairs_at = None
+    for layout in (previous or {}).get("floors", []):
+        floors[layout["floor"]] = (layout, stairs_at)
+        stairs_at = stairs_position(layout)
+    return floors
+
+def solve_plan(plot_data, length, width, config, budget_ms=None, previous=None):
+    """Lay out every requested floor of a plot.
+
+    `config` uses the snake_case keys of the generate-plan "configuration"
+    block. The total budget is split across floors by room count.
+
+    `previous` is an earlier solve_plan result for the same plot. Floors it
+    solved for the same rooms, envelope and stairwell below are reused as
+    they are; the rest warm-start from its strips, on INCREMENTAL_BUDGET_MS
+    unless `budget_ms` is given.
+    """
+    budget_ms = parse_budget_ms(budget_ms)
+    if budget_ms is None:
+        budget_ms = INCREMENTAL_BUDGET_MS if previous else DEFAULT_BUDGET_MS
+    if not (math.isfinite(length) and math.isfinite(width)) or length <= 0 or width <= 0:
+        raise PlanInputError("Plot length and width must be positive numbers")
+    check_configuration(config)
+    started = time.perf_counter()
+    floors, warnings = normalize_floors(config.get("floors"), plot_data)
+    envelopes = floor_envelopes(length, width, plot_data, floors)
+    program, program_warnings = build_program(config, floors, plot_data)
+    warnings.extend(program_warnings)
+
+    rng = random.Random(solver_seed(length, width, plot_data.get("plot_size"), config))
+    prior = _previous_floors(previous)
+    rounded = {floor: {k: round(v, 2) for k, v in env.items()} for floor, env in envelopes.items()}
+    # Floors whose previous layout can be kept if the stairwell below stays put
+    reusable = {
+        floor for floor in floors
+        if floor in prior and prior[floor][0]["envelope"] == rounded[floor]
+        and prior[floor][0].get("program_hash") == _program_hash(program[floor])
+    }
+    layouts = []
+    reused, warm_started = [], []
+    stairs_at = None
+    for position, floor in enumerate(floors):
+        if floor in reusable and prior[floor][1] == stairs_at:
+            layout = dict(prior[floor][0], solve_ms=0.0, best_found_ms=0.0, iterations=0)
+            reused.append(floor)
+        else:
+            # What is left of the budget, split by room count over this and the floors still to solve
+            pending = len(program[floor]) + sum(len(program[f]) for f in floors[position + 1:] if f not in reusable)
+            remaining = max(0.0, budget_ms / 1000 - (time.perf_counter() - started))
+            share = remaining * len(program[floor]) / (pending or 1)
+            warm_rows = prior[floor][0].get("rows") if floor in prior else None
+            layout = solve_floor(floor, program[floor], envelopes[floor], share, rng,
+                                 warm_rows=warm_rows, stairs_at=stairs_at)
+            layout["program_hash"] = _program_hash(program[floor])
+            if warm_rows:
+                warm_started.append(floor)
+        stairs_at = stairs_position(layout)
+        layouts.append(layout)
+
+    covered = sum(l["envelope"]["area"] for l in layouts if l["floor"] != "basement")
+    result = {
+        "plot": {"length": length, "width": width, "area_sqft": length * width,
+                 "setbacks": {side: (plot_data.get("setbacks") or {}).get(side, 0) for side in ("front", "rear", "side")}},
+        "floors": layouts,
+        "covered_area_sqft": round(covered, 1),
+        "far_used": round(covered / (length * width), 3),
+        "score": round(sum(l["score"] for l in layouts), 3),
+        "solve_ms": round((time.perf_counter() - started) * 1000, 2),
+        "budget_ms": budget_ms,
+        "warnings": warnings + [w for l in layouts for w in l["warnings"]]
+    }
+    if previous:
+        result["incremental"] = {"reused_floors": reused, "warm_started_floors": warm_started}
+    return result
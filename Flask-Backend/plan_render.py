@@ -0,0 +1,336 @@
+"""SVG and PNG drawings of generated plans.
+
+A plan is first turned into a Drawing: a list of axis-aligned rectangles,
+lines and text in pixel coordinates. One panel per floor shows the plot
+boundary, the setback line (dashed), the buildable envelope, every room
+with its label and size, and the plot's dimensions. The road is at the
+bottom. The same Drawing is written out as SVG text or rasterized into a
+PNG by a small pure-Python canvas (zlib + struct, labels in a 3x5 pixel
+font), so the PNG needs no imaging library.
+
+Renders are stored in a DiskLRU (RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES)
+under a hash of the cached plan body, the render options and
+RENDER_VERSION. The same key is the response's strong ETag, so a repeat
+view is a file read or a 304 and never renders again.
+"""
+import hashlib
+import math
+import os
+import struct
+import threading
+import zlib
+from xml.sax.saxutils import escape
+
+from bylaw_terms import FLOOR_ALIASES
+from content_cache import DiskLRU, canonical_hash
+
+RENDER_CACHE_DIR = os.environ.get(
+    "RENDER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_cache")
+)
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Bump whenever the drawings change so older cached renders are never served
+RENDER_VERSION = 1
+
+RENDER_FORMATS = {"svg": "image/svg+xml", "png": "image/png"}
+DEFAULT_SCALE = 8      # pixels per foot
+MIN_SCALE, MAX_SCALE = 2, 40
+MAX_PNG_PIXELS = 16_000_000
+
+MARGIN = 72            # room for the dimension labels around each plot
+TITLE_HEIGHT = 28
+ROAD_HEIGHT = 28
+BACKGROUND = "#ffffff"
+INK = "#222222"
+ZONE_FILLS = {
+    "parking": "#d9d9d9",
+    "public": "#fde7c2",
+    "circulation": "#eeeeee",
+    "service": "#d4ecd9",
+    "private": "#d5e3f6"
+}
+
+# 3x5 pixel glyphs, rows top to bottom; the PNG writer upper-cases labels first
+FONT = {
+    "A": "010101111101101", "B": "110101110101110", "C": "011100100100011", "D": "110101101101110",
+    "E": "111100110100111", "F": "111100110100100", "G": "011100101101011", "H": "101101111101101",
+    "I": "111010010010111", "J": "001001001101010", "K": "101101110101101", "L": "100100100100111",
+    "M": "101111111101101", "N": "110101101101101", "O": "010101101101010", "P": "110101110100100",
+    "Q": "010101101110011", "R": "110101110101101", "S": "011100010001110", "T": "111010010010010",
+    "U": "101101101101111", "V": "101101101101010", "W": "101101111111101", "X": "101101010101101",
+    "Y": "101101010010010", "Z": "111001010100111",
+    "0": "111101101101111", "1": "010110010010111", "2": "110001010100111", "3": "110001010001110",
+    "4": "101101111001001", "5": "111100110001110", "6": "011100111101111", "7": "111001010010010",
+    "8": "111101111101111", "9": "111101111001110",
+    " ": "000000000000000", "-": "000000111000000", ".": "000000000000010", "'": "010010000000000",
+    '"': "101101000000000", "/": "001001010100100", ":": "000010000010000", "(": "010100100100010",
+    ")": "010001001001010", "×": "000101010101000", "?": "110001010000010"
+}
+
+
+class RenderOptionsError(ValueError):
+    """Render options that cannot be drawn"""
+
+
+def render_options(args):
+    """Normalized options from the query string, so equivalent requests share a cache entry"""
+    fmt = (args.get("format") or "svg").lower()
+    if fmt not in RENDER_FORMATS:
+        raise RenderOptionsError(f"Unknown format '{fmt}'; use svg or png")
+    floor = args.get("floor") or "all"
+    if floor != "all":
+        floor = FLOOR_ALIASES.get(floor.lower())
+        if floor is None:
+            raise RenderOptionsError(f"Unknown floor '{args.get('floor')}'")
+    try:
+        scale = float(args.get("scale", DEFAULT_SCALE))
+    except (TypeError, ValueError):
+        raise RenderOptionsError("'scale' must be a number of pixels per foot") from None
+    if not MIN_SCALE <= scale <= MAX_SCALE:
+        raise RenderOptionsError(f"'scale' must be from {MIN_SCALE} to {MAX_SCALE} pixels per foot")
+
+    def flag(name):
+        return str(args.get(name, "1")).lower() not in ("0", "false", "no", "off")
+
+    return {"format": fmt, "floor": floor, "scale": scale, "labels": flag("labels"), "dimensions": flag("dimensions")}
+
+def render_key(plan_body, options):
+    """Cache key and strong ETag of one render of one cached plan body"""
+    plan_hash = hashlib.sha256(plan_body).hexdigest()
+    return canonical_hash({"plan": plan_hash, "options": options, "version": RENDER_VERSION})[:32]
+
+
+def feet(value):
+    """12.5 -> 12'6\" """
+    inches = round(value * 12)
+    return f"{inches // 12}'{inches % 12}\""
+
+
+class Drawing:
+    """Primitives in pixel coordinates, shared by the SVG and PNG writers"""
+
+    __slots__ = ("width", "height", "ops")
+
+    def __init__(self, width, height):
+        self.width, self.height = int(round(width)), int(round(height))
+        self.ops = []
+
+    def rect(self, x, y, w, h, fill=None, stroke=None, weight=1, dash=False):
+        self.ops.append(("rect", x, y, w, h, fill, stroke, weight, dash))
+
+    def line(self, x1, y1, x2, y2, stroke=INK, weight=1, dash=False):
+        self.ops.append(("line", x1, y1, x2, y2, stroke, weight, dash))
+
+    def text(self, x, y, text, size=11, fill=INK):
+        """Text centred on (x, y)"""
+        self.ops.append(("text", x, y, text, size, fill))
+
+
+def text_width(text, size):
+    return len(text) * size * 0.6
+
+def _floor_panel(drawing, layout, floor, left, options):
+    """One floor of a plan layout, drawn `left` pixels from the drawing's edge"""
+    s = options["scale"]
+    plot = layout["plot"]
+    length, width = plot["length"], plot["width"]
+    top = TITLE_HEIGHT + MARGIN / 2
+    # Plot feet -> pixels; y is measured from the front boundary, which is drawn at the bottom
+    px = lambda x: left + MARGIN + x * s
+    py = lambda y: top + (width - y) * s
+
+    drawing.text(px(length / 2), TITLE_HEIGHT / 2 + 4, f"{floor['floor'].title()} floor", size=14)
+    drawing.rect(px(0), py(width), length * s, width * s, stroke=INK, weight=2)
+    env = floor["envelope"]
+    drawing.rect(px(env["x"]), py(env["y"] + env["depth"]), env["width"] * s, env["depth"] * s,
+                 stroke="#555555", weight=1)
+
+    for room in floor["rooms"]:
+        x, y, w, d = px(room["x"]), py(room["y"] + room["depth"]), room["width"] * s, room["depth"] * s
+        drawing.rect(x, y, w, d, fill=ZONE_FILLS.get(room["zone"], "#ffffff"), stroke=INK)
+        if not options["labels"] or room["type"] == "Circulation":
+            continue
+        size = 11
+        label = room["label"]
+        if text_width(label, size) <= w - 4 and d >= size + 4:
+            dims = f"{feet(room['width'])} × {feet(room['depth'])}"
+            if d >= 2 * size + 8 and text_width(dims, size - 2) <= w - 4:
+                drawing.text(x + w / 2, y + d / 2 - size / 2 - 1, label, size)
+                drawing.text(x + w / 2, y + d / 2 + size / 2 + 1, dims, size - 2)
+            else:
+                drawing.text(x + w / 2, y + d / 2, label, size)
+
+    # Over the rooms, which usually fill the envelope up to it
+    setbacks = plot.get("setbacks")
+    if setbacks:
+        side, front, rear = setbacks.get("side", 0), setbacks.get("front", 0), setbacks.get("rear", 0)
+        drawing.rect(px(side), py(width - rear), (length - 2 * side) * s, (width - front - rear) * s,
+                     stroke="#c0392b", dash=True)
+
+    bottom = py(0)
+    drawing.text(px(length / 2), bottom + ROAD_HEIGHT / 2 + MARGIN / 2 - 4, "Road", size=12, fill="#777777")
+    if options["dimensions"]:
+        # Frontage above the plot, depth to its left
+        y = py(width) - MARGIN / 4
+        drawing.line(px(0), y, px(length), y)
+        drawing.line(px(0), y - 4, px(0), y + 4)
+        drawing.line(px(length), y - 4, px(length), y + 4)
+        drawing.text(px(length / 2), y - 9, feet(length), size=11)
+        x = px(0) - MARGIN / 4
+        drawing.line(x, py(width), x, py(0))
+        drawing.line(x - 4, py(width), x + 4, py(width))
+        drawing.line(x - 4, py(0), x + 4, py(0))
+        drawing.text(x - 6 - text_width(feet(width), 11) / 2, py(width / 2), feet(width), size=11)
+
+def build_drawing(plan, options):
+    """Drawing of the requested floors of a generate-plan response, side by side"""
+    layout = plan.get("layout") or {}
+    floors = layout.get("floors") or []
+    if options["floor"] != "all":
+        floors = [f for f in floors if f["floor"] == options["floor"]]
+        if not floors:
+            raise RenderOptionsError(f"This plan has no {options['floor']} floor")
+    s = options["scale"]
+    plot = layout["plot"]
+    panel_width = plot["length"] * s + 2 * MARGIN
+    height = TITLE_HEIGHT + MARGIN + plot["width"] * s + ROAD_HEIGHT
+    drawing = Drawing(panel_width * len(floors), height)
+    if options["format"] == "png" and drawing.width * drawing.height > MAX_PNG_PIXELS:
+        raise RenderOptionsError("PNG would be too large; lower 'scale' or pick one 'floor'")
+    for position, floor in enumerate(floors):
+        _floor_panel(drawing, layout, floor, position * panel_width, options)
+    return drawing
+
+
+# -------------------------
+# SVG
+# -------------------------
+def _n(value):
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+def to_svg(drawing):
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{drawing.width}" height="{drawing.height}" '
+        f'viewBox="0 0 {drawing.width} {drawing.height}" font-family="sans-serif">',
+        f'<rect width="100%" height="100%" fill="{BACKGROUND}"/>'
+    ]
+    for op in drawing.ops:
+        kind = op[0]
+        if kind == "rect":
+            _, x, y, w, h, fill, stroke, weight, dash = op
+            attrs = f'fill="{fill or "none"}"'
+            if stroke:
+                attrs += f' stroke="{stroke}" stroke-width="{weight}"'
+            if dash:
+                attrs += ' stroke-dasharray="6 4"'
+            parts.append(f'<rect x="{_n(x)}" y="{_n(y)}" width="{_n(w)}" height="{_n(h)}" {attrs}/>')
+        elif kind == "line":
+            _, x1, y1, x2, y2, stroke, weight, dash = op
+            attrs = ' stroke-dasharray="6 4"' if dash else ""
+            parts.append(f'<line x1="{_n(x1)}" y1="{_n(y1)}" x2="{_n(x2)}" y2="{_n(y2)}" '
+                         f'stroke="{stroke}" stroke-width="{weight}"{attrs}/>')
+        else:
+            _, x, y, text, size, fill = op
+            parts.append(f'<text x="{_n(x)}" y="{_n(y)}" font-size="{size}" fill="{fill}" '
+                         f'text-anchor="middle" dominant-baseline="central">{escape(text)}</text>')
+    parts.append("</svg>")
+    return "\n".join(parts).encode("utf-8")
+
+
+# -------------------------
+# PNG
+# -------------------------
+def _rgb(colour):
+    return bytes.fromhex(colour.lstrip("#"))
+
+class Canvas:
+    """RGB pixel buffer with the few fills the plan drawings need"""
+
+    def __init__(self, width, height, background=BACKGROUND):
+        self.width, self.height = width, height
+        self.pixels = bytearray(_rgb(background) * (width * height))
+
+    def fill(self, x0, y0, x1, y1, colour):
+        # Half-up rounding: a 1px line centred on y = 10 covers row 10
+        x0, x1 = max(0, math.floor(x0 + 0.5)), min(self.width, math.floor(x1 + 0.5))
+        y0, y1 = max(0, math.floor(y0 + 0.5)), min(self.height, math.floor(y1 + 0.5))
+        if x0 >= x1 or y0 >= y1:
+            return
+        row = colour * (x1 - x0)
+        for y in range(y0, y1):
+            start = (y * self.width + x0) * 3
+            self.pixels[start:start + len(row)] = row
+
+    def line(self, x1, y1, x2, y2, colour, weight=1, dash=False):
+        """Horizontal or vertical line, `weight` pixels thick"""
+        half = weight / 2
+        horizontal = abs(y1 - y2) < abs(x1 - x2)
+        a, b = sorted((x1, x2) if horizontal else (y1, y2))
+        # Dashes of 6px with 4px gaps, as in the SVG
+        segments = [(start, min(b, start + 6)) for start in range(int(a), int(b), 10)] if dash else [(a - half, b + half)]
+        for start, end in segments:
+            if horizontal:
+                self.fill(start, y1 - half, end, y1 + half, colour)
+            else:
+                self.fill(x1 - half, start, x1 + half, end, colour)
+
+    def text(self, x, y, text, size, colour):
+        k = max(1, round(size / 7))
+        glyphs = [FONT.get(char, FONT["?"]) for char in text.upper()]
+        left = int(round(x - (len(glyphs) * 4 * k - k) / 2))
+        top = int(round(y - 5 * k / 2))
+        for index, glyph in enumerate(glyphs):
+            gx = left + index * 4 * k
+            for bit, on in enumerate(glyph):
+                if on == "1":
+                    row, col = divmod(bit, 3)
+                    self.fill(gx + col * k, top + row * k, gx + (col + 1) * k, top + (row + 1) * k, colour)
+
+    def png(self):
+        stride = self.width * 3
+        raw = b"".join(b"\x00" + bytes(self.pixels[y * stride:(y + 1) * stride]) for y in range(self.height))
+
+        def chunk(kind, data):
+            return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+        header = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+                + chunk(b"IDAT", zlib.compress(raw, 6)) + chunk(b"IEND", b""))
+
+def to_png(drawing):
+    canvas = Canvas(drawing.width, drawing.height)
+    for op in drawing.ops:
+        kind = op[0]
+        if kind == "rect":
+            _, x, y, w, h, fill, stroke, weight, dash = op
+            if fill:
+                canvas.fill(x, y, x + w, y + h, _rgb(fill))
+            if stroke:
+                colour = _rgb(stroke)
+                for x1, y1, x2, y2 in ((x, y, x + w, y), (x, y + h, x + w, y + h), (x, y, x, y + h), (x + w, y, x + w, y + h)):
+                    canvas.line(x1, y1, x2, y2, colour, weight, dash)
+        elif kind == "line":
+            _, x1, y1, x2, y2, stroke, weight, dash = op
+            canvas.line(x1, y1, x2, y2, _rgb(stroke), weight, dash)
+        else:
+            _, x, y, text, size, fill = op
+            canvas.text(x, y, text, size, _rgb(fill))
+    return canvas.png()
+
+
+def render(plan, options):
+    """Bytes of the requested drawing of a generate-plan response"""
+    drawing = build_drawing(plan, options)
+    return to_png(drawing) if options["format"] == "png" else to_svg(drawing)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_render_cache():
+    """Process-wide render cache, created on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskLRU(RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES, suffix=".render")
+    return _cache
@@ -0,0 +1,122 @@
+"""Resolve a real plot area to the bylaw plot-size bracket that governs it.
+
+Plot sizes in the city files are labels: single sizes ("5 Marla",
+"500 Sq Ft") or ranges ("60-119 Sq Yd"). Every label is converted to an
+interval in sq ft once, when the bylaws load, and each authority keeps its
+intervals sorted so an area resolves with one bisect:
+
+    inside a bracket's interval     -> that bracket, match "exact"
+    between two brackets or below   -> the next larger bracket, match
+    the smallest                       "next_larger" (sizes read as "up to")
+    above the largest               -> no bracket
+
+All unit conversion goes through AREA_UNITS.
+"""
+import math
+import re
+from bisect import bisect_left
+
+from structured_log import get_logger
+
+MARLA_SQFT = 225.0
+AREA_UNITS = {
+    "sqft": 1.0,
+    "sqyd": 9.0,
+    "marla": MARLA_SQFT,
+    "kanal": 20 * MARLA_SQFT
+}
+MAX_RESOLVE_PARCELS = 10000
+
+_PLOT_LABEL = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(?:-\s*(\d+(?:\.\d+)?))?\s*([a-z. _-]+?)\s*$", re.IGNORECASE)
+_UNIT_SEPARATORS = re.compile(r"[\s._-]+")
+
+log = get_logger("plot_brackets")
+
+
+class PlotAreaError(ValueError):
+    """A parcel without a usable area"""
+
+
+def unit_factor(unit):
+    """Sq ft per unit; accepts spellings such as Sq Yd, sq_ft, Marla or kanals"""
+    key = _UNIT_SEPARATORS.sub("", str(unit).lower())
+    if key.endswith("s") and key[:-1] in AREA_UNITS:
+        key = key[:-1]
+    factor = AREA_UNITS.get(key)
+    if factor is None:
+        raise PlotAreaError(f"Unknown area unit '{unit}'; expected one of sq ft, sq yd, marla, kanal")
+    return factor
+
+def parse_plot_size(label):
+    """(low, high) in sq ft for a plot size label, or None if it names no area"""
+    match = _PLOT_LABEL.match(label)
+    if not match:
+        return None
+    low, high, unit = match.groups()
+    try:
+        factor = unit_factor(unit)
+    except PlotAreaError:
+        return None
+    low = float(low) * factor
+    return low, float(high) * factor if high else low
+
+def parcel_area_sqft(parcel):
+    """Area in sq ft from {"area", "unit"} or {"length", "width"} in feet"""
+    if not isinstance(parcel, dict):
+        raise PlotAreaError("Parcel must be an object")
+    if parcel.get("area") is not None:
+        factor, values = unit_factor(parcel.get("unit") or "sq ft"), (parcel["area"],)
+    elif parcel.get("length") is not None and parcel.get("width") is not None:
+        factor, values = 1.0, (parcel["length"], parcel["width"])
+    else:
+        raise PlotAreaError("Parcel needs 'area' (with optional 'unit') or 'length' and 'width'")
+    area = factor
+    try:
+        for value in values:
+            area *= float(value)
+    except (TypeError, ValueError):
+        raise PlotAreaError("Parcel dimensions must be numbers") from None
+    if not (area > 0 and math.isfinite(area)):
+        raise PlotAreaError("Parcel area must be a positive number")
+    return area
+
+
+class PlotBrackets:
+    """Sorted, non-overlapping sq ft intervals for one authority's plot sizes"""
+
+    __slots__ = ("lows", "highs", "labels")
+
+    def __init__(self, intervals):
+        self.lows, self.highs, self.labels = [], [], []
+        for low, high, label in sorted(intervals):
+            if self.highs and low <= self.highs[-1]:
+                raise ValueError(f"'{label}' overlaps '{self.labels[-1]}'")
+            self.lows.append(low)
+            self.highs.append(high)
+            self.labels.append(label)
+
+    def resolve(self, area_sqft):
+        """(plot size label, match) or None when the area is above every bracket"""
+        position = bisect_left(self.highs, area_sqft)
+        if position == len(self.highs):
+            return None
+        return self.labels[position], "exact" if area_sqft >= self.lows[position] else "next_larger"
+
+
+def build_bracket_index(cities_data):
+    """Map (city, authority) -> PlotBrackets; labels that name no area are skipped"""
+    index = {}
+    for city, city_data in cities_data.items():
+        for authority, authority_data in city_data.get("authorities", {}).items():
+            intervals = []
+            for plot_key in authority_data.get("plot_sizes", {}):
+                bounds = parse_plot_size(plot_key)
+                if bounds is None:
+                    log.warning("plot_size_unparsed", city=city, authority=authority, plot_size=plot_key)
+                    continue
+                intervals.append((*bounds, plot_key))
+            try:
+                index[(city, authority)] = PlotBrackets(intervals)
+            except ValueError as e:
+                log.warning("plot_brackets_overlap", city=city, authority=authority, error=str(e))
+    return index
@@ -0,0 +1,542 @@
+import hashlib
+import json
+import os
+import pickle
+import struct
+import threading
+import time
+
+from bylaw_query import BylawColumns
+from bylaw_terms import plot_size_aliases, plot_size_slug
+from bylaw_search import BylawSearchIndex
+from compliance import compile_validators
+from http_cache import build_cached_payload
+from plot_brackets import build_bracket_index
+from structured_log import get_logger
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_PATH = os.environ.get("BYLAW_SNAPSHOT_PATH", os.path.join(DATA_DIR, "bylaws.snapshot"))
+SNAPSHOT_MAGIC = b"IPBYLAWS"
+SNAPSHOT_FORMAT = 5  # bump whenever the compiled structures change shape
+
+CITY_FILES = {
+    "Lahore": "lahore.json",
+    "Karachi": "karachi.json",
+    "Islamabad": "islamabad.json"
+}
+
+GLOBAL_OPTIONS = {
+    "orientation": ["North", "South", "East", "West", "North-East", "North-West", "South-East", "South-West"],
+    "facing": ["Main Road", "Side Road", "Corner", "Back Lane"],
+    "shape": ["Regular", "Irregular", "Corner", "L-Shape"]
+}
+
+# Offered identically for every plot; sent once under "definitions" with ?shared=1
+SHARED_OPTIONS = {
+    "public_zones": ["Lounge", "Drawing Room", "TV Lounge", "Family Room", "Study Room"],
+    "service_zones": ["Kitchen", "Store", "Laundry", "Servant Quarter", "Garage"],
+    "kitchen_types": ["Open Kitchen", "Closed Kitchen", "Island Kitchen"]
+}
+FORM_OPTION_SECTIONS = ("meta", "available_options", "raw_bylaws")
+FORM_OPTIONS_PARAMS = ("city", "authority", "fields", "exclude", "shared")
+MAX_FORM_OPTION_VARIANTS = 256
+
+# Typical length x width (ft) for the plot sizes the frontend offers, keyed by frontend slug
+STANDARD_DIMENSIONS = {
+    "3-marla": {"length":22.5,"width":30},
+    "5-marla": {"length":25,"width":50},
+    "7-marla": {"length":32.5,"width":56},
+    "10-marla": {"length":35,"width":65},
+    "1-kanal": {"length":45,"width":90},
+    "2-kanal": {"length":90,"width":90},
+    "500-sq-ft": {"length":20,"width":25},
+    "1000-sq-ft": {"length":25,"width":40},
+    "2000-sq-ft": {"length":40,"width":50},
+    "5000-sq-ft": {"length":50,"width":100},
+    "60-119-sq-yd": {"length":20,"width":27},
+    "120-199-sq-yd": {"length":25,"width":36},
+    "200-399-sq-yd": {"length":35,"width":45},
+    "400-999-sq-yd": {"length":50,"width":60}
+}
+
+log = get_logger("regulations")
+
+
+class BylawDataError(ValueError):
+    """Raised when a city file cannot be parsed or fails validation"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+# -------------------------
+# Load and validate city files
+# -------------------------
+def city_file_paths(data_dir=DATA_DIR):
+    return {city: os.path.join(data_dir, filename) for city, filename in CITY_FILES.items()}
+
+def source_mtimes(data_dir=DATA_DIR):
+    """mtime of every city file, None for missing files"""
+    mtimes = {}
+    for city, path in city_file_paths(data_dir).items():
+        try:
+            mtimes[city] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtimes[city] = None
+    return mtimes
+
+def validate_city_data(city, city_data):
+    """Return a list of problems with one parsed city file"""
+    errors = []
+    if not isinstance(city_data, dict) or not isinstance(city_data.get("authorities"), dict):
+        return [f"{city}: expected an object with an 'authorities' object"]
+    for authority, authority_data in city_data["authorities"].items():
+        plot_sizes = authority_data.get("plot_sizes") if isinstance(authority_data, dict) else None
+        if not isinstance(plot_sizes, dict):
+            errors.append(f"{city}/{authority}: expected a 'plot_sizes' object")
+            continue
+        for plot_key, plot_data in plot_sizes.items():
+            where = f"{city}/{authority}/{plot_key}"
+            if not isinstance(plot_data, dict):
+                errors.append(f"{where}: expected an object")
+                continue
+            max_floors = plot_data.get("max_floors", 2)
+            if not isinstance(max_floors, int) or max_floors < 1:
+                errors.append(f"{where}: max_floors must be a positive integer")
+            for field in ("ground_coverage_percent", "upper_coverage_percent"):
+                value = plot_data.get(field)
+                if value is not None and (not isinstance(value, (int, float)) or not 0 <= value <= 100):
+                    errors.append(f"{where}: {field} must be between 0 and 100")
+            setbacks = plot_data.get("setbacks", {})
+            if not isinstance(setbacks, dict) or any(not isinstance(v, (int, float)) or v < 0 for v in setbacks.values()):
+                errors.append(f"{where}: setbacks must be non-negative numbers")
+            if "floors" in plot_data and not isinstance(plot_data["floors"], (dict, int)):
+                errors.append(f"{where}: floors must be an object or an integer")
+    return errors
+
+def load_city_data(data_dir=DATA_DIR, strict=False):
+    """Load data from three separate city JSON files
+
+    With strict=False a missing file becomes an empty city, which is what we
+    want at startup. Reloads use strict=True so a bad edit never replaces good
+    data.
+    """
+    cities_data = {}
+    errors = []
+    for city, file_path in city_file_paths(data_dir).items():
+        filename = os.path.basename(file_path)
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                cities_data[city] = json.load(f)
+            log.info("city_file_loaded", city=city, file=filename)
+        except FileNotFoundError:
+            if strict:
+                errors.append(f"{city}: {filename} not found")
+                continue
+            log.warning("city_file_missing", city=city, file=filename)
+            cities_data[city] = {"authorities": {}}
+            continue
+        except json.JSONDecodeError as e:
+            errors.append(f"{city}: {filename} is not valid JSON ({e})")
+            continue
+        errors.extend(validate_city_data(city, cities_data[city]))
+
+    if errors:
+        raise BylawDataError(errors)
+    return cities_data
+
+
+# -------------------------
+# Plot-size index
+# -------------------------
+def build_plot_index(cities_data):
+    """Map (city, authority, alias) -> (plot size label, plot data) for O(1) lookups"""
+    index = {}
+    for city, city_data in cities_data.items():
+        for authority, authority_data in city_data.get("authorities", {}).items():
+            for plot_key, plot_data in authority_data.get("plot_sizes", {}).items():
+                for alias in plot_size_aliases(plot_key):
+                    index.setdefault((city, authority, alias), (plot_key, plot_data))
+    return index
+
+
+# -------------------------
+# Precomputed form options
+# -------------------------
+class FormOptionsQueryError(ValueError):
+    """Bad /api/form-options filter; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def plot_form_options(city, authority, plot_key, plot_data, shared=False):
+    """One plot's form-options entry; with `shared`, SHARED_OPTIONS are left to the definitions"""
+    frontend_key = plot_size_slug(plot_key)
+    available_options = {
+        "max_floors": plot_data.get("max_floors", 2),
+        "max_height_ft": plot_data.get("max_height_ft"),
+        "ground_coverage_percent": plot_data.get("ground_coverage_percent", 60),
+        "FAR": plot_data.get("FAR", "Not specified"),
+        "mandatory_open_spaces": {
+            "front": f"{plot_data.get('setbacks', {}).get('front', 0)} ft",
+            "rear": f"{plot_data.get('setbacks', {}).get('rear', 0)} ft",
+            "side": f"{plot_data.get('setbacks', {}).get('side', 0)} ft"
+        },
+        "bedrooms_range": plot_data.get("bedrooms_range", {"min": 1, "max": 5}),
+        "washrooms_range": plot_data.get("washrooms_range", {"min": 2, "max": 5}),
+        "allowed_features": {
+            "servant_quarter": plot_data.get("max_floors", 2) >= 2,
+            "swimming_pool": plot_data.get("ground_coverage_percent", 60) <= 60,
+            "basement": False,
+            "mumty": True
+        },
+        "parking": {
+            "type": "Single Car Garage" if plot_data.get("max_floors", 2) >= 2 else "Not Required",
+            "spaces": 1 if plot_data.get("max_floors", 2) >= 2 else 0
+        },
+        "special_rules": [
+            f"Maximum {plot_data.get('max_floors', 2)} floors allowed",
+            f"Ground coverage: {plot_data.get('ground_coverage_percent', 60)}%",
+            f"FAR: {plot_data.get('FAR', 'Not specified')}"
+        ],
+        "additional_rules": {}
+    }
+    if not shared:
+        available_options.update(SHARED_OPTIONS)
+    return {
+        "meta": {
+            "plot_size_label": plot_key,
+            "authority": authority,
+            "city": city,
+            "frontend_key": frontend_key
+        },
+        "available_options": available_options,
+        "raw_bylaws": plot_data
+    }
+
+def build_form_options(cities_data, cities=None, authorities=None, shared=False, project=None):
+    """Build the /api/form-options tree from the loaded city data.
+
+    `cities`/`authorities` restrict the tree to those names, `shared` moves
+    SHARED_OPTIONS into a top-level "definitions" section, and `project` maps
+    each plot entry (see project_fields).
+    """
+    transformed_data = {
+        "cities": {},
+        "global_options": GLOBAL_OPTIONS
+    }
+    if shared:
+        transformed_data["definitions"] = SHARED_OPTIONS
+
+    for city, city_data in cities_data.items():
+        if cities is not None and city not in cities:
+            continue
+        city_tree = {"authorities": {}}
+        for authority, authority_data in city_data.get("authorities", {}).items():
+            if authorities is not None and authority not in authorities:
+                continue
+            plot_sizes = {}
+            for plot_key, plot_data in authority_data.get("plot_sizes", {}).items():
+                entry = plot_form_options(city, authority, plot_key, plot_data, shared)
+                plot_sizes[plot_size_slug(plot_key)] = project(entry) if project else entry
+            city_tree["authorities"][authority] = {"plot_sizes": plot_sizes}
+        if authorities is None or city_tree["authorities"]:
+            transformed_data["cities"][city] = city_tree
+    return transformed_data
+
+def project_fields(entry, fields=None, exclude=None):
+    """Keep `fields` and drop `exclude` of one plot entry; names are `section` or `section.key`"""
+    if fields:
+        whole = {path for path in fields if "." not in path}
+        projected = {section: entry[section] for section in whole if section in entry}
+        for path in fields:
+            section, _, key = path.partition(".")
+            if key and section not in whole and isinstance(entry.get(section), dict) and key in entry[section]:
+                projected.setdefault(section, {})[key] = entry[section][key]
+        entry = projected
+    if exclude:
+        entry = dict(entry)
+        for path in exclude:
+            section, _, key = path.partition(".")
+            if not key:
+                entry.pop(section, None)
+            elif isinstance(entry.get(section), dict) and key in entry[section]:
+                entry[section] = {k: v for k, v in entry[section].items() if k != key}
+    return entry
+
+def _list_param(args, name):
+    return [value.strip() for raw in args.getlist(name) for value in raw.split(",") if value.strip()]
+
+def _match_names(requested, available, kind):
+    by_lower = {name.lower(): name for name in available}
+    missing = [name for name in requested if name.lower() not in by_lower]
+    if missing:
+        raise FormOptionsQueryError(f"{kind} not found: {', '.join(missing)}", 404)
+    return tuple(sorted({by_lower[name.lower()] for name in requested}))
+
+def parse_form_options_query(args, cities_data):
+    """Normalized, hashable form of the form-options query string, None without filters"""
+    if not any(name in args for name in FORM_OPTIONS_PARAMS):
+        return None
+    requested_cities = _list_param(args, "city")
+    cities = _match_names(requested_cities, cities_data, "City") if requested_cities else None
+    requested_authorities = _list_param(args, "authority")
+    authorities = None
+    if requested_authorities:
+        available = {authority for city, city_data in cities_data.items() if cities is None or city in cities
+                     for authority in city_data.get("authorities", {})}
+        authorities = _match_names(requested_authorities, available, "Authority")
+    projections = []
+    for name in ("fields", "exclude"):
+        paths = _list_param(args, name)
+        unknown = [path for path in paths if path.partition(".")[0] not in FORM_OPTION_SECTIONS]
+        if unknown:
+            raise FormOptionsQueryError(f"Unknown {name}: {', '.join(unknown)} "
+                                        f"(use {', '.join(FORM_OPTION_SECTIONS)} or section.key)")
+        projections.append(tuple(sorted(set(paths))) or None)
+    shared = args.get("shared", "").lower() in ("1", "true", "yes")
+    return cities, authorities, projections[0], projections[1], shared
+
+# -------------------------
+# Snapshots
+# -------------------------
+class RegulationSnapshot:
+    """Bylaw data plus everything derived from it, built together.
+
+    A snapshot is never mutated after it is published. Request handlers grab
+    the current one once with current_snapshot() and read from it without
+    locking; a reload builds a complete new snapshot and swaps the reference.
+    """
+
+    __slots__ = ("version", "loaded_at", "source", "source_mtimes", "cities_data", "plot_index", "validators",
+                 "bracket_index", "bylaw_columns", "search_index", "form_options_payload", "form_option_variants")
+    COMPILED_FIELDS = ("cities_data", "plot_index", "validators", "bracket_index", "bylaw_columns", "search_index",
+                       "form_options_payload")
+
+    def __init__(self, version, cities_data, mtimes, serialize):
+        self.version = version
+        self.loaded_at = time.time()
+        self.source = "json"
+        self.source_mtimes = mtimes
+        self.cities_data = cities_data
+        self.plot_index = build_plot_index(cities_data)
+        self.validators = compile_validators(cities_data)
+        self.bracket_index = build_bracket_index(cities_data)
+        self.bylaw_columns = BylawColumns(cities_data)
+        self.search_index = BylawSearchIndex(cities_data)
+        self.form_options_payload = build_cached_payload(serialize(build_form_options(cities_data)))
+        self.form_option_variants = {}
+
+    @classmethod
+    def from_compiled(cls, version, state, mtimes):
+        """Rebuild a snapshot from the fields stored by write_compiled_snapshot()"""
+        snapshot = cls.__new__(cls)
+        snapshot.version = version
+        snapshot.loaded_at = time.time()
+        snapshot.source = "compiled"
+        snapshot.source_mtimes = mtimes
+        for field in cls.COMPILED_FIELDS:
+            setattr(snapshot, field, state[field])
+        snapshot.form_option_variants = {}
+        return snapshot
+
+    def form_options_variant(self, query):
+        """Cached payload for a parse_form_options_query() result, built on first use"""
+        payload = self.form_option_variants.get(query)
+        if payload is not None:
+            return payload
+        cities, authorities, fields, exclude, shared = query
+        project = (lambda entry: project_fields(entry, fields, exclude)) if fields or exclude else None
+        payload = build_cached_payload(_serialize(build_form_options(self.cities_data, cities, authorities, shared, project)))
+        with _variants_lock:
+            if len(self.form_option_variants) >= MAX_FORM_OPTION_VARIANTS:
+                self.form_option_variants.pop(next(iter(self.form_option_variants)))
+            self.form_option_variants[query] = payload
+        return payload
+
+    def lookup_plot(self, city, authority, plot_size):
+        """(plot size label, plot data) or None"""
+        try:
+            return self.plot_index.get((city, authority, plot_size))
+        except TypeError:  # a list or object from a JSON body names no plot
+            return None
+
+    def lookup_rules(self, city, authority, plot_size):
+        """(plot size label, compiled compliance rules) or None"""
+        entry = self.lookup_plot(city, authority, plot_size)
+        if entry is None:
+            return None
+        return entry[0], self.validators[(city, authority, entry[0])]
+
+    def plot_brackets(self, city=None, authority=None):
+        """[((city, authority), PlotBrackets)], optionally narrowed to one city and/or authority"""
+        return [(key, brackets) for key, brackets in self.bracket_index.items()
+                if (city is None or key[0] == city) and (authority is None or key[1] == authority)]
+
+    def summary(self):
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.loaded_at)),
+            "form_options_etag": self.form_options_payload["digest"],
+            "cities": {
+                city: sum(len(a.get("plot_sizes", {})) for a in data.get("authorities", {}).values())
+                for city, data in self.cities_data.items()
+            }
+        }
+
+
+# -------------------------
+# Compiled snapshot
+# -------------------------
+# One file: magic, a 4-byte header length, a JSON header (format, source file
+# digests, payload checksum) and the pickled snapshot fields. Loading it is a
+# single read plus an unpickle, with no JSON parsing or index building. Only
+# load snapshots you built: pickle executes whatever the file tells it to.
+
+def source_digests(data_dir=DATA_DIR):
+    """sha256 of each city file's bytes, None for missing files"""
+    digests = {}
+    for city, file_path in city_file_paths(data_dir).items():
+        try:
+            with open(file_path, "rb") as f:
+                digests[city] = hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            digests[city] = None
+    return digests
+
+def compile_snapshot(serialize, path=SNAPSHOT_PATH, data_dir=DATA_DIR):
+    """Build a snapshot from the JSON files and write it to `path`; returns the header"""
+    digests = source_digests(data_dir)
+    if None in digests.values():
+        missing = [city for city, digest in digests.items() if digest is None]
+        raise BylawDataError([f"{city}: {CITY_FILES[city]} not found" for city in missing])
+    snapshot = RegulationSnapshot(1, load_city_data(data_dir, strict=True), source_mtimes(data_dir), serialize)
+    return write_compiled_snapshot(snapshot, digests, path)
+
+def write_compiled_snapshot(snapshot, digests, path=SNAPSHOT_PATH):
+    state = {field: getattr(snapshot, field) for field in RegulationSnapshot.COMPILED_FIELDS}
+    payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "sources": digests,
+        "payload_bytes": len(payload),
+        "payload_sha256": hashlib.sha256(payload).hexdigest(),
+        "form_options_etag": snapshot.form_options_payload["digest"]
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + payload)
+    os.replace(tmp, path)
+    return header
+
+def read_compiled_snapshot(path=SNAPSHOT_PATH, data_dir=DATA_DIR):
+    """The compiled snapshot at `path`, or None if it is missing, corrupt or stale"""
+    try:
+        with open(path, "rb") as f:
+            blob = f.read()
+    except FileNotFoundError:
+        log.info("compiled_snapshot_missing", path=path)
+        return None
+    prefix = len(SNAPSHOT_MAGIC) + 4
+    if len(blob) < prefix or not blob.startswith(SNAPSHOT_MAGIC):
+        log.warning("compiled_snapshot_rejected", path=path, reason="not a bylaw snapshot")
+        return None
+    (header_length,) = struct.unpack_from("<I", blob, len(SNAPSHOT_MAGIC))
+    view = memoryview(blob)
+    try:
+        header = json.loads(bytes(view[prefix:prefix + header_length]))
+    except ValueError:
+        log.warning("compiled_snapshot_rejected", path=path, reason="unreadable header")
+        return None
+    payload = view[prefix + header_length:]
+    reason = None
+    if header.get("format") != SNAPSHOT_FORMAT:
+        reason = f"format {header.get('format')}, expected {SNAPSHOT_FORMAT}"
+    elif len(payload) != header.get("payload_bytes") or hashlib.sha256(payload).hexdigest() != header.get("payload_sha256"):
+        reason = "checksum mismatch"
+    else:
+        stored = header.get("sources", {})
+        # A missing city file cannot make the snapshot stale; the snapshot is then the only copy
+        stale = [city for city, digest in source_digests(data_dir).items()
+                 if city not in stored or (digest is not None and digest != stored[city])]
+        if stale:
+            reason = f"stale for {', '.join(stale)}"
+    if reason:
+        log.warning("compiled_snapshot_rejected", path=path, reason=reason)
+        return None
+    snapshot = RegulationSnapshot.from_compiled(1, pickle.loads(payload), source_mtimes(data_dir))
+    log.info("compiled_snapshot_loaded", path=path, built_at=header.get("built_at"), bytes=len(blob))
+    return snapshot
+
+_snapshot = None
+_serialize = None
+_reload_lock = threading.Lock()  # serializes writers only, readers never take it
+_variants_lock = threading.Lock()
+_watcher = None
+
+
+def current_snapshot():
+    """The published snapshot; a plain attribute read, safe without a lock"""
+    return _snapshot
+
+def init_snapshot(serialize, data_dir=DATA_DIR, compiled_path=SNAPSHOT_PATH):
+    """Publish the first snapshot at startup.
+
+    Uses the compiled snapshot at `compiled_path` when it matches the city
+    files, otherwise parses and derives everything from the JSON.
+    """
+    global _snapshot, _serialize
+    _serialize = serialize
+    snapshot = read_compiled_snapshot(compiled_path, data_dir) if compiled_path else None
+    if snapshot is None:
+        snapshot = RegulationSnapshot(1, load_city_data(data_dir), source_mtimes(data_dir), serialize)
+    _snapshot = snapshot
+    return _snapshot
+
+def reload_snapshot(data_dir=DATA_DIR, force=False):
+    """Rebuild from disk and swap it in; returns (reloaded, snapshot).
+
+    Raises BylawDataError and keeps serving the old snapshot if the new files
+    do not validate.
+    """
+    global _snapshot
+    with _reload_lock:
+        old = _snapshot
+        mtimes = source_mtimes(data_dir)
+        if not force and old is not None and mtimes == old.source_mtimes:
+            return False, old
+        cities_data = load_city_data(data_dir, strict=True)
+        new = RegulationSnapshot(old.version + 1 if old else 1, cities_data, mtimes, _serialize)
+        _snapshot = new
+    log.info("bylaws_reloaded", version=new.version, etag=new.form_options_payload["digest"])
+    return True, new
+
+def _watch(interval, data_dir):
+    while True:
+        time.sleep(interval)
+        try:
+            reload_snapshot(data_dir)
+        except BylawDataError as e:
+            log.warning("bylaw_reload_rejected", version=_snapshot.version, errors=e.errors)
+        except Exception as e:
+            log.exception("bylaw_reload_failed", error=str(e))
+
+def start_watcher(interval, data_dir=DATA_DIR):
+    """Poll the city files' mtimes every `interval` seconds in a daemon thread.
+
+    Threads do not survive fork(), so a forked worker sees a dead watcher
+    inherited from its parent and starts its own.
+    """
+    global _watcher
+    if (_watcher is not None and _watcher.is_alive()) or interval <= 0:
+        return _watcher
+    _watcher = threading.Thread(target=_watch, args=(interval, data_dir), name="bylaw-watcher", daemon=True)
+    _watcher.start()
+    log.info("bylaw_watcher_started", interval_s=interval)
+    return _watcher
@@ -0,0 +1,94 @@
+"""Leveled, sampled JSON-lines logging.
+
+    log = get_logger("app")
+    log.info("plan_generated", city="Lahore", solve_ms=212.4)
+
+Every event is one JSON object per line on stderr. LOG_LEVEL (default INFO)
+drops events below it before anything is formatted, and LOG_SAMPLE_RATE
+(0-1, default 1) keeps only that fraction of DEBUG/INFO events; warnings and
+errors are never sampled away. LOG_LEVEL=WARNING takes logging off the
+request hot path entirely.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1"))
+ROOT_LOGGER = "intelliplan"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc_type"] = record.exc_info[0].__name__
+            entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class StructuredLogger:
+    """Thin wrapper that takes an event name plus keyword fields"""
+
+    def __init__(self, logger, sample_rate=LOG_SAMPLE_RATE):
+        self._logger = logger
+        self.sample_rate = sample_rate
+
+    def enabled(self, level=logging.INFO):
+        """Guard for fields that are expensive to compute"""
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level, event, sample, exc_info, fields):
+        if not self._logger.isEnabledFor(level):
+            return
+        rate = self.sample_rate if sample is None else sample
+        if level < logging.WARNING and rate < 1 and random.random() >= rate:
+            return
+        self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event, sample=None, **fields):
+        self._log(logging.DEBUG, event, sample, None, fields)
+
+    def info(self, event, sample=None, **fields):
+        self._log(logging.INFO, event, sample, None, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, 1, None, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, 1, None, fields)
+
+    def exception(self, event, **fields):
+        """ERROR with the traceback of the exception being handled"""
+        self._log(logging.ERROR, event, 1, True, fields)
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+def _configure():
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        root = logging.getLogger(ROOT_LOGGER)
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+        _configured = True
+
+def get_logger(name):
+    if not _configured:
+        _configure()
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"))
@@ -0,0 +1,199 @@
+"""Bill-of-quantities takeoff for a portfolio of plots.
+
+Covered area per floor comes from the plot area and the bylaw coverage
+(ground_coverage_percent on the ground floor, upper_coverage_percent above
+it). Quantities are covered area times QUANTITY_PER_SQFT, a table of
+grey-structure rules of thumb per sq ft with wastage included; the ground
+floor row also carries foundation and plinth. Every floor of every plot is
+one row of a (floors x materials) matrix, so a whole portfolio is a single
+NumPy multiply and a per-plot reduceat.
+
+Costs split the city's per-sq-ft material rate (/api/cost-rates) by
+MATERIAL_COST_SHARE, which gives each material an amount and an implied unit
+price without keeping a separate price list in sync.
+"""
+import math
+
+import numpy as np
+
+import regulations
+from bylaw_terms import FLOOR_ORDER
+from costing import COST_RATES
+from plot_brackets import parse_plot_size
+
+MAX_TAKEOFF_PLOTS = 10000
+MAX_TAKEOFF_FLOORS = 10
+# Portfolio totals above this lose whole units as floats and overflow int64 counts
+MAX_TAKEOFF_TOTAL = 2 ** 53
+
+MATERIALS = ("bricks", "cement_bags", "steel_tonnes", "sand_cft", "aggregate_cft")
+QUANTITY_PER_SQFT = {
+    "ground": {"bricks": 26.0, "cement_bags": 0.50, "steel_tonnes": 0.0042, "sand_cft": 2.0, "aggregate_cft": 1.6},
+    "upper": {"bricks": 22.0, "cement_bags": 0.42, "steel_tonnes": 0.0036, "sand_cft": 1.7, "aggregate_cft": 1.3}
+}
+# Share of the per-sq-ft material rate spent on each material; the rest is fittings, doors, wiring, ...
+MATERIAL_COST_SHARE = {"bricks": 0.15, "cement_bags": 0.22, "steel_tonnes": 0.33, "sand_cft": 0.05, "aggregate_cft": 0.07}
+# Decimal places per material; bricks and bags are ordered whole
+ROUNDING = {"bricks": 0, "cement_bags": 0, "steel_tonnes": 3, "sand_cft": 1, "aggregate_cft": 1}
+
+# Precomputed once: row 0 ground, row 1 upper floors; columns follow MATERIALS
+COEFFICIENTS = np.array([[QUANTITY_PER_SQFT[kind][m] for m in MATERIALS] for kind in ("ground", "upper")])
+COST_SHARES = np.array([MATERIAL_COST_SHARE[m] for m in MATERIALS])
+DETAIL_LEVELS = ("floors", "plots", "totals")
+FLOOR_NAMES = FLOOR_ORDER[1:]  # level 0 is the ground floor
+
+
+class TakeoffInputError(ValueError):
+    """Raised for takeoff requests that cannot be evaluated"""
+
+
+def _number(plot, key, index):
+    value = plot.get(key)
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise TakeoffInputError(f"Plot {index}: '{key}' must be a number") from None
+    if not value > 0 or not math.isfinite(value):
+        raise TakeoffInputError(f"Plot {index}: '{key}' must be a positive finite number")
+    return value
+
+def _plot_row(snapshot, plot, index, defaults):
+    """(plot area, floors, ground %, upper %, material rate) for one portfolio entry"""
+    if not isinstance(plot, dict):
+        raise TakeoffInputError(f"Plot {index}: must be an object")
+    plot = {**defaults, **plot} if defaults else plot
+    city, authority, plot_size = plot.get("city"), plot.get("authority"), plot.get("plotSize")
+    bylaws = {}
+    if plot_size is not None:
+        entry = snapshot.lookup_plot(city, authority, plot_size)
+        if entry is None:
+            raise TakeoffInputError(f"Plot {index}: unknown city, authority or plot size {city} / {authority} / {plot_size}")
+        plot_size, bylaws = entry
+
+    length, width = _number(plot, "length", index), _number(plot, "width", index)
+    if length and width:
+        area = length * width
+        if not math.isfinite(area):
+            raise TakeoffInputError(f"Plot {index}: 'length' x 'width' is too large")
+    else:
+        dimensions = regulations.STANDARD_DIMENSIONS.get(regulations.plot_size_slug(plot_size)) if plot_size else None
+        bounds = parse_plot_size(plot_size) if plot_size else None
+        if dimensions:
+            area = dimensions["length"] * dimensions["width"]
+        elif bounds and bounds[0] == bounds[1]:
+            area = bounds[0]
+        else:
+            raise TakeoffInputError(f"Plot {index}: give length and width, or a plot size with standard dimensions")
+
+    floors = plot.get("floors", bylaws.get("max_floors"))
+    if not isinstance(floors, int) or isinstance(floors, bool) or not 1 <= floors <= MAX_TAKEOFF_FLOORS:
+        raise TakeoffInputError(f"Plot {index}: 'floors' must be an integer from 1 to {MAX_TAKEOFF_FLOORS}")
+
+    ground = _number(plot, "groundCoverage", index) or bylaws.get("ground_coverage_percent")
+    upper = _number(plot, "upperCoverage", index) or bylaws.get("upper_coverage_percent") or ground
+    if not ground:
+        raise TakeoffInputError(f"Plot {index}: no ground coverage; give groundCoverage or a city/authority/plotSize")
+
+    material_rate = _number(plot, "materialRate", index)
+    if material_rate is None:
+        rates = COST_RATES.get(city)
+        if rates is None:
+            raise TakeoffInputError(f"Plot {index}: give materialRate or a city with cost rates")
+        tier = plot.get("materialTier", "standard")
+        if tier not in rates["material_rates"]:
+            raise TakeoffInputError(f"Plot {index}: unknown material tier '{tier}'")
+        material_rate = rates["material_rates"][tier]
+    return area, floors, float(ground), float(upper), material_rate
+
+
+def portfolio_columns(snapshot, plots, defaults=None):
+    """Validate a portfolio and turn it into per-plot columns"""
+    if not isinstance(plots, list) or not plots:
+        raise TakeoffInputError("'plots' must be a non-empty list")
+    if len(plots) > MAX_TAKEOFF_PLOTS:
+        raise TakeoffInputError(f"At most {MAX_TAKEOFF_PLOTS} plots per call")
+    if defaults is not None and not isinstance(defaults, dict):
+        raise TakeoffInputError("'defaults' must be an object")
+    rows = [_plot_row(snapshot, plot, index, defaults or {}) for index, plot in enumerate(plots)]
+    area, floors, ground, upper, material_rate = (np.array(column) for column in zip(*rows))
+    return {"plot_area_sqft": area, "floors": floors.astype(np.int64), "ground_coverage_percent": ground,
+            "upper_coverage_percent": upper, "material_rate": material_rate}
+
+
+def compute_takeoff(columns):
+    """Quantities per floor and per plot plus material costs, all vectorized"""
+    floors = columns["floors"]
+    plot_of_floor = np.repeat(np.arange(len(floors)), floors)
+    starts = np.concatenate(([0], np.cumsum(floors)[:-1]))
+    level = np.arange(plot_of_floor.size) - starts[plot_of_floor]   # 0 = ground
+    upper = level > 0
+    coverage = np.where(upper, columns["upper_coverage_percent"][plot_of_floor],
+                        columns["ground_coverage_percent"][plot_of_floor])
+    with np.errstate(over="ignore", invalid="ignore"):
+        covered = columns["plot_area_sqft"][plot_of_floor] * coverage / 100
+        floor_quantities = covered[:, None] * COEFFICIENTS[upper.astype(np.int64)]
+        plot_quantities = np.add.reduceat(floor_quantities, starts, axis=0)
+        plot_covered = np.add.reduceat(covered, starts)
+        # Material spend per plot, split by share; implied unit price = spend / quantity
+        material_cost = plot_covered * columns["material_rate"]
+        plot_costs = material_cost[:, None] * COST_SHARES
+        # Everything is non-negative, so bounded totals bound every row as well
+        totals = np.concatenate((plot_quantities.sum(axis=0), [material_cost.sum()]))
+    if not (totals < MAX_TAKEOFF_TOTAL).all():
+        raise TakeoffInputError("Quantities or costs overflow; check plot dimensions, coverage and rates")
+    return {
+        "floor_plot": plot_of_floor, "floor_level": level, "floor_covered_sqft": covered,
+        "floor_quantities": floor_quantities, "plot_covered_sqft": plot_covered,
+        "plot_quantities": plot_quantities, "plot_costs": plot_costs, "material_cost": material_cost
+    }
+
+
+def _rounded(matrix):
+    return {m: np.round(matrix[..., i], ROUNDING[m]) if ROUNDING[m] else np.ceil(matrix[..., i]).astype(np.int64)
+            for i, m in enumerate(MATERIALS)}
+
+def takeoff_report(columns, result, detail="floors"):
+    """JSON-ready report; detail trims it to plot totals or the portfolio total"""
+    if detail not in DETAIL_LEVELS:
+        raise TakeoffInputError(f"'detail' must be one of {', '.join(DETAIL_LEVELS)}")
+    quantities = result["plot_quantities"]
+    total_quantities = quantities.sum(axis=0)
+    total_costs = result["plot_costs"].sum(axis=0)
+    report = {
+        "count": len(columns["floors"]),
+        "totals": {
+            "covered_area_sqft": round(float(result["plot_covered_sqft"].sum()), 1),
+            "quantities": {m: v.item() for m, v in _rounded(total_quantities).items()},
+            "costs": {m: round(float(v)) for m, v in zip(MATERIALS, total_costs)},
+            "material_cost": round(float(result["material_cost"].sum())),
+            "implied_unit_prices": {m: round(float(c / q), 2) if q else None
+                                    for m, c, q in zip(MATERIALS, total_costs, total_quantities)}
+        },
+        "coefficients": {"per_sqft": QUANTITY_PER_SQFT, "cost_share": MATERIAL_COST_SHARE}
+    }
+    if detail == "totals":
+        return report
+
+    plot_rounded = {m: v.tolist() for m, v in _rounded(quantities).items()}
+    covered = np.round(result["plot_covered_sqft"], 1).tolist()
+    costs = np.round(result["plot_costs"]).tolist()
+    plots = [{
+        "index": index,
+        "covered_area_sqft": covered[index],
+        "quantities": {m: plot_rounded[m][index] for m in MATERIALS},
+        "costs": dict(zip(MATERIALS, costs[index]))
+    } for index in range(report["count"])]
+
+    if detail == "floors":
+        floor_rounded = {m: v.tolist() for m, v in _rounded(result["floor_quantities"]).items()}
+        floor_covered = np.round(result["floor_covered_sqft"], 1).tolist()
+        for row, (plot, level) in enumerate(zip(result["floor_plot"].tolist(), result["floor_level"].tolist())):
+            plots[plot].setdefault("floors", []).append({
+                "floor": FLOOR_NAMES[level] if level < len(FLOOR_NAMES) else f"floor-{level}",
+                "covered_area_sqft": floor_covered[row],
+                "quantities": {m: floor_rounded[m][row] for m in MATERIALS}
+            })
+    report["plots"] = plots
+    return report
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules are flat siblings of this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Read at import time: no rate limits between test requests, and quiet logs
+os.environ.setdefault("ADMISSION_ENABLED", "0")
+os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+
+
+@pytest.fixture(scope="session")
+def app():
+    import app as backend
+    return backend.create_app(start_watcher=False)
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
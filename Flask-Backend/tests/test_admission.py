@@ -0,0 +1,62 @@
+import pytest
+from flask import Flask
+
+import admission
+from admission import AdmissionController, parse_limits
+
+
+def test_rate_limit_is_per_client():
+    controller = AdmissionController({"api.x": (1, 2, 0)})
+    assert controller.admit("api.x", "a") is None
+    assert controller.admit("api.x", "a") is None
+    status, reason, retry_after = controller.admit("api.x", "a")
+    assert (status, reason) == (429, "rate") and 0 < retry_after <= 1
+    assert controller.admit("api.x", "b") is None
+    assert controller.stats()["rejected"] == {"api.x:rate": 1}
+
+def test_concurrency_cap_frees_on_release():
+    controller = AdmissionController({"api.x": (0, 0, 2)})
+    assert controller.admit("api.x", "a") is None
+    assert controller.admit("api.x", "b") is None
+    assert controller.admit("api.x", "c")[:2] == (503, "concurrency")
+    controller.release("api.x")
+    assert controller.admit("api.x", "c") is None
+
+def test_parse_limits():
+    limits = parse_limits("api.generate_plan=1:3:2, api.batch=off")
+    assert limits["api.generate_plan"] == (1.0, 3.0, 2)
+    assert "api.batch" not in limits
+    with pytest.raises(ValueError):
+        parse_limits("api.batch=1:2")
+
+def test_rejections_carry_retry_after(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    app = Flask(__name__)
+    admission.install(app, AdmissionController({"limited": (1, 1, 0)}))
+
+    @app.route("/limited")
+    def limited():
+        return "ok"
+
+    client = app.test_client()
+    assert client.get("/limited").status_code == 200
+    rejected = client.get("/limited")
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "1"
+    assert rejected.json["retry_after"] == 1
+    # Another client behind the trusted local proxy has its own bucket
+    assert client.get("/limited", headers={"X-Forwarded-For": "203.0.113.9"}).status_code == 200
+
+def test_busy_endpoint_answers_503(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    app = Flask(__name__)
+    controller = AdmissionController({"busy": (0, 0, 1)})
+    admission.install(app, controller)
+
+    @app.route("/busy")
+    def busy():
+        # A second request while this one is in flight
+        return str(app.test_client().get("/busy").status_code)
+
+    assert app.test_client().get("/busy").text == "503"
+    assert controller.stats()["in_flight"] == {"busy": 0}
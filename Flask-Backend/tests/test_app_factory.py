@@ -0,0 +1,8 @@
+from flask import Flask
+
+
+def test_module_level_app_is_built_once():
+    import app as backend
+    assert isinstance(backend.app, Flask)
+    assert backend.app is backend.app
+    assert backend.app.test_client().get("/api/cities").status_code == 200
@@ -0,0 +1,19 @@
+def test_batch_runs_each_request_in_order(client):
+    response = client.post("/api/batch", json={"requests": [
+        {"id": "cities", "path": "/api/cities"},
+        {"path": "/api/no-such-route"},
+        {"id": "nested", "method": "POST", "path": "/api/batch", "body": {"requests": []}},
+    ]})
+    assert response.status_code == 200
+    entries = response.json["responses"]
+    assert [e["id"] for e in entries] == ["cities", 1, "nested"]
+    assert [e["status"] for e in entries] == [200, 404, 400]
+    assert "Lahore" in str(entries[0]["body"])
+
+def test_batch_rejects_non_object_body(client):
+    response = client.post("/api/batch", json=[{"path": "/api/cities"}])
+    assert response.status_code == 400
+    assert "JSON object" in response.json["error"]
+
+def test_batch_needs_requests(client):
+    assert client.post("/api/batch", json={"requests": []}).status_code == 400
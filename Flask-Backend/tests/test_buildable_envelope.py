@@ -0,0 +1,58 @@
+import pytest
+
+import buildable_envelope as be
+
+L_SHAPE = [(0, 0), (60, 0), (60, 30), (30, 30), (30, 60), (0, 60)]
+U_SHAPE = [(0, 0), (40, 0), (40, 40), (28, 40), (28, 12), (12, 12), (12, 40), (0, 40)]
+
+
+def _footprint(polygon, setbacks):
+    parcel = {"polygon": [list(p) for p in polygon], "orientation": "South", "setbacks": setbacks}
+    return be.parcel_envelope(None, parcel)[0]
+
+def _box(points):
+    xs, ys = [x for x, _ in points], [y for _, y in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def test_l_shape_keeps_both_arms_under_small_setbacks():
+    result = _footprint(L_SHAPE, {"front": 5, "rear": 3, "side": 2})
+    assert result["setback_area_sqft"] == 2012.0
+    assert len(result["setback_polygon"]) == 6
+    assert result["warnings"] == []
+
+@pytest.mark.parametrize("front", [28, 29.5])
+def test_l_shape_arm_swallowed_by_front_setback(front):
+    result = _footprint(L_SHAPE, {"front": front, "rear": 3, "side": 2})
+    assert _box(result["setback_polygon"]) == (2.0, front, 28.0, 57.0)
+    assert result["setback_area_sqft"] == round(26 * (57 - front), 1)
+
+def test_l_shape_front_setback_only():
+    result = _footprint(L_SHAPE, {"front": 10, "rear": 0, "side": 0})
+    assert result["setback_area_sqft"] == 2100.0
+
+def test_u_shape_with_no_room_left():
+    with pytest.raises(be.EnvelopeInputError, match="no buildable area"):
+        _footprint(U_SHAPE, {"front": 8, "rear": 8, "side": 8})
+
+def test_u_shape_base_swallowed_keeps_largest_arm():
+    result = _footprint(U_SHAPE, {"front": 13, "rear": 3, "side": 3})
+    assert result["setback_area_sqft"] == 144.0
+    assert _box(result["setback_polygon"]) in {(3.0, 13.0, 9.0, 37.0), (31.0, 13.0, 37.0, 37.0)}
+    assert "split the plot" in result["warnings"][0]
+
+def test_strips_match_half_plane_clipping_on_convex_plots():
+    points = [(0, 0), (50, 0), (60, 40), (10, 55)]
+    setbacks = [10, 2, 5, 3]
+    convex = be.inset_polygon(points, setbacks, True)[0]
+    general = be.inset_polygon(points, setbacks, False)[0]
+    assert be.polygon_area(general) == pytest.approx(be.polygon_area(convex))
+
+def test_overflowing_polygon_is_rejected():
+    huge = [[0, 0], [1e300, 0], [1e300, 1e300], [0, 1e300]]
+    with pytest.raises(be.EnvelopeInputError, match="too large"):
+        be.normalize_polygon(huge)
+
+def test_batch_rejects_non_object_body(client):
+    response = client.post("/api/buildable-envelope/batch", json=[1])
+    assert response.status_code == 400
@@ -0,0 +1,44 @@
+import pytest
+
+URL = "/api/bylaws/query"
+
+
+def _query(client, body):
+    response = client.post(URL, json=body)
+    assert response.status_code == 200, response.json
+    return response.json
+
+def test_conditions_are_anded_and_sorted(client):
+    result = _query(client, {
+        "where": [{"field": "ground_coverage_percent", "op": ">=", "value": 70},
+                  {"field": "far", "op": ">=", "value": 2.5}],
+        "sort": "-max_height_ft",
+    })
+    rows = result["results"]
+    assert result["total"] == len(rows) > 0
+    assert all(r["ground_coverage_percent"] >= 70 and r["far"] >= 2.5 for r in rows)
+    heights = [r["max_height_ft"] for r in rows]
+    assert heights == sorted(heights, reverse=True)
+
+def test_city_filter_limit_and_fields(client):
+    everything = _query(client, {"city": "Lahore"})
+    page = _query(client, {"city": ["lahore"], "limit": 2, "fields": ["max_floors"]})
+    assert page["total"] == everything["total"] and page["count"] == 2
+    assert set(page["results"][0]) == {"city", "authority", "plot_size", "max_floors"}
+    assert {r["city"] for r in everything["results"]} == {"Lahore"}
+
+def test_missing_values_never_match(client):
+    matched = _query(client, {"where": [{"field": "upper_coverage_percent", "op": "!=", "value": -1}]})
+    assert all(r["upper_coverage_percent"] is not None for r in matched["results"])
+
+@pytest.mark.parametrize("body", [
+    [1],
+    {"where": {"field": "far"}},
+    {"where": [{"field": "colour", "op": "==", "value": 1}]},
+    {"where": [{"field": "far", "op": "~", "value": 1}]},
+    {"where": [{"field": "far", "op": ">", "value": "2"}]},
+    {"limit": 0},
+    {"sort": ["far"]},
+])
+def test_bad_queries(client, body):
+    assert client.post(URL, json=body).status_code == 400
@@ -0,0 +1,63 @@
+import pytest
+
+import regulations
+from bylaw_search import BylawSearchError, BylawSearchIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    return BylawSearchIndex(regulations.load_city_data())
+
+def _ranges(index, text):
+    clauses, ignored = index.parse(text)
+    assert ignored == []
+    return [(c["field"], c["op"], c["value"]) for c in clauses if c["kind"] == "range"]
+
+def _terms(index, text):
+    return [(c["term"], c["negated"]) for c in index.parse(text)[0] if c["kind"] == "term"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("4 floors with 0 side setback", [("max_floors", ">=", 4), ("setback_side_ft", "==", 0)]),
+    ("far 2.5", [("far", ">=", 2.5)]),
+    ("FAR over 2.5 coverage >= 70", [("far", ">", 2.5), ("ground_coverage_percent", ">=", 70)]),
+    ("coverage >= 70 far over 2.5", [("ground_coverage_percent", ">=", 70), ("far", ">", 2.5)]),
+    ("height 40 floors 3", [("max_height_ft", ">=", 40), ("max_floors", ">=", 3)]),
+    ("4 floors 3 bedrooms", [("max_floors", ">=", 4), ("bedrooms_max", ">=", 3)]),
+    ("5 ft front setback 3 ft side setback", [("setback_front_ft", "==", 5), ("setback_side_ft", "==", 3)])
+])
+def test_numbers_bind_to_their_field(index, text, expected):
+    assert _ranges(index, text) == expected
+
+def test_area_clause(index):
+    clauses, _ = index.parse("10 marla with 2 floors")
+    assert [c["kind"] for c in clauses] == ["area", "range"]
+    assert clauses[0]["text"] == "10 marla"
+
+@pytest.mark.parametrize("text", ["no basement", "without a basement", "plots without the basement"])
+def test_negation_carries_over_fillers(index, text):
+    assert _terms(index, text) == [("basement", True)]
+
+def test_negation_stops_at_a_range_clause(index):
+    assert _terms(index, "no 5 ft front setback garage") == [("garage", False)]
+
+def test_negated_term_complements_documents(index):
+    plain = index.parse("garage")[0][0]["docs"]
+    negated = index.parse("no garage")[0][0]["docs"]
+    assert plain | negated == set(range(len(index))) and not plain & negated
+
+def test_search_requires_text(index):
+    with pytest.raises(BylawSearchError):
+        index.search("  ")
+
+def test_search_endpoint(client):
+    response = client.get("/api/bylaws/search", query_string={"q": "lahore 3 floors", "limit": 2})
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert 0 < len(results) <= 2
+    assert all(r["city"] == "Lahore" and r["max_floors"] >= 3 for r in results)
+
+@pytest.mark.parametrize("params", [{}, {"q": "lahore", "limit": "x"}, {"q": "lahore", "limit": "0"},
+                                    {"q": "lahore", "match": "some"}])
+def test_search_endpoint_rejects_bad_parameters(client, params):
+    assert client.get("/api/bylaws/search", query_string=params).status_code == 400
@@ -0,0 +1,65 @@
+import logging
+
+import pytest
+
+from structured_log import ROOT_LOGGER
+
+
+def test_calculator_totals(client):
+    response = client.post("/api/construction-calculator", json={"length": 30, "width": 60, "floors": 2})
+    assert response.status_code == 200
+    totals = response.json["breakdown"]["totals"]
+    # (2600 + 500 + 150 + 100 + 800) per sq ft on 3600 sq ft, plus 5% contingency
+    assert totals["subtotal"] == 3600 * 4150
+    assert totals["total_cost"] == pytest.approx(3600 * 4150 * 1.05)
+
+@pytest.mark.parametrize("body", [{"length": "nan", "width": 30, "floors": 1},
+                                  {"length": 1e200, "width": 1e200, "floors": 1}])
+def test_debug_logging_does_not_change_the_response(client, body):
+    logger = logging.getLogger(f"{ROOT_LOGGER}.app")
+    level = logger.level
+    logger.setLevel(logging.DEBUG)
+    try:
+        assert client.post("/api/construction-calculator", json=body).status_code == 200
+    finally:
+        logger.setLevel(level)
+
+
+BATCH = "/api/construction-calculator/batch"
+
+def test_batch_grid_is_row_major(client):
+    response = client.post(BATCH, json={"grid": {"length": [30, 40], "width": {"start": 20, "stop": 30, "num": 3}},
+                                        "scenarios": {"floors": 2}})
+    assert response.status_code == 200
+    inputs, results = response.json["inputs"], response.json["results"]
+    assert response.json["count"] == 6
+    assert inputs["length"] == [30, 30, 30, 40, 40, 40]
+    assert inputs["width"] == [20, 25, 30, 20, 25, 30]
+    assert results["construction_area_sqft"][0] == 30 * 20 * 2
+
+def test_batch_matches_single_calculator(client):
+    body = {"length": 35, "width": 70, "floors": 3, "materialRate": 3000}
+    single = client.post("/api/construction-calculator", json=body).json["breakdown"]["totals"]["total_cost"]
+    batch = client.post(BATCH, json={"scenarios": body}).json["results"]["total_cost"]
+    assert batch == [pytest.approx(single)]
+
+def test_batch_ndjson_stream(client):
+    response = client.post(BATCH, json={"grid": {"length": [30, 40]}, "scenarios": {"width": 20, "floors": 1}, "stream": True})
+    lines = response.data.decode().strip().split("\n")
+    assert response.mimetype == "application/x-ndjson" and len(lines) == 2
+
+@pytest.mark.parametrize("body", [
+    {"grid": {"length": {"start": 1, "stop": 2, "num": 10 ** 10}}},
+    {"grid": {"length": ["a"]}},
+    {"grid": {"length": [[1, 2]]}},
+    {"grid": {"length": ["nan"]}},
+    {"scenarios": {"length": "inf", "width": 30, "floors": 1}},
+    {"scenarios": {"length": 1e200, "width": 1e200, "floors": 1}},
+    {"grid": {key: list(range(1, 1001)) for key in ("length", "width", "floors")}},
+    [1],
+    "grid"
+])
+def test_batch_rejects_bad_input(client, body):
+    response = client.post(BATCH, json=body)
+    assert response.status_code == 400
+    assert response.json["error"]
@@ -0,0 +1,30 @@
+import pytest
+
+from compliance import check, compile_rules
+
+RULES = compile_rules({
+    "max_floors": 2,
+    "ground_coverage_percent": 70,
+    "setbacks": {"front": 5, "rear": 3, "side": 0},
+    "floors": {"ground": {"bedrooms_max": 2, "bathrooms_max": 2, "garage": True}}
+})
+
+
+@pytest.mark.parametrize("candidate, message", [
+    ({"coveragePercent": 70}, "'coveragePercent' must be an object"),
+    ({"setbacks": [1]}, "'setbacks' must be an object"),
+    ({"floorAreas": "ground"}, "'floorAreas' must be an object"),
+    ({"floors": "ground"}, "'floors' must be a list of floor names or a count"),
+    ({"serviceZones": "Garage"}, "'serviceZones' must be a list"),
+    ({"perFloor": {"ground": 3}}, "'perFloor.ground' must be an object"),
+    (5, "Candidate must be an object"),
+    ([{"floors": 1}], "Candidate must be an object")
+])
+def test_malformed_fields_are_input_violations(candidate, message):
+    violations = check(RULES, candidate)
+    assert [v["rule"] for v in violations] == ["input"]
+    assert violations[0]["message"] == message
+
+def test_well_formed_candidate_is_checked():
+    violations = check(RULES, {"floors": ["ground"], "coveragePercent": {"ground": 80}, "setbacks": {"front": 4}})
+    assert {v["rule"] for v in violations} == {"ground_coverage_percent", "setback_front"}
@@ -0,0 +1,34 @@
+import threading
+
+from content_cache import TieredCache
+
+
+def test_tiers_count_hits_misses_and_evictions(tmp_path):
+    cache = TieredCache(10, directory=str(tmp_path), max_disk_bytes=100)
+    cache.put("aa01", b"12345678")
+    cache.put("aa02", b"12345678")  # pushes aa01 out of memory, not off disk
+    assert cache.get("aa02") == b"12345678"
+    assert cache.get("aa01") == b"12345678"
+    assert cache.get("aa03") is None
+    stats = cache.stats()
+    assert stats["hits"] == {"memory": 1, "disk": 1}
+    assert stats["misses"] == 1
+    assert stats["memory"]["evictions"] == 2
+    assert stats["disk"]["bytes"] == 16
+
+def test_counters_are_exact_under_concurrent_gets():
+    cache = TieredCache(1000)
+    cache.put("hit", b"x")
+
+    def worker():
+        for _ in range(2000):
+            cache.get("hit")
+            cache.get("miss")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats["hits"]["memory"] == stats["misses"] == 16000
@@ -0,0 +1,47 @@
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+from cost_simulation import Distribution, SimulationInputError, simulate
+
+
+def _truncated_mean(mean, sd):
+    a = -mean / sd
+    return mean + sd * NormalDist().pdf(a) / (1 - NormalDist().cdf(a))
+
+
+@pytest.mark.parametrize("mean, sd", [(100, 200), (-30, 10), (0, 1)])
+def test_normal_is_truncated_not_clipped(mean, sd):
+    values = Distribution("labor", {"dist": "normal", "mean": mean, "sd": sd}).draw(np.random.default_rng(0), 400000)
+    assert values.min() > 0
+    assert values.mean() == pytest.approx(_truncated_mean(mean, sd), rel=0.01)
+    # No lump at the cut
+    assert (values < sd * 1e-3).mean() < 0.01
+
+def test_normal_with_no_mass_above_zero_is_rejected():
+    with pytest.raises(SimulationInputError):
+        Distribution("labor", {"dist": "normal", "mean": -1000, "sd": 10})
+
+def test_simulation_is_reproducible_and_ordered():
+    body = {"length": 30, "width": 60, "floors": 2, "draws": 50000, "seed": 7,
+            "rates": {"material": {"dist": "triangular", "low": 2400, "mode": 2600, "high": 3200}}}
+    first, second = simulate(body), simulate(body)
+    assert first["total"] == second["total"]
+    total = first["total"]
+    assert total["p10"] < total["p50"] < total["p90"]
+    # Only material varies; contingency scales with it
+    shares = {line: entry["share_of_variance"] for line, entry in first["lines"].items()}
+    assert shares["material"] + shares["contingency"] == pytest.approx(1.0)
+    assert shares["labor"] == pytest.approx(0.0)
+
+@pytest.mark.parametrize("body", [
+    [1],
+    {"length": 1e200, "width": 1e200, "floors": 1},
+    {"length": 1e150, "width": 1e150, "floors": 1},
+    {"length": 30, "width": 60, "floors": 1, "draws": 0},
+    {"length": 30, "width": 60, "floors": 1, "rates": {"roofing": 5}}
+])
+def test_bad_requests(body):
+    with pytest.raises(SimulationInputError):
+        simulate(body)
@@ -0,0 +1,56 @@
+import pytest
+
+import estimate_store
+from estimate_store import EstimateQueryError, EstimateStore, encode_cursor
+
+
+def _estimate(index, city="Lahore"):
+    return {"estimate_id": f"EST_{index:04d}", "total_cost": 1000 * index,
+            "project_details": {"city": city, "authority": "LDA", "plot_size": "10 Marla"}}
+
+@pytest.fixture
+def store(tmp_path):
+    store = EstimateStore(str(tmp_path / "estimates.db"), batch_size=8)
+    for index in range(25):
+        store.save(_estimate(index, "Karachi" if index % 5 == 0 else "Lahore"), created_at=1000 + index // 2)
+    return store
+
+def test_pages_walk_every_row_newest_first_without_overlap(store):
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.query(city="Lahore", limit=6, cursor=cursor)
+        seen.extend(e["estimate_id"] for e in page)
+        if cursor is None:
+            break
+    expected = [f"EST_{i:04d}" for i in reversed(range(25)) if i % 5]
+    assert seen == expected
+    assert store.stats()["written"] == 25
+
+def test_date_range_and_limits(store):
+    page, cursor = store.query(since=1003, until=1005)
+    assert sorted(e["estimate_id"] for e in page) == [f"EST_{i:04d}" for i in range(6, 10)]
+    assert cursor is None
+    assert len(store.query(limit=10_000)[0]) == 25
+    assert store.get("EST_0003")["total_cost"] == 3000
+    assert store.get("EST_9999") is None
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor("x", "EST"), "WzFd"])
+def test_bad_cursors(store, cursor):
+    with pytest.raises(EstimateQueryError):
+        store.query(cursor=cursor)
+
+def test_endpoints_page_through_saved_estimates(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(estimate_store, "_store", EstimateStore(str(tmp_path / "api.db")))
+    body = {"city": "Lahore", "authority": "LDA", "plotSize": "10 Marla", "length": 35, "width": 65,
+            "floors": 2, "totalCost": 15925000}
+    ids = [client.post("/api/cost-estimate", json=body).json["estimate"]["estimate_id"] for _ in range(3)]
+    assert client.post("/api/cost-estimate", json=5).status_code == 400
+    first = client.get("/api/cost-estimates", query_string={"city": "Lahore", "limit": 2}).json
+    assert first["count"] == 2 and first["next_cursor"]
+    second = client.get("/api/cost-estimates", query_string={"city": "Lahore", "limit": 2,
+                                                             "cursor": first["next_cursor"]}).json
+    assert second["count"] == 1 and second["next_cursor"] is None
+    listed = {e["estimate_id"] for e in first["estimates"] + second["estimates"]}
+    assert listed == set(ids)
+    assert client.get("/api/cost-estimates", query_string={"cursor": "bad"}).status_code == 400
+    assert client.get(f"/api/cost-estimates/{ids[0]}").json["estimate"]["estimate_id"] == ids[0]
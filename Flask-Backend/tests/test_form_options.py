@@ -0,0 +1,52 @@
+import gzip
+import json
+
+URL = "/api/form-options"
+
+
+def test_conditional_get_answers_304(client):
+    first = client.get(URL)
+    assert first.status_code == 200
+    assert first.headers["Vary"] == "Accept-Encoding"
+    etag = first.headers["ETag"]
+    again = client.get(URL, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+    assert client.get(URL, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+def test_gzip_body_matches_identity(client):
+    plain = client.get(URL)
+    zipped = client.get(URL, headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert len(zipped.data) < len(plain.data)
+    assert json.loads(gzip.decompress(zipped.data)) == plain.json
+    # Any encoding's ETag validates, so switching encodings still revalidates
+    revalidated = client.get(URL, headers={"If-None-Match": zipped.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+def test_filtered_variant_is_cached_too(client):
+    response = client.get(URL, query_string={"city": "Lahore", "fields": "meta"})
+    assert response.status_code == 200
+    assert list(response.json["cities"]) == ["Lahore"]
+    assert client.get(URL, query_string={"city": "Lahore", "fields": "meta"},
+                      headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+def test_bad_filters(client):
+    assert client.get(URL, query_string={"city": "Nowhere"}).status_code == 404
+    assert client.get(URL, query_string={"fields": "nope"}).status_code == 400
+
+def test_city_authority_and_exclude(client):
+    response = client.get(URL, query_string={"city": "Karachi", "authority": "KDA", "exclude": "raw_bylaws",
+                                             "shared": "1"})
+    assert response.status_code == 200
+    cities = response.json["cities"]
+    assert list(cities) == ["Karachi"] and list(cities["Karachi"]["authorities"]) == ["KDA"]
+    plot = next(iter(cities["Karachi"]["authorities"]["KDA"]["plot_sizes"].values()))
+    assert set(plot) == {"meta", "available_options"}
+    assert "definitions" in response.json
+
+def test_dotted_fields_project_single_keys(client):
+    response = client.get(URL, query_string={"fields": "meta.frontend_key,available_options.FAR"})
+    plots = response.json["cities"]["Lahore"]["authorities"]["LDA"]["plot_sizes"]
+    assert plots["10-marla"] == {"meta": {"frontend_key": "10-marla"}, "available_options": {"FAR": "1:2.8"}}
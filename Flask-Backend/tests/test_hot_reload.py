@@ -0,0 +1,55 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import regulations
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch, app):
+    for filename in regulations.CITY_FILES.values():
+        shutil.copy(os.path.join(regulations.DATA_DIR, filename), tmp_path)
+    # Reloads publish a new global snapshot; put the app's own one back afterwards
+    monkeypatch.setattr(regulations, "_snapshot", regulations.current_snapshot())
+    regulations.reload_snapshot(str(tmp_path), force=True)
+    return tmp_path
+
+def _edit_lahore(data_dir, edit):
+    path = data_dir / "lahore.json"
+    data = json.loads(path.read_text())
+    edit(data["authorities"]["LDA"]["plot_sizes"]["10 Marla"])
+    path.write_text(json.dumps(data))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+def test_unchanged_files_are_not_reloaded(data_dir):
+    before = regulations.current_snapshot()
+    assert regulations.reload_snapshot(str(data_dir)) == (False, before)
+
+def test_edit_publishes_a_new_snapshot(data_dir, client):
+    before = regulations.current_snapshot()
+    _edit_lahore(data_dir, lambda plot: plot.update(max_floors=7))
+    reloaded, after = regulations.reload_snapshot(str(data_dir))
+    assert reloaded and after.version == before.version + 1
+    assert regulations.current_snapshot() is after
+    assert after.lookup_plot("Lahore", "LDA", "10-marla")[1]["max_floors"] == 7
+    assert before.lookup_plot("Lahore", "LDA", "10-marla")[1]["max_floors"] == 4
+    assert after.form_options_payload["digest"] != before.form_options_payload["digest"]
+    assert client.get("/api/bylaws/Lahore/LDA/10-marla").json["bylaws"]["max_floors"] == 7
+
+def test_invalid_edit_keeps_the_old_snapshot(data_dir):
+    before = regulations.current_snapshot()
+    _edit_lahore(data_dir, lambda plot: plot.update(ground_coverage_percent=140))
+    with pytest.raises(regulations.BylawDataError) as error:
+        regulations.reload_snapshot(str(data_dir))
+    assert "ground_coverage_percent must be between 0 and 100" in error.value.errors[0]
+    assert regulations.current_snapshot() is before
+
+def test_admin_reload_needs_the_token(client, monkeypatch, data_dir):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.post("/api/admin/reload").status_code == 403
+    response = client.post("/api/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json["snapshot"]["version"] == regulations.current_snapshot().version
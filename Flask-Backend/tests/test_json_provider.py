@@ -0,0 +1,43 @@
+import json
+import math
+
+import pytest
+
+import json_provider
+from json_provider import dumps_bytes, stream_json_array, stream_ndjson
+
+
+def _stdlib(obj):
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("ascii")
+
+@pytest.mark.parametrize("obj", [
+    {"b": 1, "a": [1.5, -2, None, True]},
+    {"exp": 1e16, "small": 0.00001, "neg": -1.5e-7, "digest": "5e3a0000e9", "s": "0.00001"},
+    {"text": "Lahore – DHA ✓", "del": "\x7f"},
+    {"wide": 2 ** 70},
+    [1e300, 123456789.125, 0.1],
+])
+def test_bytes_match_the_stdlib(obj):
+    assert dumps_bytes(obj) == _stdlib(obj)
+
+def test_non_finite_floats_become_null():
+    assert dumps_bytes({"a": math.nan, "b": [math.inf, 1.0]}) == b'{"a":null,"b":[null,1.0]}'
+
+def test_stdlib_fallback_matches(monkeypatch):
+    obj = {"x": [1e16, "é", {"z": 0.00002}], "y": math.inf}
+    fast = dumps_bytes(obj)
+    monkeypatch.setattr(json_provider, "orjson", None)
+    assert dumps_bytes(obj) == fast
+
+def test_streams_join_to_the_whole_body(monkeypatch):
+    monkeypatch.setattr(json_provider, "STREAM_CHUNK_BYTES", 64)
+    records = [{"i": i, "name": "plot" * i} for i in range(50)]
+    chunks = list(stream_json_array(records, head=b'{"results":[', tail=lambda: b'],"n":50}'))
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks)) == {"results": records, "n": 50}
+    lines = b"".join(stream_ndjson(records)).splitlines()
+    assert [json.loads(line) for line in lines] == records
+
+def test_responses_use_the_provider(client):
+    response = client.get("/api/cities")
+    assert response.data == dumps_bytes(response.json) + b"\n"
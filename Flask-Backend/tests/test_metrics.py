@@ -0,0 +1,49 @@
+from flask import Flask
+
+import metrics
+from metrics import Histogram, RequestMetrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 9):
+        histogram.observe(value)
+    assert list(histogram.cumulative()) == [(1, 2), (5, 3), (float("inf"), 4)]
+    assert histogram.sum == 13.5 and histogram.count == 4
+
+def test_requests_are_counted_by_route_template():
+    registry = RequestMetrics()
+    app = Flask(__name__)
+    metrics.install(app, registry)
+
+    @app.route("/items/<int:item_id>")
+    def item(item_id):
+        return {"id": item_id}
+
+    @app.route("/broken")
+    def broken():
+        raise KeyError("boom")
+
+    client = app.test_client()
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+    assert client.get("/broken").status_code == 500
+    assert registry.requests == {("/items/<int:item_id>", "GET", 200): 2, ("unmatched", "GET", 404): 1,
+                                 ("/broken", "GET", 500): 1}
+    assert registry.exceptions == {("/broken", "KeyError"): 1}
+    assert set(registry.in_flight.values()) == {0}
+    text = registry.render()
+    assert 'http_requests_total{route="/items/<int:item_id>",method="GET",status="200"} 2' in text
+    assert 'http_request_duration_seconds_count{route="/items/<int:item_id>",method="GET"} 2' in text
+
+def test_label_values_are_escaped():
+    assert metrics._labels(route='a"b\\c') == '{route="a\\"b\\\\c"}'
+
+def test_metrics_endpoint(client):
+    client.get("/api/cities")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'http_requests_total{route="/api/cities",method="GET",status="200"}' in response.text
+    assert "# TYPE admission_admitted_total counter" in response.text
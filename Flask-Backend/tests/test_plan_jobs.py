@@ -0,0 +1,43 @@
+import time
+
+import plan_jobs
+
+RULES = {"floors": {"ground": {}, "first": {}}}
+CONFIG = {"floors": ["ground", "first"], "bedrooms": 3}
+PLAN = {"city": "Lahore", "authority": "LDA", "plotSize": "10-marla", "floors": ["ground", "floor-1"],
+        "bedrooms": 4, "budgetMs": 25}
+
+
+def _wait(job_id, statuses, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = plan_jobs.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} stuck in {job['status']}")
+
+def test_async_plan_runs_to_a_result(client):
+    queued = client.post("/api/generate-plan?mode=async", json=PLAN)
+    assert queued.status_code == 202
+    job_id = queued.json["job_id"]
+    _wait(job_id, plan_jobs.TERMINAL_STATES)
+    result = client.get(queued.json["result_url"])
+    assert result.status_code == 200
+    assert result.json["plan_id"] == queued.json["plan_id"]
+    assert client.get(f"/api/plan-jobs/{job_id}").json["status"] == "done"
+
+def test_cancelled_running_job_stays_pending_until_it_returns():
+    job_id = plan_jobs.submit((RULES, 30, 60, CONFIG, 1500), lambda layout: layout)
+    future = plan_jobs._jobs[job_id]["future"]
+    _wait(job_id, ("running",))
+    before = plan_jobs.stats()["pending"]
+    assert plan_jobs.cancel(job_id) == "cancelled"
+    assert plan_jobs.stats()["pending"] == before
+    future.result(timeout=30)
+    assert plan_jobs.stats()["pending"] == before - 1
+    assert plan_jobs.get(job_id)["result"] is None
+
+def test_unknown_job(client):
+    assert client.get("/api/plan-jobs/nope").status_code == 404
+    assert client.delete("/api/plan-jobs/nope").status_code == 404
@@ -0,0 +1,58 @@
+import pytest
+
+from plan_layout import MAX_ROOM_COUNT, PlanInputError, build_program, canonical_configuration, solve_plan
+
+RULES = {"floors": {"ground": {"bedrooms_max": 1}, "first": {"bedrooms_max": 2}}}
+PLAN = {"city": "Lahore", "authority": "LDA", "plotSize": "10-marla", "floors": ["ground", "floor-1"],
+        "bedrooms": 3, "budgetMs": 20}
+
+
+def _types(rooms, room_type):
+    return [r["label"] for r in rooms if r["type"] == room_type]
+
+def test_bedrooms_fill_floors_bottom_up_within_caps():
+    program, warnings = build_program({"bedrooms": 4, "washrooms": 0}, ["ground", "first"], RULES)
+    assert _types(program["ground"], "Bedroom") == ["Bedroom 1"]
+    assert _types(program["first"], "Bedroom") == ["Bedroom 2", "Bedroom 3"]
+    assert warnings == ["1 bedroom(s) exceed the per-floor limits and were not placed"]
+
+def test_canonical_configuration_normalizes_equivalent_requests():
+    a = canonical_configuration({"floors": ["First", "ground"], "bedrooms": "3", "public_zones": ["b", "a"]})
+    b = canonical_configuration({"floors": ["ground", "floor-1", "ground"], "bedrooms": 3, "public_zones": ["a", "b"]})
+    assert a == b
+
+@pytest.mark.parametrize("config", [{"bedrooms": 10 ** 9}, {"washrooms": MAX_ROOM_COUNT + 1}, {"floors": "ground"}])
+def test_bad_configurations_are_rejected(config):
+    with pytest.raises(PlanInputError):
+        canonical_configuration(config)
+    with pytest.raises(PlanInputError):
+        solve_plan({}, 30, 60, config, budget_ms=5)
+
+def test_solve_plan_keeps_rooms_inside_each_envelope():
+    layout = solve_plan(RULES, 30, 60, {"floors": ["ground", "floor-1"], "bedrooms": 3}, budget_ms=20)
+    assert [f["floor"] for f in layout["floors"]] == ["ground", "first"]
+    for floor in layout["floors"]:
+        env = floor["envelope"]
+        for room in floor["rooms"]:
+            assert env["x"] - 1e-6 <= room["x"] and room["x"] + room["width"] <= env["x"] + env["width"] + 1e-6
+            assert env["y"] - 1e-6 <= room["y"] and room["y"] + room["depth"] <= env["y"] + env["depth"] + 1e-6
+
+def test_generate_plan_is_cached_by_content(client):
+    first = client.post("/api/generate-plan", json=PLAN)
+    assert first.status_code == 200
+    reordered = {**PLAN, "floors": ["floor-1", "ground"], "bedrooms": "3"}
+    second = client.post("/api/generate-plan", json=reordered)
+    assert second.headers["X-Plan-Cache"] == "hit"
+    assert second.json["plan_id"] == first.json["plan_id"]
+    assert client.get("/api/plan-cache").json["cache"]["memory"]["entries"] >= 1
+
+def test_incremental_plan_gets_its_own_id(client):
+    first = client.post("/api/generate-plan", json=PLAN).json
+    edited = client.post("/api/generate-plan", json={"previousPlanId": first["plan_id"], "delta": {"bedrooms": 2}})
+    assert edited.status_code == 200
+    assert edited.json["previous_plan_id"] == first["plan_id"]
+    assert edited.json["plan_id"] != first["plan_id"]
+
+@pytest.mark.parametrize("body", [[PLAN], {**PLAN, "bedrooms": 10 ** 9}, {"previousPlanId": "../etc/passwd"}])
+def test_generate_plan_rejects_bad_requests(client, body):
+    assert client.post("/api/generate-plan", json=body).status_code == 400
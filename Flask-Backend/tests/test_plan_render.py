@@ -0,0 +1,51 @@
+import struct
+import xml.etree.ElementTree as ET
+import zlib
+
+import pytest
+
+import plan_render
+from content_cache import DiskLRU
+
+PLAN = {"city": "Lahore", "authority": "LDA", "plotSize": "10-marla", "floors": ["ground", "floor-1"],
+        "bedrooms": 3, "budgetMs": 20}
+
+
+@pytest.fixture
+def plan_id(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(plan_render, "_cache", DiskLRU(str(tmp_path), 10 ** 7, suffix=".render"))
+    return client.post("/api/generate-plan", json=PLAN).json["plan_id"]
+
+def test_svg_is_rendered_once_then_cached(client, plan_id):
+    first = client.get(f"/api/plans/{plan_id}/render")
+    assert first.status_code == 200 and first.mimetype == "image/svg+xml"
+    assert first.headers["X-Render-Cache"] == "miss"
+    svg = ET.fromstring(first.data)
+    assert svg.tag.endswith("svg")
+    assert b"Bedroom" in first.data
+    second = client.get(f"/api/plans/{plan_id}/render")
+    assert second.headers["X-Render-Cache"] == "hit" and second.data == first.data
+    assert client.get(f"/api/plans/{plan_id}/render",
+                      headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+def test_png_is_a_valid_image(client, plan_id):
+    response = client.get(f"/api/plans/{plan_id}/render", query_string={"format": "png", "floor": "ground", "scale": 4})
+    assert response.mimetype == "image/png"
+    data = response.data
+    assert data.startswith(b"\x89PNG\r\n\x1a\n")
+    width, height = struct.unpack(">II", data[16:24])
+    idat_length = struct.unpack(">I", data[33:37])[0]
+    raw = zlib.decompress(data[41:41 + idat_length])
+    assert len(raw) == height * (1 + 3 * width)
+
+def test_equivalent_options_share_a_key():
+    a = plan_render.render_options({"format": "SVG", "floor": "First", "labels": "yes"})
+    b = plan_render.render_options({"floor": "floor-1", "scale": "8"})
+    assert plan_render.render_key(b"{}", a) == plan_render.render_key(b"{}", b)
+
+@pytest.mark.parametrize("params", [{"format": "gif"}, {"floor": "roof"}, {"scale": "nan"}, {"scale": 100}])
+def test_bad_render_options(client, plan_id, params):
+    assert client.get(f"/api/plans/{plan_id}/render", query_string=params).status_code == 400
+
+def test_unknown_plan(client):
+    assert client.get(f"/api/plans/PLAN_{'0' * 32}/render").status_code == 404
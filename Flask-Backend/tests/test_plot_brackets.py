@@ -0,0 +1,15 @@
+def test_resolve_reports_each_parcel(client):
+    response = client.post("/api/plot-brackets/resolve", json={
+        "city": "Lahore", "authority": "LDA",
+        "parcels": [{"area": 10, "unit": "marla"}, {"length": 30, "width": 60}, 5],
+    })
+    assert response.status_code == 200
+    exact, larger, bad = response.json["results"]
+    assert exact["plot_sizes"] == ["10 Marla"] and exact["matches"] == ["exact"]
+    assert larger["matches"] == ["next_larger"]
+    assert bad == {"index": 2, "error": "Parcel must be an object"}
+
+def test_resolve_rejects_non_object_body(client):
+    response = client.post("/api/plot-brackets/resolve", json=[{"area": 10}])
+    assert response.status_code == 400
+    assert "JSON object" in response.json["error"]
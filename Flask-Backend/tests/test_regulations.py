@@ -0,0 +1,14 @@
+import pytest
+
+from bylaw_terms import plot_size_aliases, plot_size_slug
+
+
+def test_plot_size_slug():
+    assert plot_size_slug("60-119 Sq Yd") == "60-119-sq-yd"
+    assert plot_size_slug("1 Kanal (Corner)") == "1-kanal-corner"
+
+@pytest.mark.parametrize("key", ["10 Marla", "10 marla", "10 MARLA", "10-marla", "10-MARLA", "10_marla", "10_MARLA"])
+def test_every_spelling_finds_the_plot(client, key):
+    assert "10 Marla" in plot_size_aliases("10 Marla")
+    response = client.get(f"/api/bylaws/Lahore/LDA/{key}")
+    assert response.status_code == 200
@@ -0,0 +1,46 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import regulations
+from json_provider import dumps_bytes
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for filename in regulations.CITY_FILES.values():
+        shutil.copy(os.path.join(regulations.DATA_DIR, filename), tmp_path)
+    return tmp_path
+
+def test_compiled_snapshot_round_trips(data_dir):
+    path = str(data_dir / "bylaws.snapshot")
+    header = regulations.compile_snapshot(dumps_bytes, path, str(data_dir))
+    loaded = regulations.read_compiled_snapshot(path, str(data_dir))
+    assert loaded is not None
+    assert loaded.form_options_payload["digest"] == header["form_options_etag"]
+    assert loaded.lookup_plot("Lahore", "LDA", "10_MARLA")[0] == "10 Marla"
+    assert loaded.bylaw_columns.query({"city": "Lahore"})[0] > 0
+
+def _corrupt(path):
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+@pytest.mark.parametrize("damage", [
+    lambda path, data_dir: _corrupt(path),
+    lambda path, data_dir: (data_dir / "karachi.json").write_text(
+        json.dumps({**json.loads((data_dir / "karachi.json").read_text()), "edited": True})),
+    lambda path, data_dir: open(path, "wb").write(b"not a snapshot"),
+])
+def test_bad_or_stale_snapshots_are_ignored(data_dir, damage):
+    path = str(data_dir / "bylaws.snapshot")
+    regulations.compile_snapshot(dumps_bytes, path, str(data_dir))
+    damage(path, data_dir)
+    assert regulations.read_compiled_snapshot(path, str(data_dir)) is None
+
+def test_missing_snapshot(data_dir):
+    assert regulations.read_compiled_snapshot(str(data_dir / "none.snapshot"), str(data_dir)) is None
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import regulations
+from takeoff import (MATERIALS, QUANTITY_PER_SQFT, TakeoffInputError, compute_takeoff,
+                     portfolio_columns, takeoff_report)
+
+URL = "/api/construction-calculator/takeoff"
+
+
+def _report(plots, defaults=None, detail="floors"):
+    columns = portfolio_columns(None, plots, defaults)
+    return takeoff_report(columns, compute_takeoff(columns), detail)
+
+def test_floors_use_ground_then_upper_coverage():
+    plot = {"length": 30, "width": 60, "floors": 3, "groundCoverage": 80, "upperCoverage": 50, "materialRate": 1000}
+    result = compute_takeoff(portfolio_columns(None, [plot]))
+    assert result["floor_covered_sqft"].tolist() == [1440.0, 900.0, 900.0]
+    expected = sum(area * QUANTITY_PER_SQFT[kind]["cement_bags"]
+                   for area, kind in ((1440, "ground"), (900, "upper"), (900, "upper")))
+    assert result["plot_quantities"][0, MATERIALS.index("cement_bags")] == pytest.approx(expected)
+    assert result["material_cost"].tolist() == [3240 * 1000]
+
+def test_plots_are_reduced_separately():
+    plots = [{"length": 20, "width": 50, "floors": n, "groundCoverage": 60} for n in (1, 2, 4)]
+    report = _report(plots, defaults={"materialRate": 500}, detail="plots")
+    covered = [p["covered_area_sqft"] for p in report["plots"]]
+    assert covered == [600.0, 1200.0, 2400.0]
+    assert report["totals"]["covered_area_sqft"] == 4200.0
+    assert "floors" not in report["plots"][0]
+
+def test_plot_size_fills_in_bylaws(app):
+    snapshot = regulations.current_snapshot()
+    plot = {"city": "Lahore", "authority": "LDA", "plotSize": "10 Marla", "floors": 2}
+    columns = portfolio_columns(snapshot, [plot])
+    assert columns["plot_area_sqft"][0] > 0
+    assert np.isfinite(compute_takeoff(columns)["plot_costs"]).all()
+
+@pytest.mark.parametrize("plot, message", [
+    ({"length": "inf", "width": 30}, "finite"),
+    ({"length": 1e200, "width": 1e200}, "too large"),
+    ({"length": 1e7, "width": 1e7, "groundCoverage": 600}, "overflow"),
+    ({"length": 30, "width": 60, "floors": 0}, "floors"),
+])
+def test_bad_plots_are_rejected(plot, message):
+    with pytest.raises(TakeoffInputError, match=message):
+        _report([{"floors": 1, "groundCoverage": 60, "materialRate": 100, **plot}])
+
+def test_endpoint_rejects_bad_bodies(client):
+    assert client.post(URL, json=[{"length": 30}]).status_code == 400
+    assert client.post(URL, json={"plots": [{}], "defaults": [1]}).json["error"] == "'defaults' must be an object"
+    assert client.post(URL, json={"plots": []}).status_code == 400
+
+def test_endpoint_totals(client):
+    response = client.post(URL, json={"plots": [{"city": "Lahore", "authority": "LDA", "plotSize": "10 Marla", "floors": 2}],
+                                      "detail": "totals"})
+    assert response.status_code == 200
+    assert set(response.json["totals"]["quantities"]) == set(MATERIALS)
+    assert "plots" not in response.json
@@ -9,6 +9,17 @@ app.use(express.json());
 
 const FLASK_URL = "http://127.0.0.1:5000";
 
+// Flask rate-limits expensive routes per client, so pass on who the client is
+function flaskHeaders(req) {
+  return { "Content-Type": "application/json", "X-Forwarded-For": req.ip };
+}
+
+// Keep Flask's Retry-After (429/503 from admission control, 202 job polling)
+function relayRetryAfter(flaskResponse, res) {
+  const retryAfter = flaskResponse.headers.get("retry-after");
+  if (retryAfter) res.set("Retry-After", retryAfter);
+}
+
 // Root route to fix "Cannot GET /" error
 app.get("/", (req, res) => {
   res.json({
@@ -24,17 +35,29 @@ app.get("/", (req, res) => {
       "POST /api/construction-calculator",
       "GET /api/cities",
       "GET /api/cities/:city/authorities",
-      "GET /api/bylaws/:city/:authority/:plotSize"
+      "GET /api/bylaws/:city/:authority/:plotSize",
+      "GET /api/bylaws/search",
+      "POST /api/batch",
+      "GET /api/plot-bootstrap/:city/:authority/:plotSize",
+      "GET /api/plan-jobs/:jobId",
+      "GET /api/plan-jobs/:jobId/result",
+      "GET /api/plan-jobs/:jobId/stream",
+      "DELETE /api/plan-jobs/:jobId"
     ]
   });
 });
 
 // Forward form-options to Flask
 app.get("/api/form-options", async (req, res) => {
-  console.log("📥 Frontend → Node.js: GET /api/form-options");
+  // Pass filters (city, authority, fields, exclude, shared) through unchanged
+  const query = req.url.includes("?") ? req.url.slice(req.url.indexOf("?")) : "";
+  console.log(`📥 Frontend → Node.js: GET /api/form-options${query}`);
   try {
-    const flaskResponse = await fetch(`${FLASK_URL}/api/form-options`);
+    const flaskResponse = await fetch(`${FLASK_URL}/api/form-options${query}`);
     const data = await flaskResponse.json();
+    if (!flaskResponse.ok) {
+      return res.status(flaskResponse.status).json(data);
+    }
     console.log("✅ Node.js → Flask → Node.js → Frontend: Form options sent");
     res.json(data);
   } catch (err) {
@@ -50,18 +73,20 @@ app.post("/api/generate-plan", async (req, res) => {
   try {
     const flaskResponse = await fetch(`${FLASK_URL}/api/generate-plan`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: flaskHeaders(req),
       body: JSON.stringify(req.body),
     });
 
     if (!flaskResponse.ok) {
+      relayRetryAfter(flaskResponse, res);
       const errorData = await flaskResponse.json();
       return res.status(flaskResponse.status).json(errorData);
     }
 
     const result = await flaskResponse.json();
     console.log("✅ Node.js → Flask → Node.js → Frontend: Plan generated");
-    return res.json(result);
+    // 202 when the plan was queued as a job
+    return res.status(flaskResponse.status).json(result);
   } catch (error) {
     console.error("❌ Node → Flask error:", error);
     return res.status(500).json({ error: "Failed to fetch from Flask", details: error.message });
@@ -166,11 +191,12 @@ app.post("/api/construction-calculator", async (req, res) => {
   try {
     const flaskResponse = await fetch(`${FLASK_URL}/api/construction-calculator`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: flaskHeaders(req),
       body: JSON.stringify(req.body),
     });
 
     if (!flaskResponse.ok) {
+      relayRetryAfter(flaskResponse, res);
       const errorData = await flaskResponse.json();
       return res.status(flaskResponse.status).json(errorData);
     }
@@ -225,6 +251,20 @@ app.get("/api/cities/:city/authorities", async (req, res) => {
   }
 });
 
+// Forward bylaw search to Flask; q, limit and match pass through unchanged
+app.get("/api/bylaws/search", async (req, res) => {
+  const query = req.url.includes("?") ? req.url.slice(req.url.indexOf("?")) : "";
+  console.log(`📥 Frontend → Node.js: GET /api/bylaws/search${query}`);
+  try {
+    const flaskResponse = await fetch(`${FLASK_URL}/api/bylaws/search${query}`, { headers: flaskHeaders(req) });
+    const data = await flaskResponse.json();
+    res.status(flaskResponse.status).json(data);
+  } catch (err) {
+    console.error("❌ Node → Flask error:", err.message);
+    res.status(500).json({ error: err.message });
+  }
+});
+
 // Forward bylaws/:city/:authority/:plotSize to Flask
 app.get("/api/bylaws/:city/:authority/:plotSize", async (req, res) => {
   const { city, authority, plotSize } = req.params;
@@ -246,6 +286,99 @@ app.get("/api/bylaws/:city/:authority/:plotSize", async (req, res) => {
   }
 });
 
+// Forward a batch of API calls to Flask, which runs them in-process
+app.post("/api/batch", async (req, res) => {
+  const count = Array.isArray(req.body && req.body.requests) ? req.body.requests.length : 0;
+  console.log(`📥 Frontend → Node.js: POST /api/batch (${count} requests)`);
+  try {
+    const flaskResponse = await fetch(`${FLASK_URL}/api/batch`, {
+      method: "POST",
+      headers: flaskHeaders(req),
+      body: JSON.stringify(req.body),
+    });
+    relayRetryAfter(flaskResponse, res);
+    const data = await flaskResponse.json();
+    return res.status(flaskResponse.status).json(data);
+  } catch (err) {
+    console.error("❌ Node → Flask error:", err.message);
+    res.status(500).json({ error: err.message });
+  }
+});
+
+// Everything the plot screen loads, in one round trip to Flask
+app.get("/api/plot-bootstrap/:city/:authority/:plotSize", async (req, res) => {
+  const [city, authority, plotSize] = [req.params.city, req.params.authority, req.params.plotSize].map(encodeURIComponent);
+  console.log(`📥 Frontend → Node.js: GET /api/plot-bootstrap/${city}/${authority}/${plotSize}`);
+  const requests = [
+    { id: "cities", path: "/api/cities" },
+    { id: "authorities", path: `/api/cities/${city}/authorities` },
+    { id: "bylaws", path: `/api/bylaws/${city}/${authority}/${plotSize}` },
+    { id: "dimensions", path: `/api/plot-dimensions/${city}/${plotSize}` },
+    { id: "costRates", path: "/api/cost-rates" }
+  ];
+  try {
+    const flaskResponse = await fetch(`${FLASK_URL}/api/batch`, {
+      method: "POST",
+      headers: flaskHeaders(req),
+      body: JSON.stringify({ requests }),
+    });
+    const data = await flaskResponse.json();
+    if (!flaskResponse.ok) {
+      relayRetryAfter(flaskResponse, res);
+      return res.status(flaskResponse.status).json(data);
+    }
+    // { cities: {status, body}, authorities: {status, body}, ... }
+    const result = {};
+    for (const item of data.responses) {
+      result[item.id] = { status: item.status, body: item.body };
+    }
+    console.log(`✅ Node.js → Flask → Node.js → Frontend: Plot bootstrap sent for ${city}/${authority}/${plotSize}`);
+    res.json(result);
+  } catch (err) {
+    console.error("❌ Node → Flask error:", err.message);
+    res.status(500).json({ error: err.message });
+  }
+});
+
+// Forward plan-jobs/:jobId status, result and cancel to Flask
+app.get("/api/plan-jobs/:jobId", (req, res) => forwardPlanJob(req, res, "GET", ""));
+app.get("/api/plan-jobs/:jobId/result", (req, res) => forwardPlanJob(req, res, "GET", "/result"));
+app.delete("/api/plan-jobs/:jobId", (req, res) => forwardPlanJob(req, res, "DELETE", ""));
+
+async function forwardPlanJob(req, res, method, suffix) {
+  const { jobId } = req.params;
+  console.log(`📥 Frontend → Node.js: ${method} /api/plan-jobs/${jobId}${suffix}`);
+  try {
+    const flaskResponse = await fetch(`${FLASK_URL}/api/plan-jobs/${jobId}${suffix}`, { method });
+    relayRetryAfter(flaskResponse, res);
+    const data = await flaskResponse.json();
+    return res.status(flaskResponse.status).json(data);
+  } catch (err) {
+    console.error("❌ Node → Flask error:", err.message);
+    res.status(500).json({ error: err.message });
+  }
+}
+
+// Pipe the plan-jobs/:jobId/stream server-sent events through unchanged
+app.get("/api/plan-jobs/:jobId/stream", async (req, res) => {
+  const { jobId } = req.params;
+  console.log(`📥 Frontend → Node.js: GET /api/plan-jobs/${jobId}/stream`);
+  try {
+    const flaskResponse = await fetch(`${FLASK_URL}/api/plan-jobs/${jobId}/stream`);
+    if (!flaskResponse.ok) {
+      const errorData = await flaskResponse.json();
+      return res.status(flaskResponse.status).json(errorData);
+    }
+    res.set({ "Content-Type": "text/event-stream", "Cache-Control": "no-cache" });
+    res.flushHeaders();
+    flaskResponse.body.pipe(res);
+    req.on("close", () => flaskResponse.body.destroy());
+  } catch (err) {
+    console.error("❌ Node → Flask error:", err.message);
+    res.status(500).json({ error: err.message });
+  }
+});
+
 app.listen(3001, () => {
   console.log("🚀 Node.js backend running at http://localhost:3001");
   console.log("📡 Ready to forward requests to Flask at http://127.0.0.1:5000");
@@ -1,14 +1,20 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request
 from flask_cors import CORS
 import json
 import os
+import sys
 from typing import Dict, Any, List, Optional
 
-app = Flask(__name__)
-CORS(app)
+# Plot size keys and aliases come from the main backend so the two cannot drift
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Flask-Backend"))
+from bylaw_terms import plot_size_aliases, plot_size_slug as transform_plot_size_key
+
+regulations_api = Blueprint("city_regulations", __name__)
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Global variables to store loaded data
 CITY_DATA = {}
+PLOT_INDEX: Dict[tuple, tuple] = {}
 GLOBAL_OPTIONS = {
     "orientation": ["North", "South", "East", "West", "North-East", "North-West", "South-East", "South-West"],
     "facing": ["Main Road", "Side Road", "Corner", "Back Lane"],
@@ -23,7 +29,7 @@ def load_city_data():
     
     for city in cities:
         try:
-            with open(f"{city}.json", "r", encoding="utf-8") as f:
+            with open(os.path.join(DATA_DIR, f"{city}.json"), "r", encoding="utf-8") as f:
                 CITY_DATA[city.title()] = json.load(f)
                 print(f"[Backend] Loaded {city.title()} data successfully")
         except FileNotFoundError:
@@ -33,9 +39,22 @@ def load_city_data():
             print(f"[Backend] Error loading {city}.json: {e}")
             CITY_DATA[city.title()] = {"authorities": {}}
 
-def transform_plot_size_key(plot_size: str) -> str:
-    """Transform plot size for frontend compatibility"""
-    return plot_size.lower().replace(" ", "-").replace("_", "-")
+def build_plot_index():
+    """Map (city, authority, alias) -> (plot size label, plot data, dynamic options) for O(1) lookups
+
+    The dynamic options only depend on the plot's bylaws, so they are derived
+    once here instead of on every request.
+    """
+    global PLOT_INDEX
+    
+    index = {}
+    for city_name, city_data in CITY_DATA.items():
+        for authority_name, authority_data in city_data.get("authorities", {}).items():
+            for plot_size, plot_data in authority_data.get("plot_sizes", {}).items():
+                entry = (plot_size, plot_data, get_dynamic_options(plot_data))
+                for alias in plot_size_aliases(plot_size):
+                    index.setdefault((city_name, authority_name, alias), entry)
+    PLOT_INDEX = index
 
 def get_dynamic_options(bylaws_data: Dict[str, Any]) -> Dict[str, Any]:
     """Extract dynamic options from bylaws data"""
@@ -108,7 +127,7 @@ def get_dynamic_options(bylaws_data: Dict[str, Any]) -> Dict[str, Any]:
     
     return options
 
-@app.route('/api/form-options', methods=['GET'])
+@regulations_api.route('/api/form-options', methods=['GET'])
 def get_form_options():
     """Get all available form options organized by city"""
     try:
@@ -143,7 +162,7 @@ def get_form_options():
                             "city": city_name,
                             "frontend_key": frontend_key
                         },
-                        "available_options": get_dynamic_options(plot_data),
+                        "available_options": PLOT_INDEX[(city_name, authority_name, plot_size)][2],
                         "raw_bylaws": plot_data
                     }
         
@@ -153,7 +172,7 @@ def get_form_options():
         print(f"[Backend] Error in get_form_options: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/bylaws/<city>/<authority>/<plot_size>', methods=['GET'])
+@regulations_api.route('/api/bylaws/<city>/<authority>/<plot_size>', methods=['GET'])
 def get_bylaws_info(city: str, authority: str, plot_size: str):
     """Get specific bylaws information"""
     try:
@@ -167,18 +186,13 @@ def get_bylaws_info(city: str, authority: str, plot_size: str):
         if authority not in city_data.get("authorities", {}):
             return jsonify({"error": f"Authority {authority} not found in {city}"}), 404
             
-        authority_data = city_data["authorities"][authority]
+        entry = PLOT_INDEX.get((city_title, authority, plot_size))
         
-        # Find plot size (handle frontend key transformation)
-        plot_data = None
-        for original_plot_size, data in authority_data.get("plot_sizes", {}).items():
-            if transform_plot_size_key(original_plot_size) == plot_size:
-                plot_data = data
-                break
-        
-        if not plot_data:
+        if entry is None:
             return jsonify({"error": f"Plot size {plot_size} not found"}), 404
         
+        original_plot_size, plot_data, options = entry
+        
         response = {
             "meta": {
                 "plot_size_label": original_plot_size,
@@ -186,7 +200,7 @@ def get_bylaws_info(city: str, authority: str, plot_size: str):
                 "city": city_title,
                 "frontend_key": plot_size
             },
-            "available_options": get_dynamic_options(plot_data),
+            "available_options": options,
             "raw_bylaws": plot_data
         }
         
@@ -196,7 +210,7 @@ def get_bylaws_info(city: str, authority: str, plot_size: str):
         print(f"[Backend] Error in get_bylaws_info: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/validate-selection', methods=['POST'])
+@regulations_api.route('/api/validate-selection', methods=['POST'])
 def validate_selection():
     """Validate user selection against bylaws"""
     try:
@@ -224,20 +238,13 @@ def validate_selection():
         if authority not in city_data.get("authorities", {}):
             return jsonify({"error": f"Invalid authority: {authority}"}), 400
         
-        authority_data = city_data["authorities"][authority]
-        
-        # Find plot data
-        plot_data = None
-        for original_plot_size, bylaws_data in authority_data.get("plot_sizes", {}).items():
-            if transform_plot_size_key(original_plot_size) == plot_size:
-                plot_data = bylaws_data
-                break
+        entry = PLOT_INDEX.get((city_title, authority, plot_size))
         
-        if not plot_data:
+        if entry is None:
             return jsonify({"error": f"Invalid plot size: {plot_size}"}), 400
         
-        # Get dynamic options for validation
-        options = get_dynamic_options(plot_data)
+        # Dynamic options precomputed by build_plot_index
+        options = entry[2]
         
         # Validate bedrooms
         bedrooms = int(data["bedrooms"])
@@ -260,7 +267,7 @@ def validate_selection():
         print(f"[Backend] Error in validate_selection: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/generate-plan', methods=['POST'])
+@regulations_api.route('/api/generate-plan', methods=['POST'])
 def generate_plan():
     """Generate building plan based on user selection"""
     try:
@@ -298,7 +305,7 @@ def generate_plan():
         print(f"[Backend] Error in generate_plan: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/health', methods=['GET'])
+@regulations_api.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
@@ -307,8 +314,20 @@ def health_check():
         "total_authorities": sum(len(city.get("authorities", {})) for city in CITY_DATA.values())
     })
 
-if __name__ == '__main__':
-    print("[Backend] Starting City Regulations Backend...")
+def create_app():
+    """Build the app with the city data loaded and indexed.
+
+    For several workers, preload it in the parent so they share the data:
+        gunicorn --preload -w 4 --threads 4 -b 0.0.0.0:3001 "city-regulation-backend:create_app()"
+    """
     load_city_data()
+    build_plot_index()
     print(f"[Backend] Loaded data for cities: {list(CITY_DATA.keys())}")
-    app.run(host='0.0.0.0', port=3001, debug=True)
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(regulations_api)
+    return app
+
+if __name__ == '__main__':
+    print("[Backend] Starting City Regulations Backend...")
+    create_app().run(host='0.0.0.0', port=3001, debug=os.environ.get("FLASK_DEBUG") == "1")